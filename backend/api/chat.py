@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 import logging
-from api.helpers import summarize, search, extract, rerank_chunks
+import time
+from api.helpers import summarize, search, extract, rerank_chunks, rerank_with_scores, RetrievalResult, RERANK_CASCADES
 from utils.utils import get_current_user
+from prometheus_client import Counter, Histogram
 
 # Local utilities & RAG pipeline
-from rag.pipeline import get_or_create_collection
+from rag.pipeline import get_or_create_collection, embed_query
+from rag.versions import get_collection_version
+from rag.fusion import DEFAULT_FUSION, FusionConfig
+from utils.semantic_cache import SemanticCache
+from utils.tracing import observe, span
 
 from langchain_core.tools import tool
 from langchain_ollama import ChatOllama
@@ -28,19 +37,118 @@ llm = ChatOllama(
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+# ─── Generation metrics ─────────────────────────────────────────────────
+LLM_TTFT = Histogram(
+    "rag_llm_time_to_first_token_seconds",
+    "Time from request to the first streamed answer token",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "rag_llm_tokens_per_second",
+    "Answer generation speed after the first token",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200),
+)
+LLM_TOKENS = Counter("rag_llm_answer_tokens_total", "Streamed answer tokens (stream chunks)")
+
+
+class GenerationTimer:
+    """Per-request time-to-first-token and tokens/sec for a streamed answer."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.tokens = 0
+        # Time spent inside the model's astream calls only (not cache lookups,
+        # retrieval or tools between the rounds)
+        self.llm_seconds = 0.0
+
+    def token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            LLM_TTFT.observe(self.first_token_at - self.start)
+            observe("llm.first_token", self.first_token_at - self.start)
+        self.tokens += 1
+        LLM_TOKENS.inc()
+
+    def model_call(self, seconds: float) -> None:
+        self.llm_seconds += seconds
+
+    def finish(self) -> None:
+        observe("llm.total", self.llm_seconds)
+        if self.first_token_at is None:
+            return
+        elapsed = time.perf_counter() - self.first_token_at
+        ttft = self.first_token_at - self.start
+        rate = (self.tokens - 1) / elapsed if self.tokens > 1 and elapsed > 0 else 0.0
+        if rate:
+            LLM_TOKENS_PER_SECOND.observe(rate)
+        logger.info(f"⏱️ Answer: TTFT {ttft:.2f}s, {self.tokens} tokens, {rate:.1f} tokens/s")
+
+
+# Retrieval, reranking and other blocking tool work runs here, never on the event loop
+CHAT_EXECUTOR_WORKERS = int(os.getenv("CHAT_EXECUTOR_WORKERS", "8"))
+_tool_executor = ThreadPoolExecutor(max_workers=CHAT_EXECUTOR_WORKERS, thread_name_prefix="chat-tools")
+
+
+# Agent loop: at most this many rounds of tool calls per chat turn, and one
+# latency budget shared by all tools of the turn
+CHAT_MAX_TOOL_ROUNDS = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", "3"))
+CHAT_TOOL_BUDGET_SECONDS = float(os.getenv("CHAT_TOOL_BUDGET_SECONDS", "30"))
+
+
+# ─── Semantic answer cache ───────────────────────────────────────────────
+# Answers are reused for near-identical questions of the same user over the
+# same document scope. The corpus version is part of the scope, so any ingest
+# or delete for the user invalidates the entries automatically.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_SCOPES = int(os.getenv("ANSWER_CACHE_MAX_SCOPES", "1024"))
+ANSWER_CACHE_MAX_PER_SCOPE = int(os.getenv("ANSWER_CACHE_MAX_PER_SCOPE", "64"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+_answer_cache = SemanticCache(
+    "answers",
+    max_scopes=ANSWER_CACHE_MAX_SCOPES,
+    max_entries_per_scope=ANSWER_CACHE_MAX_PER_SCOPE,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    ttl_seconds=ANSWER_CACHE_TTL,
+)
+
+
+def answer_cache_key(
+    user_email: str, document_id: int | None, fusion: FusionConfig, message: str
+) -> tuple[tuple, list[float]]:
+    """(scope, question embedding) for the answer cache. Blocking."""
+    scope = (user_email, document_id, fusion, get_collection_version(user_email))
+    return scope, embed_query(message)
+
+
+async def run_blocking(fn, *args):
+    """Run a sync function on the bounded tool executor.
+
+    If the awaiting request is cancelled (client gone), work that has not
+    started yet is dropped from the executor queue.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_tool_executor, fn, *args)
+
 # ─── Base functions (pure, no @tool here) ───────────────────────────────
-def rag_search_base(query: str, document_id: int | None = None, user_email: str | None = None) -> str:
+def rag_search_base(
+    query: str,
+    document_id: int | None = None,
+    user_email: str | None = None,
+    fusion: FusionConfig | None = None,
+) -> RetrievalResult:
     if not user_email:
-        return "Error: User not authenticated."
-    docs, metas = search(query=query, document_id=document_id, user_email=user_email)
+        return RetrievalResult(query=query, message="Error: User not authenticated.")
+    docs, metas = search(query=query, document_id=document_id, user_email=user_email, fusion=fusion)
     logger.info(f"Raw retrieval: {len(docs)} chunks for query '{query}'")
     if not docs:
-        return "No relevant information found."
+        return RetrievalResult(query=query)
     # Re-rank inside search for best results
-    reranked_docs, _ = rerank_chunks(query=query, chunks=docs, metadatas=metas, top_k=6, threshold=0.3)
-    if not reranked_docs:
-        return "No relevant information found."
-    return "\n\n".join(reranked_docs)
+    reranked_docs, reranked_metas, scores = rerank_with_scores(
+        query=query, chunks=docs, metadatas=metas, top_k=6, threshold=0.3,
+        cascade=RERANK_CASCADES["rag_search"],
+    )
+    return RetrievalResult(query=query, chunks=reranked_docs, metadatas=reranked_metas, scores=scores)
 
 def rag_summarize_base(document_id: int | None = None, user_email: str | None = None) -> str:
     if not user_email:
@@ -48,13 +156,20 @@ def rag_summarize_base(document_id: int | None = None, user_email: str | None =
     docs, _ = search(query="", document_id=document_id, user_email=user_email)
     return summarize(docs)
 
-def rag_extract_base(field: str, document_id: int | None = None, user_email: str | None = None) -> str:
+def rag_extract_base(
+    field: str,
+    document_id: int | None = None,
+    user_email: str | None = None,
+    fusion: FusionConfig | None = None,
+) -> str:
     if not user_email:
         return "Error: User not authenticated."
-    docs, metas = search(query=field, document_id=document_id, user_email=user_email)
+    docs, metas = search(query=field, document_id=document_id, user_email=user_email, fusion=fusion)
     if not docs:
         return f"No '{field}' found in documents."
-    reranked_docs, _ = rerank_chunks(query=field, chunks=docs, metadatas=metas, top_k=10)
+    reranked_docs, _ = rerank_chunks(
+        query=field, chunks=docs, metadatas=metas, top_k=10, cascade=RERANK_CASCADES["rag_extract"]
+    )
     results = extract(reranked_docs, field)
     if not results:
         return f"No '{field}' found in documents."
@@ -111,10 +226,54 @@ def rag_extract(field: str, document_id: int | None = None) -> str:
     """
     raise NotImplementedError("Must be executed with user context")
 
+TOOL_NAMES = {"rag_search", "rag_summarize", "rag_extract"}
+
+# ─── System prompt ───────────────────────────────────────────────────────
+SYSTEM_PROMPT = """You are a document Q&A assistant with access to the user's uploaded documents.
+
+CRITICAL RULES:
+1. ONLY say "I don't have information about that in your uploaded documents" when:
+   - the rag_search tool returns exactly "No relevant information found."
+   - OR the tool returns empty / no chunks at all.
+
+2. If the tool returns ANY content (even partial or not perfect match), you MUST:
+   - Use that content as the basis for your answer.
+   - Never ignore it or say you don't have information.
+   - Summarize / explain / quote from it naturally.
+   - Cite source file name and page when possible.
+
+3. NEVER make up information or use external/general knowledge for questions that are clearly about the user's documents.
+
+4. When information IS found, always include citations like [filename, page X] where available.
+
+5. If the retrieved content is not directly relevant, politely say so and ask for clarification — but do NOT default to "no information" unless truly nothing was found.
+
+TOOL USAGE RULES:
+- Always provide 'query' as a STRING.
+- 'document_id' should be INTEGER or null (never dict/object).
+- Example: rag_search(query="What is the main topic?", document_id=null)"""
+
 # ─── Request schema ──────────────────────────────────────────────────────
+class RetrievalOptions(BaseModel):
+    """Per-request hybrid fusion overrides; unset fields use the server defaults."""
+    fusion: Literal["weighted", "rrf", "zscore"] | None = None
+    alpha: float | None = Field(default=None, ge=0.0, le=1.0)
+    distance_threshold: float | None = Field(default=None, gt=0.0)
+    candidates: int | None = Field(default=None, ge=1, le=500)
+
+    def to_fusion_config(self) -> FusionConfig:
+        return DEFAULT_FUSION.with_overrides(
+            strategy=self.fusion,
+            alpha=self.alpha,
+            distance_threshold=self.distance_threshold,
+            dense_candidates=self.candidates,
+            bm25_candidates=self.candidates,
+        )
+
 class ChatRequest(BaseModel):
     message: str
     document_id: int | None = None  # None = search all documents
+    retrieval: RetrievalOptions | None = None
 
 # ─── Argument validation helper ──────────────────────────────────────────
 def validate_and_clean_args(tool_name: str, args: dict) -> dict:
@@ -157,143 +316,173 @@ def validate_and_clean_args(tool_name: str, args: dict) -> dict:
 
 # ─── Chat endpoint ───────────────────────────────────────────────────────
 @router.post("/chat")
-async def chat(request: ChatRequest, current_user: dict = Depends(get_current_user)):
+async def chat(request: ChatRequest, http_request: Request, current_user: dict = Depends(get_current_user)):
     
     user_email = current_user["email"]
     
     if not request.message or not request.message.strip():
         return StreamingResponse(iter(["data: [DONE]\n\n"]), media_type="text/event-stream")
 
-    # Inject user_email via closures
-    def execute_rag_search(args): return rag_search_base(**args, user_email=user_email)
-    def execute_rag_summarize(args): return rag_summarize_base(**args, user_email=user_email)
-    def execute_rag_extract(args): return rag_extract_base(**args, user_email=user_email)
+    fusion = request.retrieval.to_fusion_config() if request.retrieval else DEFAULT_FUSION
+
+    # A failing lookup (embedder, version read) is a cache miss: the turn
+    # still runs and reports errors through the stream
+    answer_scope = question_vector = cached = None
+    try:
+        with span("chat.answer_cache"):
+            answer_scope, question_vector = await run_blocking(
+                answer_cache_key, user_email, request.document_id, fusion, request.message
+            )
+            cached = _answer_cache.lookup(answer_scope, question_vector)
+    except Exception as e:
+        logger.warning(f"⚠️ Answer cache lookup failed, continuing without it: {e}", exc_info=True)
+        answer_scope = None
+    if cached is not None:
+        answer, similarity = cached
+        logger.info(f"💾 Answer cache hit (similarity {similarity:.3f})")
+
+        # Replayed in the chunks it was streamed in, so clients see the usual
+        # event sizes. Hits stay out of the GenerationTimer histograms, which
+        # measure the LLM; the answer cache's own hit counters cover them
+        async def replay_cached_answer():
+            for part in answer["parts"]:
+                yield f"data: {json.dumps({'content': part})}\n\n"
+            yield f"data: {json.dumps({'citations': answer['citations']})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(replay_cached_answer(), media_type="text/event-stream")
+
+    def run_tool(tool_name: str, cleaned_args: dict) -> tuple[str, list]:
+        """Execute one tool call (blocking) with the user's context. Returns (result, citations)."""
+        if tool_name == "rag_search":
+            # Check if query is empty after cleaning
+            if not cleaned_args.get("query"):
+                return "Error: Search query cannot be empty. Please provide a search term.", []
+            # One retrieval feeds both the LLM context and the citations
+            retrieval = rag_search_base(**cleaned_args, user_email=user_email, fusion=fusion)
+            return retrieval.to_context(), retrieval.citations()
+        if tool_name == "rag_summarize":
+            return rag_summarize_base(**cleaned_args, user_email=user_email), []
+        if tool_name == "rag_extract":
+            if not cleaned_args.get("field"):
+                return "Error: Field to extract cannot be empty.", []
+            return rag_extract_base(**cleaned_args, user_email=user_email, fusion=fusion), []
+        return f"Unknown tool: {tool_name}", []
 
     # Bind tools
     model_with_tools = llm.bind_tools([rag_search, rag_summarize, rag_extract])
 
     messages = [
-        SystemMessage(content="""You are a document Q&A assistant with access to the user's uploaded documents.
-
-CRITICAL RULES:
-1. ONLY say "I don't have information about that in your uploaded documents" when:
-   - the rag_search tool returns exactly "No relevant information found."
-   - OR the tool returns empty / no chunks at all.
-
-2. If the tool returns ANY content (even partial or not perfect match), you MUST:
-   - Use that content as the basis for your answer.
-   - Never ignore it or say you don't have information.
-   - Summarize / explain / quote from it naturally.
-   - Cite source file name and page when possible.
-
-3. NEVER make up information or use external/general knowledge for questions that are clearly about the user's documents.
-
-4. When information IS found, always include citations like [filename, page X] where available.
-
-5. If the retrieved content is not directly relevant, politely say so and ask for clarification — but do NOT default to "no information" unless truly nothing was found.
-
-TOOL USAGE RULES:
-- Always provide 'query' as a STRING.
-- 'document_id' should be INTEGER or null (never dict/object).
-- Example: rag_search(query="What is the main topic?", document_id=null)"""),
+        SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=request.message)
     ]
     
+    async def execute_tool_call(tool_call: dict) -> tuple[str, list]:
+        tool_name = tool_call["name"]
+        logger.info(f"🔧 Tool called: {tool_name} args={tool_call['args']}")
+        try:
+            # Validate and clean arguments
+            cleaned_args = validate_and_clean_args(tool_name, tool_call["args"])
+            stage = f"tool.{tool_name}" if tool_name in TOOL_NAMES else "tool.unknown"
+            with span(stage):
+                result, citations = await run_blocking(run_tool, tool_name, cleaned_args)
+            logger.info(f"✅ {tool_name} result (first 200 chars): {result[:200]}...")
+            return result, citations
+        except Exception as tool_error:
+            logger.error(f"❌ Tool error: {str(tool_error)}", exc_info=True)
+            return f"Error executing tool: {str(tool_error)}", []
+
+    async def execute_tool_calls(tool_calls: list, deadline: float) -> list[tuple[str, list]]:
+        """Run every tool call of a model turn concurrently; cut off whatever misses the deadline."""
+        loop = asyncio.get_running_loop()
+        tasks = [asyncio.ensure_future(execute_tool_call(tool_call)) for tool_call in tool_calls]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - loop.time()))
+        except asyncio.CancelledError:
+            # asyncio.wait leaves its tasks running: drop the whole round with the stream
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for tool_call, task in zip(tool_calls, tasks):
+            if task in pending:
+                # Only the await is cancelled: a call already running in the
+                # executor finishes in its thread and holds that slot until then
+                logger.warning(
+                    f"⏱️ Tool {tool_call['name']} cut off by the {CHAT_TOOL_BUDGET_SECONDS}s budget "
+                    f"(its worker thread keeps running until the call returns)"
+                )
+                results.append(("Error: Tool timed out (latency budget exceeded).", []))
+            else:
+                results.append(task.result())
+        return results
+
     # store citation from tool path
     final_citations = []
-    def stream_response():
-        nonlocal final_citations
+    async def stream_response():
+        timing = GenerationTimer()
+        loop = asyncio.get_running_loop()
+        # Tools of all rounds share one latency budget per chat turn
+        tool_deadline = loop.time() + CHAT_TOOL_BUDGET_SECONDS
         try:
-            tool_call_results = {}
+            used_tools = False
             used_documents = False  # flag to track if docs were used
-
-            for chunk in model_with_tools.stream(messages):
-                if chunk.content:
-                    yield f"data: {json.dumps({'content': chunk.content})}\n\n"
-
-                if hasattr(chunk, 'tool_calls') and chunk.tool_calls:
-                    tool_call = chunk.tool_calls[0]
-                    tool_name = tool_call["name"]
-                    args = tool_call["args"]
-                    tool_id = tool_call["id"]
-
-                    logger.info(f"🔧 Tool called: {tool_name}")
-                    logger.info(f"📋 Raw args: {json.dumps(args, indent=2)}")
-
-                    try:
-                        # Validate and clean arguments
-                        cleaned_args = validate_and_clean_args(tool_name, args)
-                        logger.info(f"✨ Cleaned args: {json.dumps(cleaned_args, indent=2)}")
-                        
-                        if tool_name == "rag_search":
-                            # Check if query is empty after cleaning
-                            if not cleaned_args.get("query"):
-                                result = "Error: Search query cannot be empty. Please provide a search term."
-                            else:
-                                result = execute_rag_search(cleaned_args)
-                                # extract citations if search was used
-                                docs, metas = search(**cleaned_args, user_email=user_email)
-                                _, reranked_metas = rerank_chunks(
-                                    query=cleaned_args.get("query", ""),
-                                    chunks=docs,
-                                    metadatas=metas,
-                                    top_k=6
-                                )
-                                for meta in reranked_metas:
-                                    final_citations.append({
-                                        "document_id": meta.get("document_id"),
-                                        "source": meta.get("filename", "unknown"),
-                                        "page": meta.get("page", "?"),
-                                        "snippet": meta.get("text", "")[:150] + "..."
-                                    })
-                        elif tool_name == "rag_summarize":
-                            result = execute_rag_summarize(cleaned_args)
-                        elif tool_name == "rag_extract":
-                            if not cleaned_args.get("field"):
-                                result = "Error: Field to extract cannot be empty."
-                            else:
-                                result = execute_rag_extract(cleaned_args)
-                        else:
-                            result = f"Unknown tool: {tool_name}"
-
-                        # Only count as "used" if we got real info
-                        if "No relevant information found" not in result and result.strip() and not result.startswith("Error:"):
-                            used_documents = True
-
-                        tool_call_results[tool_id] = result
-                        logger.info(f"✅ Tool result (first 200 chars): {result[:200]}...")
-                    except Exception as tool_error:
-                        logger.error(f"❌ Tool error: {str(tool_error)}", exc_info=True)
-                        result = f"Error executing tool: {str(tool_error)}"
-                        tool_call_results[tool_id] = result
-
-                    messages.append(chunk)
-                    messages.append(ToolMessage(content=result, tool_call_id=tool_id))
+            answered = False
+            answer_parts = []  # everything streamed to the client, for the answer cache
+            tool_failed = False
+
+            for round_index in range(CHAT_MAX_TOOL_ROUNDS + 1):
+                # Last round (or budget spent): no tools, the model must answer
+                final_round = round_index == CHAT_MAX_TOOL_ROUNDS or loop.time() >= tool_deadline
+                model = llm if final_round else model_with_tools
+
+                gathered = None
+                round_start = time.perf_counter()
+                async for chunk in model.astream(messages):
+                    if await http_request.is_disconnected():
+                        logger.info("🔌 Client disconnected, stopping generation")
+                        return
+
+                    # Stream the answer token by token as Ollama produces it
+                    if chunk.content:
+                        timing.token()
+                        answered = True
+                        answer_parts.append(chunk.content)
+                        yield f"data: {json.dumps({'content': chunk.content})}\n\n"
+
+                    # Tool calls may be spread over several chunks
+                    gathered = chunk if gathered is None else gathered + chunk
+                timing.model_call(time.perf_counter() - round_start)
+
+                tool_calls = gathered.tool_calls if gathered is not None and not final_round else []
+                if not tool_calls:
                     break
 
-            # Final answer
-            if tool_call_results:
-                logger.info("→ Generating final answer...")
-                final_response = llm.invoke(messages)
-                
-                content = ""
-                if hasattr(final_response, 'content'):
-                    content = final_response.content
-                elif isinstance(final_response, str):
-                    content = final_response
-                else:
-                    content = str(final_response)
-
-                logger.info(f"Final LLM response: {content}")
-
-                # Fallback if empty
-                if not content.strip():
-                    content = "I don't have that information in your documents."
-
-                # Word-by-word streaming
-                words = content.split()
-                for word in words:
-                    yield f"data: {json.dumps({'content': word + ' '})}\n\n"
+                logger.info(f"🔁 Round {round_index + 1}: running {len(tool_calls)} tool call(s) in parallel")
+                used_tools = True
+                answered = False
+                results = await execute_tool_calls(tool_calls, tool_deadline)
+
+                messages.append(gathered)
+                for tool_call, (result, citations) in zip(tool_calls, results):
+                    # Only count as "used" if we got real info
+                    if "No relevant information found" not in result and result.strip() and not result.startswith("Error"):
+                        used_documents = True
+                    if result.startswith("Error"):
+                        tool_failed = True
+                    for citation in citations:
+                        if citation not in final_citations:
+                            final_citations.append(citation)
+                    messages.append(ToolMessage(content=result, tool_call_id=tool_call["id"]))
+
+            # Fallback if the model produced no answer after using tools
+            if used_tools and not answered:
+                fallback = "I don't have that information in your documents."
+                answer_parts.append(fallback)
+                yield f"data: {json.dumps({'content': fallback})}\n\n"
 
             # Send citations ONLY if documents were actually used
             if used_documents and final_citations:
@@ -305,10 +494,24 @@ TOOL USAGE RULES:
             else:
                 yield f"data: {json.dumps({'citations': []})}\n\n"
 
+            # Only complete answers built from healthy tool results are reused
+            if answer_parts and not tool_failed and answer_scope is not None:
+                _answer_cache.add(answer_scope, question_vector, {
+                    "parts": answer_parts,
+                    "citations": final_citations if used_documents else [],
+                })
+
+            timing.finish()
+
+        except asyncio.CancelledError:
+            # Client went away mid-stream: the LLM stream is closed with this
+            # generator and queued tool work is dropped from the executor
+            logger.info("🔌 Chat stream cancelled by client disconnect")
+            raise
         except Exception as e:
             logger.error(f"❌ Stream error: {str(e)}", exc_info=True)
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
-        finally:
-            yield "data: [DONE]\n\n"
 
-    return StreamingResponse(stream_response(), media_type="text/event-stream")
\ No newline at end of file
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream_response(), media_type="text/event-stream")
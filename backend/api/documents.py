@@ -6,9 +6,13 @@ from fastapi.responses import FileResponse
 
 from db.database import get_db
 from models.document import Document
+from models.document_version import DocumentVersion
 from models.models import User
 from utils.utils import get_current_user
-from rag.pipeline import get_or_create_collection
+from rag.pipeline import delete_document_chunks
+from rag.content_store import is_stored, purge_blob, release_blob
+from rag.jobs import get_job_for_document
+from models.job import JOB_DONE, JOB_QUEUED, JOB_RUNNING
 
 router = APIRouter(prefix="/api", tags=["documents"])
 
@@ -68,6 +72,73 @@ def get_document(
     return doc.to_dict()
 
 
+# ============================
+# DOCUMENT PROCESSING STATUS
+# ============================
+@router.get("/documents/{doc_id}/status")
+def get_document_status(
+    doc_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Get user first
+    user = db.query(User).filter(User.email == current_user["email"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    doc = db.query(Document).filter(
+        Document.id == doc_id,
+        Document.user_id == user.id
+    ).first()
+
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    job = get_job_for_document(db, doc_id)
+    if job is None:
+        # Uploaded before the ingestion queue existed
+        return {
+            "document_id": doc_id,
+            "status": JOB_DONE if doc.chunk_count else "unknown",
+            "attempts": 0,
+            "pages_read": doc.page_count,
+            "chunks_indexed": doc.chunk_count,
+            "error": None,
+        }
+
+    return job.to_dict()
+
+
+# ============================
+# DOCUMENT VERSIONS
+# ============================
+@router.get("/documents/{doc_id}/versions")
+def list_document_versions(
+    doc_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user = db.query(User).filter(User.email == current_user["email"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    doc = db.query(Document).filter(
+        Document.id == doc_id,
+        Document.user_id == user.id
+    ).first()
+
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    versions = (
+        db.query(DocumentVersion)
+        .filter(DocumentVersion.document_id == doc_id)
+        .order_by(DocumentVersion.version.desc())
+        .all()
+    )
+    return [version.to_dict() for version in versions]
+
+
 # ============================
 # VIEW DOCUMENT FILE
 # ============================
@@ -129,25 +200,33 @@ def delete_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    # A worker still ingesting would write chunks back after the delete
+    job = get_job_for_document(db, doc_id)
+    if job is not None and job.status in (JOB_QUEUED, JOB_RUNNING):
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+
     try:
-        # 1️⃣ Delete embeddings from Chroma using CORRECT field
-        collection = get_or_create_collection(current_user["email"])
-        
-        # ✅ Use document_id instead of filename for reliable deletion
-        result = collection.delete(where={"document_id": doc_id})
-        print(f"🗑️ Deleted {len(result) if result else 0} chunks from Chroma for doc {doc_id}")
+        # 1️⃣ Delete embeddings from Chroma + BM25 index (by document_id)
+        delete_document_chunks(current_user["email"], doc_id)
 
-        # 2️⃣ Delete file from disk
+        # 2️⃣ Delete legacy per-upload file from disk (stored content is shared)
         file_path = Path(doc.file_path)
-        if file_path.exists():
+        stored = is_stored(file_path)
+        if not stored and file_path.exists():
             file_path.unlink()
             print(f"🗑️ Deleted file: {file_path}")
 
-        # 3️⃣ Delete DB record
+        # 3️⃣ Delete DB record + drop its reference to the stored content
+        file_hash = doc.file_hash
         db.delete(doc)
+        remaining = release_blob(db, file_hash) if stored else None
         db.commit()
         print(f"✅ Document {doc_id} deleted successfully")
 
+        # 4️⃣ Last reference gone: remove the stored file and its artifacts
+        if remaining is not None and remaining <= 0:
+            purge_blob(file_hash)
+
         return {
             "message": "Document deleted successfully",
             "document_id": doc_id
@@ -1,15 +1,25 @@
 import os
-import shutil
-from fastapi import APIRouter, File, UploadFile, BackgroundTasks, Depends, HTTPException
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from utils.utils import get_current_user
-from rag.pipeline import process_uploaded_file
-from utils.file_hash import compute_file_hash
+from rag.jobs import enqueue_ingestion, enqueue_reindex, get_job_for_document
+from utils.upload_stream import receive_upload
+from rag.content_store import (
+    CONTENT_TMP_DIR,
+    acquire_blob,
+    discard_new_blob,
+    is_stored,
+    purge_blob,
+    release_blob,
+    store_raw_file,
+)
 from sqlalchemy.orm import Session
 from db.database import get_db  
 from models.document import Document
+from models.document_version import DocumentVersion
+from models.job import JOB_QUEUED, JOB_RUNNING
 from models.models import User
-import uuid
 import logging
 
 # Set up proper logging
@@ -18,63 +28,54 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["files"])
 
-Upload_DIR = "uploaded_files"
-os.makedirs(Upload_DIR, exist_ok=True)
-
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".docx", ".md", ".csv"}
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
-def validate_file(file: UploadFile):
-    """Validate file type and size."""
-    if not file or not file.filename:
+def validate_filename(filename: str):
+    """Validate the file type from its name (size is enforced while streaming)."""
+    if not filename:
         logger.error("No file provided or filename is empty")
         raise HTTPException(status_code=400, detail="No file provided")
     
-    ext = os.path.splitext(file.filename)[1].lower() 
+    ext = os.path.splitext(filename)[1].lower() 
     if ext not in ALLOWED_EXTENSIONS:
-        logger.error(f"Invalid file type: {ext} for file {file.filename}")
+        logger.error(f"Invalid file type: {ext} for file {filename}")
         raise HTTPException(
             status_code=400, 
             detail=f"Invalid file type: {ext}. Allowed: PDF, TXT, DOCX, MD, CSV"
         )
 
-    # Check file size
-    file.file.seek(0, 2)
-    size = file.file.tell()
-    file.file.seek(0)
 
-    if size > MAX_FILE_SIZE:
-        logger.error(f"File too large: {size} bytes (max: {MAX_FILE_SIZE})")
-        raise HTTPException(status_code=400, detail="File too large. Max 50MB")
-    
-    if size == 0:
-        logger.error("File is empty (0 bytes)")
-        raise HTTPException(status_code=400, detail="File is empty")
-    
-    logger.info(f"✅ File validation passed: {file.filename} ({size} bytes)")
+# The body is parsed by hand (utils/upload_stream.py), so describe it for the docs
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
 
-@router.post("/upload")
+@router.post("/upload", openapi_extra=UPLOAD_OPENAPI)
 async def upload_file(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
+    request: Request,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     logger.info(f"📤 Upload request from user: {current_user.get('email')}")
-    logger.info(f"📄 File: {file.filename if file else 'NO FILE'}")
     
+    upload = None
     try:
-        # Step 1: Validate file
-        validate_file(file)
-        
-        # Step 2: Read file bytes ONCE
-        logger.info("Reading file bytes...")
-        file_bytes = await file.read()
-        logger.info(f"✅ Read {len(file_bytes)} bytes")
-        
-        # Step 3: Compute hash and check for duplicates 
-        logger.info("Computing file hash...")
-        file_hash = compute_file_hash(file_bytes)
+        # Step 1-3: Stream the body to a temp file (type and size checked as
+        # data arrives, SHA-256 computed on the fly)
+        upload = await receive_upload(request, CONTENT_TMP_DIR, MAX_FILE_SIZE, validate_filename)
+        filename = upload.filename
+        file_hash = upload.sha256
+        size = upload.size
+        logger.info(f"✅ File validation passed: {filename} ({size} bytes)")
         logger.info(f"✅ File hash: {file_hash}")
         
         # Get user from DB
@@ -99,60 +100,59 @@ async def upload_file(
         
         logger.info("✅ No duplicate found")
         
-        # Step 4: Create unique safe filename
-        unique_id = str(uuid.uuid4())[:8]
-        safe_filename = f"{unique_id}_{file.filename.replace(' ','_')}"
-        file_path = os.path.join(Upload_DIR, safe_filename)
-        
-        logger.info(f"Saving file to: {file_path}")
-        
-        # Step 5: Save file to disk using the bytes we already read
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_bytes)
-            
-        logger.info(f"✅ File saved: {file_path} ({len(file_bytes)} bytes)")
-
-        # Step 6: Save to database
+        # Step 4-6: Reference the content-addressed copy, save document +
+        # ingestion job in one transaction
         logger.info("Saving document to database...")
+        new_blob = False
         try:
+            # Counted first: the row lock keeps a concurrent delete from
+            # purging the stored file while it is being reused
+            new_blob = acquire_blob(db, file_hash, size)
+            file_path = str(store_raw_file(upload, file_hash, filename))
+            upload = None
+            logger.info(f"✅ File stored: {file_path}")
+
             new_doc = Document(
-                filename=file.filename,
+                filename=filename,
                 file_path=file_path,
                 file_hash=file_hash,
                 user_id=user.id,
             )
             db.add(new_doc)
+            db.flush()  # assigns new_doc.id
+            db.add(DocumentVersion(
+                document_id=new_doc.id,
+                version=1,
+                filename=filename,
+                file_hash=file_hash,
+                size=size,
+            ))
+
+            # Step 7: Queue processing for the ingestion workers (worker.py)
+            job = enqueue_ingestion(db, new_doc, original_filename=filename, user_email=user.email)
             db.commit()
             db.refresh(new_doc)
 
             document_id = new_doc.id
-            logger.info(f"✅ Document saved in DB with ID: {document_id}")
+            logger.info(f"✅ Document saved in DB with ID: {document_id}, job queued: {job.id}")
 
         except Exception as db_error:
+            # Nothing references content this upload stored first
+            if new_blob:
+                discard_new_blob(file_hash)
             db.rollback()
             logger.error(f"❌ DB save failed: {db_error}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")    
-            
-        # Step 7: Start background processing
-        logger.info("Starting background processing task...")
-        background_tasks.add_task(
-            process_uploaded_file,
-            file_path=file_path,
-            original_filename=file.filename,
-            user_email=user.email,
-            file_hash=file_hash,
-            document_id=document_id
-        )    
         
         logger.info(f"🎉 Upload complete for document ID: {document_id}")
         
         # Step 8: Return success
         return JSONResponse({
-            "message": "File uploaded & processing started",
+            "message": "File uploaded & queued for processing",
             "document_id": document_id,
-            "filename": file.filename,
-            "size_kb": len(file_bytes) // 1024,
-            "status": "processing"
+            "filename": filename,
+            "size_kb": size // 1024,
+            "status": job.status
         })
         
     except HTTPException as e:
@@ -160,4 +160,120 @@ async def upload_file(
         raise e
     except Exception as e:
         logger.error(f"❌ Unexpected upload error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Rejected uploads leave nothing behind
+        if upload is not None:
+            upload.discard()
+
+
+@router.put("/documents/{doc_id}/file", openapi_extra=UPLOAD_OPENAPI)
+async def update_document_file(
+    doc_id: int,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Upload a new version of an existing document. The document keeps its id;
+    the worker re-indexes it and only embeds chunks whose text changed.
+    """
+    logger.info(f"📤 New version of document {doc_id} from user: {current_user.get('email')}")
+
+    upload = None
+    try:
+        upload = await receive_upload(request, CONTENT_TMP_DIR, MAX_FILE_SIZE, validate_filename)
+        filename = upload.filename
+        file_hash = upload.sha256
+        size = upload.size
+
+        user = db.query(User).filter(User.email == current_user["email"]).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        doc = db.query(Document).filter(
+            Document.id == doc_id,
+            Document.user_id == user.id
+        ).first()
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        if file_hash == doc.file_hash:
+            raise HTTPException(status_code=400, detail="File is identical to the current version")
+
+        existing = db.query(Document).filter(
+            Document.file_hash == file_hash,
+            Document.user_id == user.id
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="File already uploaded by this user")
+
+        job = get_job_for_document(db, doc_id)
+        if job is not None and job.status in (JOB_QUEUED, JOB_RUNNING):
+            raise HTTPException(status_code=409, detail="Document is still being processed")
+
+        new_blob = False
+        try:
+            new_blob = acquire_blob(db, file_hash, size)
+            file_path = str(store_raw_file(upload, file_hash, filename))
+            upload = None
+
+            # The old file is not needed to re-index: unchanged chunks are
+            # matched against what the collection already holds
+            old_path = Path(doc.file_path)
+            old_hash = doc.file_hash
+            old_stored = is_stored(old_path)
+            remaining = release_blob(db, old_hash) if old_stored else None
+
+            last_version = (
+                db.query(DocumentVersion.version)
+                .filter(DocumentVersion.document_id == doc.id)
+                .order_by(DocumentVersion.version.desc())
+                .first()
+            )
+            # Documents uploaded before versioning count as version 1
+            version = (last_version[0] if last_version else 1) + 1
+            db.add(DocumentVersion(
+                document_id=doc.id,
+                version=version,
+                filename=filename,
+                file_hash=file_hash,
+                size=size,
+            ))
+
+            doc.filename = filename
+            doc.file_path = file_path
+            doc.file_hash = file_hash
+            job = enqueue_reindex(db, doc, original_filename=filename, user_email=user.email)
+            db.commit()
+        except Exception as db_error:
+            if new_blob:
+                discard_new_blob(file_hash)
+            db.rollback()
+            logger.error(f"❌ DB save failed: {db_error}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
+
+        if not old_stored and old_path.exists():
+            old_path.unlink()
+        elif remaining is not None and remaining <= 0:
+            purge_blob(old_hash)
+
+        logger.info(f"🎉 Document {doc_id} is now version {version}, re-index queued")
+        return JSONResponse({
+            "message": "New version uploaded & queued for re-indexing",
+            "document_id": doc_id,
+            "version": version,
+            "filename": filename,
+            "size_kb": size // 1024,
+            "status": job.status
+        })
+
+    except HTTPException as e:
+        logger.error(f"HTTPException in version upload: {e.status_code} - {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Unexpected version upload error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload is not None:
+            upload.discard()
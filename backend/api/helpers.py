@@ -1,25 +1,235 @@
 # backend/api/helpers.py
 from typing import List, Dict, Any, Tuple
-from rag.pipeline import get_or_create_collection
-from sentence_transformers import CrossEncoder
-import torch
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import threading
+import time
+from rag.pipeline import get_or_create_collection, get_bm25_index, embed_query, normalize_query
+from rag.versions import get_collection_version
+from rag.fusion import DEFAULT_FUSION, FusionConfig, fuse
+from utils.cache import LRUCache
+from rag.inference import create_cross_encoder, get_reranker
+from utils.batching import MicroBatcher
+from utils.tracing import span
 import numpy as np
-from rank_bm25 import BM25Okapi
 
 
-# Safe GPU detection (same pattern as pipeline.py)
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"🔥 Reranker using device: {device.upper()} | GPU: {torch.cuda.get_device_name(0) if torch.cuda.is_available() else 'CPU only'}")
-# Load the re-ranker model once (global variable)
-RERANKER_MODEL = CrossEncoder("BAAI/bge-reranker-v2-m3", device=device)
+# Cross-encoder scores cached per (query hash, chunk id): follow-up questions
+# and repeated tool calls only send unseen pairs to the model
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+_rerank_score_cache = LRUCache("rerank_scores", max_entries=RERANK_CACHE_SIZE)
 
-def rerank_chunks(
+_rerank_stats_lock = threading.Lock()
+_rerank_stats = {"pairs_scored": 0, "pairs_cached": 0, "model_seconds": 0.0}
+
+# Pairs from concurrent chat requests are merged into one predict() call.
+# RERANK_BATCH_WINDOW_MS=0 sends every request to the model directly.
+RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", "10"))
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "256"))
+
+
+def _predict(pairs: List[List[str]]) -> List[float]:
+    return [float(score) for score in get_reranker().predict(pairs)]
+
+
+_rerank_batcher = (
+    MicroBatcher("rerank", _predict, max_batch_size=RERANK_MAX_BATCH, window_ms=RERANK_BATCH_WINDOW_MS)
+    if RERANK_BATCH_WINDOW_MS > 0 else None
+)
+
+
+def predict_pairs(pairs: List[List[str]]) -> List[float]:
+    """Score (query, chunk) pairs with bge-reranker, through the micro-batcher if enabled."""
+    if _rerank_batcher is None:
+        return _predict(pairs)
+    return _rerank_batcher(pairs)
+
+@dataclass(frozen=True)
+class RerankCascade:
+    """
+    Cheap stages run before the bge cross-encoder.
+
+    Candidates arrive in hybrid-score order; only the first `prefilter_top_n`
+    are kept. If `light_model` is set, a small cross-encoder then keeps its
+    `light_top_n` best, and only those survivors reach bge-reranker.
+    """
+    prefilter_top_n: int | None = 30
+    light_model: str | None = None
+    light_top_n: int = 12
+
+
+def _env_int(name: str, default: int | None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# Small cross-encoder for the optional middle stage (empty = disabled)
+LIGHT_RERANKER_MODEL = os.getenv("LIGHT_RERANKER_MODEL", "")
+
+# Per-tool cascade settings
+RERANK_CASCADES: Dict[str, RerankCascade] = {
+    "rag_search": RerankCascade(
+        prefilter_top_n=_env_int("RAG_SEARCH_RERANK_TOP_N", 30),
+        light_model=LIGHT_RERANKER_MODEL or None,
+        light_top_n=_env_int("RAG_SEARCH_LIGHT_TOP_N", 12),
+    ),
+    "rag_extract": RerankCascade(
+        prefilter_top_n=_env_int("RAG_EXTRACT_RERANK_TOP_N", 40),
+        light_model=LIGHT_RERANKER_MODEL or None,
+        light_top_n=_env_int("RAG_EXTRACT_LIGHT_TOP_N", 20),
+    ),
+}
+
+_light_rerankers: Dict[str, Any] = {}
+_light_rerankers_lock = threading.Lock()
+
+
+def get_light_reranker(model_name: str):
+    """Load a light cross-encoder on first use and keep it for the process."""
+    with _light_rerankers_lock:
+        if model_name not in _light_rerankers:
+            _light_rerankers[model_name] = create_cross_encoder(model_name)
+        return _light_rerankers[model_name]
+
+
+def apply_cascade(
     query: str,
     chunks: List[str],
     metadatas: List[Dict[str, Any]],
-    top_k: int = 6,
-    threshold: float = 0.3
+    cascade: RerankCascade,
 ) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Run the cheap cascade stages and return the survivors for the full reranker."""
+    if cascade.prefilter_top_n:
+        chunks = chunks[:cascade.prefilter_top_n]
+        metadatas = metadatas[:cascade.prefilter_top_n]
+
+    if cascade.light_model and len(chunks) > cascade.light_top_n:
+        with span("rerank.light"):
+            light_scores = get_light_reranker(cascade.light_model).predict([[query, chunk] for chunk in chunks])
+        keep = np.argsort(light_scores)[::-1][:cascade.light_top_n]
+        chunks = [chunks[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+
+    return chunks, metadatas
+
+
+# Dense and keyword retrieval run side by side for every search
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+# search() results cached per (user, normalized query, document_id, corpus
+# version): any ingest/delete bumps the version, so stale entries are never hit
+# and simply age out of the LRU
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_MAX_BYTES = int(os.getenv("RETRIEVAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _retrieval_size(value: Tuple[List[str], List[Dict[str, Any]]]) -> int:
+    """Approximate memory held by a cached (documents, metadatas) pair."""
+    docs, metas = value
+    size = sum(len(doc.encode("utf-8")) for doc in docs)
+    for meta in metas:
+        size += sum(len(str(key)) + len(str(val)) for key, val in meta.items())
+    # dict/str object overhead per result
+    return size + 200 * len(docs)
+
+
+_retrieval_cache = LRUCache(
+    "retrieval_results",
+    max_entries=RETRIEVAL_CACHE_SIZE,
+    max_bytes=RETRIEVAL_CACHE_MAX_BYTES,
+    sizeof=_retrieval_size,
+)
+
+@dataclass
+class RetrievalResult:
+    """
+    Outcome of one retrieval (search + rerank).
+
+    Chunks, metadata and reranker scores stay aligned by index, so the same
+    result feeds both the LLM context and the citations.
+    """
+    query: str
+    chunks: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    # Text handed to the LLM when nothing was retrieved (or on error)
+    message: str = "No relevant information found."
+
+    def to_context(self) -> str:
+        if not self.chunks:
+            return self.message
+        return "\n\n".join(self.chunks)
+
+    def citations(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "document_id": meta.get("document_id"),
+                "source": meta.get("filename", "unknown"),
+                "page": meta.get("page", "?"),
+                "snippet": chunk[:150] + "...",
+                "score": round(float(score), 4),
+            }
+            for chunk, meta, score in zip(self.chunks, self.metadatas, self.scores)
+        ]
+
+
+def _pair_key(query_key: str, chunk: str, meta: Dict[str, Any]) -> Tuple[str, str]:
+    chunk_id = meta.get("chunk_id") or hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+    return query_key, chunk_id
+
+
+def score_pairs(query: str, chunks: List[str], metadatas: List[Dict[str, Any]]) -> List[float]:
+    """
+    Cross-encoder relevance for each chunk, served from the score cache where
+    possible. All cache misses go to the model in a single batch.
+    """
+    query_key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    keys = [_pair_key(query_key, chunk, meta) for chunk, meta in zip(chunks, metadatas)]
+    scores = [_rerank_score_cache.get(key) for key in keys]
+
+    misses = [i for i, score in enumerate(scores) if score is None]
+    elapsed = 0.0
+    if misses:
+        start = time.perf_counter()
+        with span("rerank"):
+            predicted = predict_pairs([[query, chunks[i]] for i in misses])
+        elapsed = time.perf_counter() - start
+        for i, score in zip(misses, predicted):
+            scores[i] = float(score)
+            _rerank_score_cache.set(keys[i], scores[i])
+
+    with _rerank_stats_lock:
+        _rerank_stats["pairs_scored"] += len(misses)
+        _rerank_stats["pairs_cached"] += len(chunks) - len(misses)
+        _rerank_stats["model_seconds"] += elapsed
+
+    return scores
+
+
+def rerank_cache_stats() -> Dict[str, Any]:
+    """Hit ratio of the score cache and the model time it saved (estimated)."""
+    with _rerank_stats_lock:
+        stats = dict(_rerank_stats)
+    total = stats["pairs_scored"] + stats["pairs_cached"]
+    seconds_per_pair = stats["model_seconds"] / stats["pairs_scored"] if stats["pairs_scored"] else 0.0
+    return {
+        **stats,
+        "model_seconds": round(stats["model_seconds"], 3),
+        "hit_ratio": round(stats["pairs_cached"] / total, 4) if total else 0.0,
+        "model_seconds_saved": round(stats["pairs_cached"] * seconds_per_pair, 3),
+    }
+
+
+def rerank_with_scores(
+    query: str,
+    chunks: List[str],
+    metadatas: List[Dict[str, Any]],
+    top_k: int = 6,
+    threshold: float = 0.3,
+    cascade: RerankCascade | None = None,
+) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
     """
     Re-rank retrieved chunks using a cross-encoder for maximum relevance.
 
@@ -28,116 +238,160 @@ def rerank_chunks(
         chunks: List of raw text chunks from vector search
         metadatas: Corresponding metadata list
         top_k: How many final chunks to return
+        cascade: Optional cheap stages to shrink the candidates first
 
     Returns:
-        Tuple of (re-ranked chunks, their metadata)
+        Tuple of (re-ranked chunks, their metadata, their reranker scores)
     """
     if not chunks:
-        return [], []
+        return [], [], []
+
+    if cascade is not None:
+        chunks, metadatas = apply_cascade(query, chunks, metadatas, cascade)
 
-    # Prepare input pairs for cross-encoder: [(query, chunk1), (query, chunk2), ...]
-    pairs = [[query, chunk] for chunk in chunks]
-    
-    # get relevance scores (higher = better match)
-    scores = RERANKER_MODEL.predict(pairs)
-    
-    # log scores 
-    # print(f"🔍 Reranker scores for query '{query}':")
-    # for i, score in enumerate(scores[:5]):
-    #     print(f"  [{i}] Score: {score:.3f} - {chunks[i][:100]}...")
+    # get relevance scores for (query, chunk) pairs (higher = better match)
+    scores = score_pairs(query, chunks, metadatas)
 
     # filter by threshold before taking top_k
     relevant_indices = [i for i, score in enumerate(scores) if score >= threshold]
 
     if not relevant_indices:
         print(f"⚠️ No chunks above threshold {threshold} for query: {query}")
-        return [], []
+        return [], [], []
 
     # Sort relevant chunks by score
     sorted_relevant = sorted(relevant_indices, key=lambda i: scores[i], reverse=True)[:top_k]
 
-    # Take top_k best chunks + metadata
-    # final_chunks = [chunks[i] for i in sorted_indices[:top_k]]
+    return (
+        [chunks[i] for i in sorted_relevant],
+        [metadatas[i] for i in sorted_relevant],
+        [float(scores[i]) for i in sorted_relevant],
+    )
+
+
+def rerank_chunks(
+    query: str,
+    chunks: List[str],
+    metadatas: List[Dict[str, Any]],
+    top_k: int = 6,
+    threshold: float = 0.3,
+    cascade: RerankCascade | None = None,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Re-rank and return (chunks, metadata) only. See `rerank_with_scores`."""
+    reranked_chunks, reranked_metas, _ = rerank_with_scores(
+        query=query, chunks=chunks, metadatas=metadatas, top_k=top_k, threshold=threshold, cascade=cascade
+    )
+    return reranked_chunks, reranked_metas
+
+
+def _dense_retrieve(collection, query: str, where_clause: dict | None, n_results: int) -> Dict[str, Any]:
+    query_embedding = embed_query(query)
+    with span("retrieval.chroma_query"):
+        return collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where_clause,
+            include=["documents", "metadatas", "distances"]
+        )
 
-    
-    return [chunks[i] for i in sorted_relevant], [metadatas[i] for i in sorted_relevant]
+
+def _bm25_retrieve(bm25_index, query: str, document_id: int | None, n_results: int) -> Dict[str, float]:
+    with span("retrieval.bm25"):
+        return dict(bm25_index.query(query, n_results=n_results, document_id=document_id))
 
 
 def search(
     query: str,
     document_id: int | None = None,
     user_email: str = "",
+    fusion: FusionConfig | None = None,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Hybrid search through the retrieval cache (see `_search_uncached`).
+
+    `fusion` overrides the default fusion strategy / alpha / threshold /
+    candidate counts for this call.
+
+    Returns: (documents, metadatas) sorted by hybrid relevance
+    """
+    fusion = fusion or DEFAULT_FUSION
+    key = (user_email, normalize_query(query), document_id, fusion, get_collection_version(user_email))
+    cached = _retrieval_cache.get(key)
+    if cached is None:
+        with span("retrieval.search"):
+            cached = _search_uncached(query, document_id, user_email, fusion)
+        _retrieval_cache.set(key, cached)
+    docs, metas = cached
+    # Callers get their own lists; cached metadata dicts are shared read-only
+    return list(docs), list(metas)
+
+
+def _search_uncached(
+    query: str,
+    document_id: int | None,
+    user_email: str,
+    fusion: FusionConfig,
 ) -> Tuple[List[str], List[Dict[str, Any]]]:
     """
     Hybrid search: dense vector + BM25 keyword matching
-    
+
+    Both retrievers run in parallel as first-stage candidate generators:
+    Chroma for semantic matches and the persistent per-user BM25 index for
+    keyword matches (including chunks the vector search missed). The scores
+    are then fused by rag.fusion.
+
     Returns: (documents, metadatas) sorted by hybrid relevance
     """
     collection = get_or_create_collection(user_email)
+    bm25_index = get_bm25_index(user_email)
     where_clause = {"document_id": document_id} if document_id is not None else None
-    
-    # ── 1. Dense retrieval (vector search)
-    DENSE_CANDIDATES = 120  # enough for hybrid + reranking
-
-    results = collection.query(
-        query_texts=[query],
-        n_results=DENSE_CANDIDATES,
-        where=where_clause,
-        include=["documents", "metadatas", "distances"]
+
+    # ── 1. Dense (Chroma) and sparse (BM25 index) retrieval in parallel
+    dense_future = _RETRIEVAL_POOL.submit(_dense_retrieve, collection, query, where_clause, fusion.dense_candidates)
+    sparse_future = _RETRIEVAL_POOL.submit(
+        _bm25_retrieve, bm25_index, query, document_id, fusion.bm25_candidates
     )
+    results = dense_future.result()
+    bm25_scores = sparse_future.result()
 
+    ids = results["ids"][0] if results.get("ids") and results["ids"][0] else []
     docs = results["documents"][0] if results.get("documents") and results["documents"][0] else []
     metas = results["metadatas"][0] if results.get("metadatas") and results["metadatas"][0] else []
     distances = results["distances"][0] if results.get("distances") else []
 
-    if not docs:
-        return [], []
-    
-    # Add distance threshold for vector search
-    DISTANCE_THRESHOLD = 1.2  # Adjust based on your embedding model
-
-    filtered_docs = []
-    filtered_metas = []
-    filtered_distances = []
-
-    for doc, meta, dist in zip(docs, metas, distances):
-        if dist <= DISTANCE_THRESHOLD:
-            filtered_docs.append(doc)
-            filtered_metas.append(meta)
-            filtered_distances.append(dist)
-
-    if not filtered_docs:
-        print(f"⚠️ No documents within distance threshold {DISTANCE_THRESHOLD}")
-        return [], []        
-    
-    # ── 2. BM25 keyword scoring on dense candidates
-    tokenized_corpus = [doc.lower().split() for doc in filtered_docs]
-    bm25 = BM25Okapi(tokenized_corpus)
-
-    tokenized_query = query.lower().split() 
-    bm25_scores = bm25.get_scores(tokenized_query)
-    # 3. Simple hybrid score fusion
-    # Convert distance → similarity (higher = better)
-    vector_sim = [1.0 / (1.0 + d) for d in filtered_distances]
-
-    # Normalize both (very basic min-max to [0,1])
-    v_max = max(vector_sim) if vector_sim else 1.0
-    vector_norm = [v/ v_max if v_max > 0 else 0.5 for v in vector_sim]
-
-    b_max = max(bm25_scores) if len(bm25_scores) > 0 else 1.0
-    bm25_norm = [s / b_max if b_max > 0 else 0.5 for s in bm25_scores]
-
-    # weighted combination
-    HYBRID_ALPHA = 0.7
-    hybrid_scores = [
-        HYBRID_ALPHA * v + (1 - HYBRID_ALPHA) * b
-        for v, b in zip(vector_norm, bm25_norm)
+    # Dense hits outside the BM25 top candidates still need their keyword score
+    unscored = [
+        chunk_id for chunk_id, distance in zip(ids, distances)
+        if distance <= fusion.distance_threshold and chunk_id not in bm25_scores
     ]
+    if unscored:
+        with span("retrieval.bm25"):
+            bm25_scores.update(bm25_index.get_scores(query, document_id=document_id, chunk_ids=unscored))
+
+    # ── 2. Threshold, union with the BM25 top hits and fuse (NumPy)
+    with span("retrieval.fusion"):
+        fused = fuse(ids, distances, bm25_scores, fusion)
+    if not fused.ids:
+        print(f"⚠️ No documents within distance threshold {fusion.distance_threshold} and no keyword matches")
+        return [], []
 
-    # sort by hybrid score
-    sorted_indices = np.argsort(hybrid_scores)[::-1]
-    sorted_docs = [filtered_docs[i] for i in sorted_indices]
-    sorted_metas = [filtered_metas[i] for i in sorted_indices]
+    chunks: Dict[str, Tuple[str, Dict[str, Any]]] = {
+        chunk_id: (doc, meta) for chunk_id, doc, meta in zip(ids, docs, metas)
+    }
+    # ── 3. Fetch text for keyword-only hits
+    if fused.keyword_only:
+        with span("retrieval.chroma_get"):
+            fetched = collection.get(ids=fused.keyword_only, include=["documents", "metadatas"])
+        for chunk_id, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+            chunks[chunk_id] = (doc, meta)
+
+    sorted_docs = []
+    sorted_metas = []
+    for chunk_id in fused.ids:
+        if chunk_id in chunks:
+            doc, meta = chunks[chunk_id]
+            sorted_docs.append(doc)
+            sorted_metas.append({**meta, "chunk_id": chunk_id})
 
     return sorted_docs, sorted_metas
 
@@ -0,0 +1,146 @@
+# backend/benchmarks/bench_bm25_index.py
+"""
+BM25 first-stage retrieval benchmark.
+
+Compares the persistent inverted index (rag/bm25_index.py) with the previous
+approach of building a fresh BM25Okapi over the dense candidates on every query.
+
+Dense retrieval is simulated: each synthetic chunk belongs to a topic and the
+"dense" candidate pool is DENSE_CANDIDATES random chunks of the query's topic,
+so keyword-only hits outside that pool cannot be recovered by the old path.
+
+Query sets (the corpus vocabulary is Zipf-distributed, w0 the most common):
+    rare_terms        the 3 rarest terms of a target chunk
+    natural_language  2 rare terms of a target chunk among 4 of the most
+                      common words, like "what is the ... of the ..."
+    common_terms      "w0 w1 w2": only very common words (latency only)
+
+Usage (from backend/):
+    python -m benchmarks.bench_bm25_index --chunks 100000 --queries 200
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from rank_bm25 import BM25Okapi
+
+from benchmarks.stats import percentile
+from rag.bm25_index import BM25Index, tokenize
+
+DENSE_CANDIDATES = 120
+
+
+def build_corpus(n_chunks: int, n_topics: int, vocab_size: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    # Zipf-like weights so a few words are very common and most are rare
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    topic_words = [rng.sample(vocab, 200) for _ in range(n_topics)]
+
+    texts, topics = [], []
+    for i in range(n_chunks):
+        topic = i % n_topics
+        words = rng.choices(vocab, weights=weights, k=120) + rng.choices(topic_words[topic], k=30)
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+        topics.append(topic)
+    return texts, topics
+
+
+def make_queries(texts, n_queries: int, seed: int) -> dict:
+    """Query set name -> [(query, target chunk index or None)]."""
+    rng = random.Random(seed + 1)
+    doc_freq = {}
+    for text in texts:
+        for term in set(tokenize(text)):
+            doc_freq[term] = doc_freq.get(term, 0) + 1
+    common = sorted(doc_freq, key=doc_freq.get, reverse=True)[:20]
+
+    sets = {"rare_terms": [], "natural_language": [], "common_terms": []}
+    for target in rng.sample(range(len(texts)), n_queries):
+        rare = sorted(set(tokenize(texts[target])), key=lambda t: doc_freq[t])
+        sets["rare_terms"].append((" ".join(rare[:3]), target))
+        words = rng.sample(common, 4) + rare[:2]
+        rng.shuffle(words)
+        sets["natural_language"].append((" ".join(words), target))
+        sets["common_terms"].append((" ".join(rng.sample(common[:5], 3)), None))
+    return sets
+
+
+def latency_summary(latencies_ms) -> dict:
+    return {
+        "p50_ms": round(statistics.median(latencies_ms), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--vocab", type=int, default=30_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"📚 Generating {args.chunks} synthetic chunks...")
+    texts, topics = build_corpus(args.chunks, args.topics, args.vocab, args.seed)
+    queries = make_queries(texts, args.queries, args.seed)
+    ids = [f"chunk-{i}" for i in range(len(texts))]
+    by_topic = {}
+    for i, topic in enumerate(topics):
+        by_topic.setdefault(topic, []).append(i)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index(Path(tmp) / "bench.sqlite3")
+        start = time.perf_counter()
+        for offset in range(0, len(texts), 1000):
+            batch = slice(offset, offset + 1000)
+            index.add(ids[batch], texts[batch], [{"document_id": 1}] * len(ids[batch]))
+        build_seconds = time.perf_counter() - start
+        print(f"🗂️ Indexed in {build_seconds:.1f}s")
+
+        rng = random.Random(args.seed + 2)
+        report = {
+            "chunks": args.chunks,
+            "queries": args.queries,
+            "index_build_seconds": round(build_seconds, 2),
+        }
+        for name, query_set in queries.items():
+            index_latency, legacy_latency = [], []
+            index_hits = legacy_hits = 0
+            for query, target in query_set:
+                t0 = time.perf_counter()
+                top = index.query(query, n_results=args.k)
+                index_latency.append((time.perf_counter() - t0) * 1000)
+                if target is None:
+                    continue
+                index_hits += f"chunk-{target}" in {chunk_id for chunk_id, _ in top}
+
+                pool = rng.sample(by_topic[topics[target]], min(DENSE_CANDIDATES, len(by_topic[topics[target]])))
+                t0 = time.perf_counter()
+                bm25 = BM25Okapi([texts[i].lower().split() for i in pool])
+                scores = bm25.get_scores(query.lower().split())
+                ranked = [pool[i] for i in sorted(range(len(pool)), key=lambda i: scores[i], reverse=True)[:args.k]]
+                legacy_latency.append((time.perf_counter() - t0) * 1000)
+                legacy_hits += target in ranked
+
+            results = {"persistent_index": latency_summary(index_latency)}
+            if legacy_latency:
+                results["persistent_index"][f"recall@{args.k}"] = round(index_hits / len(query_set), 4)
+                results["rebuild_per_query"] = latency_summary(legacy_latency)
+                results["rebuild_per_query"][f"recall@{args.k}"] = round(legacy_hits / len(query_set), 4)
+            report[name] = results
+            print(f"🔎 {name}: p95 {results['persistent_index']['p95_ms']} ms")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# backend/benchmarks/bench_chat_ttft.py
+"""
+Time-to-first-token under concurrency for /api/chat (stub LLM, real retrieval).
+
+For each concurrency level, that many users ask questions at the same time;
+reports p50/p99 time-to-first-token and total request time. Each level asks
+its own questions, and the cache hits / misses it caused are reported next to
+its latencies.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_ttft --levels 1,10,50 --token-delay-ms 20
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.chat_harness import (
+    cache_counters,
+    cache_delta,
+    run_users,
+    seed_corpus,
+    start_server,
+    summarize_ms,
+)
+from benchmarks.stub_llm import StubChatModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,10,50")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--tokens", type=int, default=80)
+    parser.add_argument("--token-delay-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    seed_corpus(args.chunks)
+    start_server(StubChatModel(tokens=args.tokens, token_delay_ms=args.token_delay_ms), args.port)
+
+    report = {}
+    for users in (int(level) for level in args.levels.split(",")):
+        before = cache_counters()
+        results = asyncio.run(run_users(args.port, users, args.questions, seed=users))
+        ttft = summarize_ms([r["ttft"] for r in results])
+        total = summarize_ms([r["total"] for r in results])
+        report[f"{users}_users"] = {
+            "requests": len(results),
+            "ttft_ms": {"p50": ttft["p50"], "p99": ttft["p99"]},
+            "total_ms": {"p50": total["p50"], "p99": total["p99"]},
+            "caches": cache_delta(before, cache_counters()),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# backend/benchmarks/bench_chunking.py
+"""
+Chunking benchmark: character splitter vs token-aware splitter.
+
+Ingests the same corpus (synthetic from bench_retrieval, or --corpus/--queries)
+once per splitter configuration and reports, for each:
+
+    truncation   share of chunks longer than the embedding window, and the
+                 share of all word pieces the model never sees
+    throughput   embedding time, chunks/s and word pieces/s
+    quality      recall@k / MRR@k of the full retrieval path (bench_retrieval)
+
+Offline stand-ins are used by default; the embedder stand-in reads only the
+first EMBEDDING_MAX_TOKENS word pieces of each text, like all-MiniLM-L6-v2,
+so truncation costs recall the same way. The tokenizer must be in the local
+HF cache. --real-models uses the configured models instead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking --chars 1000 1500 --tokens 254 128
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_incremental_reindex import TimedEmbeddings
+from benchmarks.bench_retrieval import (
+    HashingEmbeddings,
+    OverlapCrossEncoder,
+    generate_corpus,
+    git_commit,
+    ingest_corpus,
+    evaluate,
+    load_queries,
+)
+
+BENCH_EMAIL = "chunking-bench@example.com"
+
+
+class WindowedEmbeddings:
+    """Embeds only the first `max_tokens` word pieces of each text (model truncation)."""
+
+    def __init__(self, inner, max_tokens: int):
+        self.inner = inner
+        self.max_tokens = max_tokens
+
+    def _window(self, text: str) -> str:
+        from rag.chunking import tokenizer_provider
+        encoded = tokenizer_provider.get()(
+            text, add_special_tokens=False, truncation=True, max_length=self.max_tokens,
+            return_offsets_mapping=True,
+        )
+        offsets = encoded["offset_mapping"]
+        return text[: offsets[-1][1]] if offsets else ""
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents([self._window(text) for text in texts])
+
+    def embed_query(self, text):
+        return self.inner.embed_query(self._window(text))
+
+
+def chunk_token_stats(user_email: str, window: int) -> dict:
+    """Token lengths of every stored chunk against the embedding window."""
+    from rag import pipeline
+    from rag.chunking import token_length
+
+    texts = pipeline.get_or_create_collection(user_email).get(include=["documents"])["documents"]
+    lengths = sorted(token_length(text) for text in texts)
+    total = sum(lengths)
+    dropped = sum(max(0, length - window) for length in lengths)
+    return {
+        "chunks": len(lengths),
+        "tokens_mean": round(total / len(lengths), 1) if lengths else 0,
+        "tokens_p95": lengths[int(0.95 * (len(lengths) - 1))] if lengths else 0,
+        "tokens_max": lengths[-1] if lengths else 0,
+        "truncated_chunks_rate": round(sum(length > window for length in lengths) / len(lengths), 4) if lengths else 0,
+        "dropped_tokens_rate": round(dropped / total, 4) if total else 0,
+        "total_tokens": total,
+        "embedded_tokens": total - dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=24, help="synthetic documents to generate")
+    parser.add_argument("--corpus", help="directory of your own documents (needs --queries)")
+    parser.add_argument("--queries", help="labeled queries JSONL for --corpus")
+    parser.add_argument("--chars", type=int, nargs="*", default=[1000], help="character chunk sizes")
+    parser.add_argument("--char-overlap", type=int, default=200)
+    parser.add_argument("--tokens", type=int, nargs="*", default=[254], help="token chunk sizes")
+    parser.add_argument("--token-overlap", type=int, default=32)
+    parser.add_argument("--rerank-threshold", type=float, default=0.3)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.corpus and not args.queries:
+        parser.error("--corpus needs --queries")
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-chunking-bench-"))
+    output = Path(args.output).resolve() if args.output else None
+    corpus = Path(args.corpus).resolve() if args.corpus else None
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.pop("CHROMA_HOST", None)
+    os.environ["WARMUP_MODELS"] = "0"
+    os.chdir(workdir)  # pipeline creates its data folders relative to the working directory
+
+    from db.database import Base, engine
+    from rag import pipeline
+    from rag.chunking import build_text_splitter, token_length
+    from rag.fusion import DEFAULT_FUSION
+    from rag.inference import EMBEDDING_MAX_TOKENS
+    from api import helpers
+
+    Base.metadata.create_all(bind=engine)
+    window = EMBEDDING_MAX_TOKENS - 2
+    if args.real_models:
+        embeddings = TimedEmbeddings(pipeline.get_embeddings())
+    else:
+        embeddings = TimedEmbeddings(WindowedEmbeddings(HashingEmbeddings(), window))
+        cross_encoder = OverlapCrossEncoder()
+        helpers.get_reranker = lambda: cross_encoder
+    pipeline.get_embeddings = lambda: embeddings
+
+    if corpus:
+        files = sorted(p for p in corpus.iterdir() if pipeline.get_loader(p) is not None)
+        queries = load_queries(args.queries)
+    else:
+        corpus_dir = workdir / "corpus"
+        queries = generate_corpus(corpus_dir, args.docs, args.seed)
+        files = sorted(corpus_dir.iterdir())
+
+    configs = [("chars", size, args.char_overlap) for size in args.chars]
+    configs += [("tokens", size, args.token_overlap) for size in args.tokens]
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "models": "real" if args.real_models else "offline-stand-ins",
+        "embedding_window_tokens": window,
+        "documents": len(files),
+        "queries": len(queries),
+        "runs": [],
+    }
+    for mode, size, overlap in configs:
+        user_email = f"{mode}-{size}-{BENCH_EMAIL}"
+        splitter = build_text_splitter(mode, size, overlap)
+        token_length.cache_clear()
+        embeddings.reset()
+        ingest = ingest_corpus(files, user_email, splitter)
+        stats = chunk_token_stats(user_email, window)
+        print(f"📥 {mode}={size}: {ingest['chunks']} chunks, "
+              f"{stats['truncated_chunks_rate']:.1%} truncated", file=sys.stderr)
+
+        embed_seconds = embeddings.seconds
+        report["runs"].append({
+            "splitter": {"mode": mode, "chunk_size": size, "overlap": overlap},
+            "truncation": stats,
+            "throughput": {
+                "ingest_seconds": ingest["seconds"],
+                "embed_seconds": round(embed_seconds, 3),
+                "chunks_per_second": round(embeddings.texts / embed_seconds, 1) if embed_seconds else None,
+                "tokens_per_second": round(stats["embedded_tokens"] / embed_seconds, 1) if embed_seconds else None,
+            },
+            "quality": evaluate(queries, user_email, DEFAULT_FUSION, args.rerank_threshold, args.k),
+        })
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        output.write_text(text, encoding="utf-8")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_fusion.py
+"""
+Hybrid fusion micro-benchmark: the old list-comprehension fusion vs rag.fusion.
+
+Generates random dense hits (ids + L2 distances) and a BM25 score dict of
+`--bm25-hits` entries, then times threshold + union + normalization + fusion +
+ordering for each strategy. No models or stores are involved.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fusion --dense 120 500 2000 --bm25-hits 5000
+"""
+import argparse
+import heapq
+import json
+import random
+import statistics
+import time
+
+import numpy as np
+
+from rag.fusion import FUSION_STRATEGIES, FusionConfig, fuse
+
+
+def legacy_fuse(ids, distances, bm25_scores, config: FusionConfig):
+    """Fusion as search() did it before rag.fusion (weighted only)."""
+    candidates = {}
+    for chunk_id, dist in zip(ids, distances):
+        if dist <= config.distance_threshold:
+            candidates[chunk_id] = 1.0 / (1.0 + dist)
+    bm25_top = heapq.nlargest(config.bm25_candidates, bm25_scores.items(), key=lambda item: item[1])
+    for chunk_id, _ in bm25_top:
+        candidates.setdefault(chunk_id, 0.0)
+
+    candidate_ids = list(candidates)
+    vector_sim = [candidates[c] for c in candidate_ids]
+    bm25 = [bm25_scores.get(c, 0.0) for c in candidate_ids]
+    v_max = max(vector_sim) if vector_sim else 1.0
+    vector_norm = [v / v_max if v_max > 0 else 0.5 for v in vector_sim]
+    b_max = max(bm25) if bm25 else 1.0
+    bm25_norm = [s / b_max if b_max > 0 else 0.5 for s in bm25]
+    hybrid = [config.alpha * v + (1 - config.alpha) * b for v, b in zip(vector_norm, bm25_norm)]
+    return [candidate_ids[i] for i in np.argsort(hybrid)[::-1]]
+
+
+def make_inputs(n_dense: int, n_bm25: int, overlap: float, rng: random.Random):
+    corpus = [f"chunk-{i}" for i in range(max(n_dense, n_bm25) * 4)]
+    dense_ids = rng.sample(corpus, n_dense)
+    distances = sorted(rng.uniform(0.4, 1.6) for _ in dense_ids)
+    shared = dense_ids[: int(n_dense * overlap)]
+    others = rng.sample([c for c in corpus if c not in set(dense_ids)], n_bm25 - len(shared))
+    bm25_scores = {chunk_id: rng.expovariate(0.3) for chunk_id in shared + others}
+    return dense_ids, distances, bm25_scores
+
+
+def timed(fn, repeats: int) -> dict:
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples), 1),
+        "p95_us": round(samples[int(0.95 * (len(samples) - 1))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dense", type=int, nargs="+", default=[120, 500, 2000])
+    parser.add_argument("--bm25-hits", type=int, default=5000)
+    parser.add_argument("--overlap", type=float, default=0.3, help="share of dense hits also matched by BM25")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = {}
+    for n_dense in args.dense:
+        ids, distances, bm25_scores = make_inputs(n_dense, args.bm25_hits, args.overlap, rng)
+        config = FusionConfig(dense_candidates=n_dense, bm25_candidates=n_dense)
+        row = {"legacy_weighted": timed(lambda: legacy_fuse(ids, distances, bm25_scores, config), args.repeats)}
+        for strategy in FUSION_STRATEGIES:
+            strategy_config = config.with_overrides(strategy=strategy)
+            row[strategy] = timed(lambda: fuse(ids, distances, bm25_scores, strategy_config), args.repeats)
+        report[f"dense={n_dense}"] = row
+
+    print(json.dumps({"bm25_hits": args.bm25_hits, "repeats": args.repeats, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# backend/benchmarks/bench_incremental_reindex.py
+"""
+Incremental re-index benchmark: edit one page of a long PDF, re-index it.
+
+Writes a `--pages` page fixture PDF (default 300), ingests it through
+process_uploaded_file into a throwaway Chroma + BM25 + SQLite store, then
+rewrites `--edit-pages` page(s) and re-indexes the same document id, like the
+PUT /api/documents/{id}/file endpoint does. A second document ingested from
+scratch from the edited file is the reference the re-indexed one must match.
+
+Reports, for the full ingest and for the re-index: wall time, time spent in
+the embedding model and the number of chunks embedded / kept / removed. With
+one edited page the re-index should embed about one page worth of chunks.
+
+Embeddings use the deterministic hashing stand-in from bench_retrieval unless
+--real-models is given (model must already be in the local HF cache).
+
+Usage (from backend/):
+    python -m benchmarks.bench_incremental_reindex --pages 300 --edit-pages 1
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_pdf_extraction import WORDS, fixture_pages, write_pdf
+
+BENCH_EMAIL = "reindex-bench@example.com"
+# Fresh ingest of the edited file, in its own collection
+REFERENCE_EMAIL = "reindex-reference@example.com"
+
+
+class TimedEmbeddings:
+    """Wraps an embedder and accounts for the texts it embeds and the time it takes."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.texts = 0
+        self.seconds = 0.0
+
+    def reset(self):
+        self.texts = 0
+        self.seconds = 0.0
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self.seconds += time.perf_counter() - start
+        self.texts += len(texts)
+        return vectors
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
+
+def chunk_texts(user_email: str, document_id: int) -> list[str]:
+    from rag import pipeline
+    result = pipeline.get_or_create_collection(user_email).get(
+        where={"document_id": document_id}, include=["documents"]
+    )
+    return sorted(result["documents"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--lines-per-page", type=int, default=45)
+    parser.add_argument("--edit-pages", type=int, default=1, help="pages rewritten in the new version")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-reindex-bench-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.pop("CHROMA_HOST", None)
+    os.environ["WARMUP_MODELS"] = "0"
+    os.chdir(workdir)  # pipeline creates its data folders relative to the working directory
+
+    from db.database import Base, SessionLocal, engine
+    from models.document import Document
+    from models.document_version import DocumentVersion
+    from models.models import User
+    from rag import pipeline
+    from utils.file_hash import compute_file_hash
+    from benchmarks.bench_retrieval import HashingEmbeddings
+
+    Base.metadata.create_all(bind=engine)
+    embeddings = TimedEmbeddings(pipeline.get_embeddings() if args.real_models else HashingEmbeddings())
+    pipeline.get_embeddings = lambda: embeddings
+
+    # Version 1, and version 2 with `edit_pages` pages rewritten
+    rng = random.Random(args.seed)
+    pages = fixture_pages(args.pages, args.lines_per_page, args.seed)
+    v1, v2 = workdir / "v1.pdf", workdir / "v2.pdf"
+    write_pdf(v1, pages)
+    edited = sorted(rng.sample(range(args.pages), args.edit_pages))
+    for page in edited:
+        pages[page] = [f"Page {page + 1} (revised)"] + [
+            " ".join(rng.choices(WORDS, k=12)) for _ in range(args.lines_per_page)
+        ]
+    write_pdf(v2, pages)
+
+    db = SessionLocal()
+    try:
+        docs = {}
+        for email, path in ((BENCH_EMAIL, v1), (REFERENCE_EMAIL, v2)):
+            user = User(email=email, name="bench", hashed_password="-")
+            db.add(user)
+            db.commit()
+            doc = Document(filename=path.name, file_hash=compute_file_hash(path.read_bytes()),
+                           file_path=str(path), user_id=user.id)
+            db.add(doc)
+            db.flush()
+            db.add(DocumentVersion(document_id=doc.id, version=1, filename=path.name,
+                                   file_hash=doc.file_hash, size=path.stat().st_size))
+            db.commit()
+            docs[email] = (doc.id, doc.file_hash)
+    finally:
+        db.close()
+
+    def ingest(path: Path, user_email: str, document_id: int, file_hash: str) -> dict:
+        embeddings.reset()
+        start = time.perf_counter()
+        pipeline.process_uploaded_file(str(path), path.name, user_email, file_hash, document_id)
+        return {
+            "seconds": round(time.perf_counter() - start, 3),
+            "embed_seconds": round(embeddings.seconds, 3),
+            "chunks_embedded": embeddings.texts,
+        }
+
+    doc_id, v1_hash = docs[BENCH_EMAIL]
+    full = ingest(v1, BENCH_EMAIL, doc_id, v1_hash)
+
+    # Upload of version 2 (what PUT /api/documents/{id}/file records)
+    v2_hash = compute_file_hash(v2.read_bytes())
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).filter(Document.id == doc_id).first()
+        doc.file_path, doc.file_hash = str(v2), v2_hash
+        db.add(DocumentVersion(document_id=doc_id, version=2, filename=v2.name,
+                               file_hash=v2_hash, size=v2.stat().st_size))
+        db.commit()
+    finally:
+        db.close()
+
+    reindex = ingest(v2, BENCH_EMAIL, doc_id, v2_hash)
+    db = SessionLocal()
+    try:
+        version = db.query(DocumentVersion).filter(
+            DocumentVersion.document_id == doc_id, DocumentVersion.version == 2
+        ).first()
+        reindex.update(version.to_dict())
+        for field in ("version", "filename", "file_hash", "size", "created_at"):
+            reindex.pop(field)
+    finally:
+        db.close()
+
+    reference_id, reference_hash = docs[REFERENCE_EMAIL]
+    ingest(v2, REFERENCE_EMAIL, reference_id, reference_hash)
+    matches_fresh_ingest = chunk_texts(BENCH_EMAIL, doc_id) == chunk_texts(REFERENCE_EMAIL, reference_id)
+
+    report = {
+        "models": "real" if args.real_models else "offline-stand-ins",
+        "pages": args.pages,
+        "edited_pages": [page + 1 for page in edited],
+        "chunks_per_page": round(full["chunks_embedded"] / args.pages, 2),
+        "full_ingest": full,
+        "reindex": reindex,
+        "embed_time_ratio": round(reindex["embed_seconds"] / full["embed_seconds"], 4) if full["embed_seconds"] else None,
+        "reindex_matches_fresh_ingest": matches_fresh_ingest,
+    }
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if matches_fresh_ingest else 1)
+
+
+if __name__ == "__main__":
+    main()
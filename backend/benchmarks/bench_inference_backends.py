@@ -0,0 +1,90 @@
+# backend/benchmarks/bench_inference_backends.py
+"""
+Inference backend benchmark and drift check (torch vs onnx vs onnx-int8).
+
+For every backend it measures embedding throughput (chunks/sec) and reranker
+throughput (pairs/sec), then compares the outputs to the torch reference:
+  - embeddings: cosine similarity per vector (min / mean)
+  - reranker:   absolute score difference (max / mean)
+A backend passes when min cosine >= 1 - vector_tol and max score diff <= score_tol.
+
+Usage (from backend/):
+    python -m benchmarks.bench_inference_backends --chunks 512 --pairs 256
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from rag.inference import load_cross_encoder, load_embeddings, RERANKER_MODEL_NAME
+
+WORDS = ("contract payment invoice schedule revenue employee policy insurance claim audit report "
+         "budget forecast quarter vendor delivery warranty liability compliance training").split()
+
+
+def make_texts(n: int, words_per_text: int, seed: int):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=words_per_text)) + "." for _ in range(n)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--pairs", type=int, default=256)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--vector-tol", type=float, default=0.02)
+    parser.add_argument("--score-tol", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = make_texts(args.chunks, 150, args.seed)
+    queries = make_texts(args.pairs, 8, args.seed + 1)
+    pairs = [[q, t] for q, t in zip(queries, random.Random(args.seed).choices(texts, k=args.pairs))]
+
+    results, reference = {}, {}
+    backends = ["torch"] + [b for b in args.backends.split(",") if b != "torch"]
+    for backend in backends:
+        embedder = load_embeddings(backend)
+        reranker = load_cross_encoder(RERANKER_MODEL_NAME, backend)
+        embedder.embed_documents(texts[:8])  # warm-up
+        reranker.predict(pairs[:8])
+
+        vectors, embed_seconds = timed(embedder.embed_documents, texts)
+        scores, rerank_seconds = timed(reranker.predict, pairs)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scores = np.asarray(scores, dtype=np.float32)
+
+        entry = {
+            "chunks_per_sec": round(len(texts) / embed_seconds, 1),
+            "pairs_per_sec": round(len(pairs) / rerank_seconds, 1),
+        }
+        if backend == "torch":
+            reference = {"vectors": vectors, "scores": scores}
+        else:
+            ref_v = reference["vectors"]
+            cosine = np.sum(ref_v * vectors, axis=1) / (
+                np.linalg.norm(ref_v, axis=1) * np.linalg.norm(vectors, axis=1)
+            )
+            diff = np.abs(reference["scores"] - scores)
+            entry.update({
+                "vector_cosine_min": round(float(cosine.min()), 5),
+                "vector_cosine_mean": round(float(cosine.mean()), 5),
+                "score_diff_max": round(float(diff.max()), 5),
+                "score_diff_mean": round(float(diff.mean()), 5),
+                "within_tolerance": bool(cosine.min() >= 1 - args.vector_tol and diff.max() <= args.score_tol),
+            })
+        results[backend] = entry
+
+    print(json.dumps({"chunks": len(texts), "pairs": len(pairs), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# backend/benchmarks/bench_pdf_extraction.py
+"""
+PDF extraction benchmark: serial pypdf vs the rag.extraction process pool.
+
+Writes a text-only fixture PDF locally (default 500 pages, no extra
+dependencies), then extracts it serially in-process — what short PDFs get —
+and through iter_pdf_pages with each worker count. Checks that every variant
+returns the same pages in the same order and reports wall time and speedup.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_extraction --pages 500 --workers 2 4 8
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from rag import extraction
+
+WORDS = ("contract payment invoice schedule revenue employee policy insurance claim audit report "
+         "budget forecast quarter vendor delivery warranty liability compliance training").split()
+
+
+def fixture_pages(pages: int, lines_per_page: int, seed: int) -> list[list[str]]:
+    """Text lines of every fixture page (random words, deterministic per seed)."""
+    rng = random.Random(seed)
+    return [
+        [f"Page {page + 1}"] + [" ".join(rng.choices(WORDS, k=12)) for _ in range(lines_per_page)]
+        for page in range(pages)
+    ]
+
+
+def write_fixture_pdf(path: Path, pages: int, lines_per_page: int, seed: int) -> None:
+    write_pdf(path, fixture_pages(pages, lines_per_page, seed))
+
+
+def write_pdf(path: Path, page_lines: list[list[str]]) -> None:
+    """Minimal PDF writer: one Helvetica text stream per page."""
+    pages = len(page_lines)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the kids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in page_lines:
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def timed(fn, repeats: int):
+    samples, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--lines-per-page", type=int, default=45)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--pages-per-task", type=int, default=extraction.PDF_PAGES_PER_TASK)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "fixture.pdf"
+        write_fixture_pdf(pdf, args.pages, args.lines_per_page, args.seed)
+        page_count = extraction.count_pdf_pages(pdf)
+
+        serial_seconds, expected = timed(lambda: extraction.extract_pdf_range(str(pdf), 0, page_count), args.repeats)
+        report = {
+            "pages": page_count,
+            "pdf_mb": round(pdf.stat().st_size / 1e6, 2),
+            "serial_seconds": round(serial_seconds, 3),
+            "parallel": {},
+        }
+
+        extraction.PDF_PAGES_PER_TASK = args.pages_per_task
+        for workers in args.workers:
+            extraction.shutdown_pool()
+            extraction.PDF_EXTRACT_WORKERS = workers
+            # Start the processes outside the timed runs (the pool is reused across ingests)
+            list(extraction.iter_pdf_pages(pdf, page_count))
+
+            seconds, pages = timed(lambda: list(extraction.iter_pdf_pages(pdf, page_count)), args.repeats)
+            report["parallel"][f"workers={workers}"] = {
+                "seconds": round(seconds, 3),
+                "speedup": round(serial_seconds / seconds, 2) if seconds else None,
+                "pages_identical_and_ordered": pages == expected,
+            }
+        extraction.shutdown_pool()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
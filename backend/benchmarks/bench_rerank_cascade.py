@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_rerank_cascade.py
+"""
+Rerank cascade benchmark: full bge rerank vs prefilter (+ optional light model).
+
+Uses a generated fixture corpus with graded labels: for each query the passage
+stating the asked fact is grade 2, other passages about the same entity grade 1,
+everything else 0. The 120 candidates are shuffled so relevant passages land
+somewhere in the first `--relevant-window` positions, mimicking an imperfect
+hybrid first stage. Reports mean nDCG@k and p50/p95 rerank latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rerank_cascade --queries 30 --light-model cross-encoder/ms-marco-MiniLM-L-6-v2
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import time
+
+# helpers imports the DB layer; any URL works since nothing is queried
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from api.helpers import RerankCascade, rerank_with_scores, _rerank_score_cache  # noqa: E402
+
+ENTITIES = ["Apollo", "Borealis", "Cascade", "Dynamo", "Everest", "Falcon", "Granite", "Harbor",
+            "Ion", "Juniper", "Keystone", "Lumen", "Meridian", "Nimbus", "Orion", "Pinnacle"]
+FACTS = {
+    "budget": ("What is the budget of the {e} project?", "The {e} project has an approved budget of {n} million dollars."),
+    "owner": ("Who leads the {e} project?", "The {e} project is led by engineer number {n} from the platform team."),
+    "deadline": ("When is the {e} project due?", "The {e} project must be delivered by week {n} of next year."),
+    "risk": ("What is the main risk for the {e} project?", "The biggest risk on {e} is vendor lock-in affecting {n} services."),
+}
+
+
+def build_fixture(seed: int):
+    rng = random.Random(seed)
+    passages = []  # (text, entity, fact)
+    for entity in ENTITIES:
+        for fact, (_, template) in FACTS.items():
+            passages.append((template.format(e=entity, n=rng.randint(2, 99)), entity, fact))
+    queries = [(FACTS[fact][0].format(e=entity), entity, fact) for entity in ENTITIES for fact in FACTS]
+    return passages, queries
+
+
+def grade(passage, entity, fact) -> int:
+    if passage[1] == entity and passage[2] == fact:
+        return 2
+    return 1 if passage[1] == entity else 0
+
+
+def ndcg(grades, all_grades, k):
+    dcg = sum((2 ** g - 1) / math.log2(i + 2) for i, g in enumerate(grades[:k]))
+    ideal = sorted(all_grades, reverse=True)
+    idcg = sum((2 ** g - 1) / math.log2(i + 2) for i, g in enumerate(ideal[:k]))
+    return dcg / idcg if idcg else 0.0
+
+
+def candidates_for(passages, entity, fact, n, window, rng):
+    relevant = [p for p in passages if p[1] == entity]
+    others = [p for p in passages if p[1] != entity]
+    pool = rng.sample(others, min(n - len(relevant), len(others)))
+    while len(pool) + len(relevant) < n:
+        pool.append(rng.choice(others))
+    for p in relevant:
+        pool.insert(rng.randrange(min(window, len(pool) + 1)), p)
+    return pool[:n]
+
+
+def run_variant(name, cascade, queries, passages, args, seed):
+    rng = random.Random(seed)
+    latencies, scores = [], []
+    for query, entity, fact in queries:
+        pool = candidates_for(passages, entity, fact, args.candidates, args.relevant_window, rng)
+        chunks = [p[0] for p in pool]
+        metas = [{"chunk_id": f"{name}-{i}-{query}"} for i in range(len(pool))]
+        _rerank_score_cache.clear()
+
+        start = time.perf_counter()
+        ranked, _, _ = rerank_with_scores(query, chunks, metas, top_k=args.k, threshold=-1e9, cascade=cascade)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        by_text = {p[0]: p for p in pool}
+        ranked_grades = [grade(by_text[c], entity, fact) for c in ranked]
+        all_grades = [grade(p, entity, fact) for p in pool]
+        scores.append(ndcg(ranked_grades, all_grades, args.k))
+    return {
+        f"ndcg@{args.k}": round(statistics.mean(scores), 4),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--candidates", type=int, default=120)
+    parser.add_argument("--relevant-window", type=int, default=40)
+    parser.add_argument("--top-n", type=int, default=30)
+    parser.add_argument("--light-model", default="")
+    parser.add_argument("--light-top-n", type=int, default=12)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    passages, queries = build_fixture(args.seed)
+    queries = random.Random(args.seed).sample(queries, min(args.queries, len(queries)))
+
+    variants = {
+        "full_rerank": None,
+        f"prefilter_top{args.top_n}": RerankCascade(prefilter_top_n=args.top_n),
+    }
+    if args.light_model:
+        variants[f"prefilter_top{args.top_n}+light_top{args.light_top_n}"] = RerankCascade(
+            prefilter_top_n=args.top_n, light_model=args.light_model, light_top_n=args.light_top_n
+        )
+
+    report = {name: run_variant(name, cascade, queries, passages, args, args.seed)
+              for name, cascade in variants.items()}
+    print(json.dumps({"queries": len(queries), "candidates": args.candidates, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# backend/benchmarks/bench_retrieval.py
+"""
+Offline retrieval-quality and latency benchmark (no network, no GPU).
+
+Generates a synthetic corpus of .txt documents with labeled questions (or loads
+your own), ingests it through process_uploaded_file into a throwaway Chroma +
+BM25 + SQLite store, then sweeps the retrieval knobs:
+
+    chunk size          (re-ingests the corpus per value)
+    dense/BM25 candidates, distance threshold, hybrid alpha, fusion strategy
+    reranker threshold
+
+For every combination it reports recall@k and MRR@k of the final reranked
+top-k, first-stage recall of the hybrid candidates, and p50/p95/p99 latency per
+stage (query embedding, hybrid search, rerank). Ingest throughput is reported
+per chunk size. Output is one JSON document, so runs can be diffed across
+commits.
+
+Embeddings and reranking use deterministic lexical stand-ins by default
+(feature-hashing embedder, token-overlap cross-encoder). Pass --real-models to
+use the configured models instead (must already be in the local HF cache).
+
+Custom corpus: --corpus DIR with .txt/.md/.pdf/.docx files and --queries
+labels.jsonl in the benchmarks.eval_fusion format ("query", "relevant").
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval --docs 40 --chunk-sizes 500 1000 --alphas 0.5 0.7 0.9 --output bench.json
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stats import percentile
+
+BENCH_EMAIL = "retrieval-bench@example.com"
+EMBEDDING_DIM = 384
+
+ENTITIES = ["Apollo", "Borealis", "Cascade", "Dynamo", "Everest", "Falcon", "Granite", "Harbor",
+            "Ion", "Juniper", "Keystone", "Lumen", "Meridian", "Nimbus", "Orion", "Pinnacle",
+            "Quasar", "Redwood", "Sierra", "Tundra", "Umbra", "Vertex", "Willow", "Zephyr"]
+FACTS = {
+    "budget": ("What is the budget of the {e} project?",
+               "The {e} project has an approved budget of {n} million dollars."),
+    "owner": ("Who leads the {e} project?",
+              "The {e} project is led by engineer number {n} from the platform team."),
+    "deadline": ("When is the {e} project due?",
+                 "The {e} project must be delivered by week {n} of next year."),
+    "risk": ("What is the main risk for the {e} project?",
+             "The biggest risk on {e} is vendor lock-in affecting {n} services."),
+}
+FILLER = ("contract payment invoice schedule revenue employee policy insurance claim audit report "
+          "budget forecast quarter vendor delivery warranty liability compliance training project "
+          "team engineer platform risk services week year million approved main").split()
+
+
+# ─── Offline model stand-ins ─────────────────────────────────────────────
+class HashingEmbeddings:
+    """Deterministic bag-of-words (+ bigrams) feature-hashing embedder."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        from rag.bm25_index import tokenize
+        tokens = tokenize(text)
+        vector = [0.0] * self.dim
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class OverlapCrossEncoder:
+    """Share of query terms present in the passage, in [0, 1] like bge-reranker."""
+
+    def predict(self, pairs, **kwargs):
+        from rag.bm25_index import tokenize
+        scores = []
+        for query, passage in pairs:
+            query_terms = set(tokenize(query))
+            passage_terms = set(tokenize(passage))
+            scores.append(len(query_terms & passage_terms) / len(query_terms) if query_terms else 0.0)
+        return scores
+
+
+# ─── Corpus ──────────────────────────────────────────────────────────────
+def generate_corpus(out_dir: Path, n_docs: int, seed: int) -> list[dict]:
+    """Write synthetic documents and return labeled queries (one per fact)."""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    facts = [(entity, fact) for entity in ENTITIES for fact in FACTS]
+    rng.shuffle(facts)
+
+    queries = []
+    paragraphs_per_doc = [[] for _ in range(n_docs)]
+    for i, (entity, fact) in enumerate(facts):
+        question, template = FACTS[fact]
+        sentence = template.format(e=entity, n=rng.randint(2, 99))
+        paragraphs_per_doc[i % n_docs].append(sentence)
+        queries.append({"query": question.format(e=entity), "relevant": [{"text": sentence}]})
+
+    for doc_index, facts_in_doc in enumerate(paragraphs_per_doc):
+        paragraphs = list(facts_in_doc)
+        paragraphs += [" ".join(rng.choices(FILLER, k=rng.randint(60, 140))).capitalize() + "."
+                       for _ in range(max(4, 3 * len(facts_in_doc)))]
+        rng.shuffle(paragraphs)
+        (out_dir / f"doc_{doc_index:03d}.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return queries
+
+
+def load_queries(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ─── Measurement helpers ─────────────────────────────────────────────────
+def percentiles_ms(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    return {f"p{p}": round(percentile(samples, p) * 1000, 3) for p in (50, 95, 99)}
+
+
+def covered_labels(chunks, metas, labels) -> int:
+    from benchmarks.eval_fusion import is_relevant
+    return sum(any(is_relevant(c, m, [label]) for c, m in zip(chunks, metas)) for label in labels)
+
+
+def first_relevant_rank(chunks, metas, labels) -> int | None:
+    from benchmarks.eval_fusion import is_relevant
+    for rank, (chunk, meta) in enumerate(zip(chunks, metas), start=1):
+        if is_relevant(chunk, meta, labels):
+            return rank
+    return None
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ─── Stages ──────────────────────────────────────────────────────────────
+def ingest_corpus(files: list[Path], user_email: str, splitter) -> dict:
+    """Ingest every file through process_uploaded_file with the given text splitter."""
+    from db.database import SessionLocal
+    from models.document import Document
+    from models.models import User
+    from rag import pipeline
+    from utils.file_hash import compute_file_hash
+
+    pipeline.text_splitter = splitter
+
+    db = SessionLocal()
+    try:
+        user = User(email=user_email, name="bench", hashed_password="-")
+        db.add(user)
+        db.commit()
+        documents = []
+        for path in files:
+            doc = Document(filename=path.name, file_hash=compute_file_hash(path.read_bytes()),
+                           file_path=str(path), user_id=user.id)
+            db.add(doc)
+            db.commit()
+            documents.append((path, doc.id, doc.file_hash))
+    finally:
+        db.close()
+
+    per_doc = []
+    start = time.perf_counter()
+    for path, document_id, file_hash in documents:
+        doc_start = time.perf_counter()
+        pipeline.process_uploaded_file(str(path), path.name, user_email, file_hash, document_id)
+        per_doc.append(time.perf_counter() - doc_start)
+    total = time.perf_counter() - start
+
+    chunks = pipeline.get_or_create_collection(user_email).count()
+    n_bytes = sum(path.stat().st_size for path in files)
+    return {
+        "documents": len(files),
+        "chunks": chunks,
+        "seconds": round(total, 3),
+        "docs_per_second": round(len(files) / total, 2) if total else None,
+        "chunks_per_second": round(chunks / total, 1) if total else None,
+        "mb_per_second": round(n_bytes / 1e6 / total, 3) if total else None,
+        "per_document_ms": percentiles_ms(per_doc),
+    }
+
+
+def evaluate(queries: list[dict], user_email: str, fusion, rerank_threshold: float, top_k: int) -> dict:
+    """Run every query through embed → hybrid search → rerank with one setting."""
+    from api import helpers
+    from rag import pipeline
+
+    # Cold caches so latencies measure the work, not earlier configurations
+    pipeline._query_embedding_cache.clear()
+    helpers._retrieval_cache.clear()
+    helpers._rerank_score_cache.clear()
+
+    timings = {"embed": [], "search": [], "rerank": [], "total": []}
+    first_stage_recall, final_recall, reciprocal_ranks = [], [], []
+    for item in queries:
+        labels = item["relevant"]
+        start = time.perf_counter()
+        pipeline.embed_query(item["query"])
+        embedded = time.perf_counter()
+        docs, metas = helpers.search(item["query"], item.get("document_id"), user_email, fusion=fusion)
+        searched = time.perf_counter()
+        ranked, ranked_metas, _ = helpers.rerank_with_scores(
+            item["query"], docs, metas, top_k=top_k, threshold=rerank_threshold,
+            cascade=helpers.RERANK_CASCADES["rag_search"],
+        )
+        done = time.perf_counter()
+
+        timings["embed"].append(embedded - start)
+        timings["search"].append(searched - embedded)
+        timings["rerank"].append(done - searched)
+        timings["total"].append(done - start)
+
+        first_stage_recall.append(covered_labels(docs, metas, labels) / len(labels))
+        final_recall.append(covered_labels(ranked, ranked_metas, labels) / len(labels))
+        rank = first_relevant_rank(ranked, ranked_metas, labels)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    n = len(queries)
+    return {
+        f"recall@{top_k}": round(sum(final_recall) / n, 4),
+        f"mrr@{top_k}": round(sum(reciprocal_ranks) / n, 4),
+        "first_stage_recall": round(sum(first_stage_recall) / n, 4),
+        "latency_ms": {stage: percentiles_ms(samples) for stage, samples in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=24, help="synthetic documents to generate")
+    parser.add_argument("--corpus", help="directory of your own documents (needs --queries)")
+    parser.add_argument("--queries", help="labeled queries JSONL for --corpus")
+    parser.add_argument("--max-queries", type=int, default=0, help="0 = all")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[120])
+    parser.add_argument("--distance-thresholds", type=float, nargs="+", default=[1.2])
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0.7])
+    parser.add_argument("--fusions", nargs="+", default=["weighted"])
+    parser.add_argument("--rerank-thresholds", type=float, nargs="+", default=[0.3])
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.corpus and not args.queries:
+        parser.error("--corpus needs --queries")
+
+    # Everything (SQLite DB, Chroma, BM25 files) lives in a throwaway directory;
+    # pipeline creates its data folders relative to the working directory
+    workdir = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    output = Path(args.output).resolve() if args.output else None
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.pop("CHROMA_HOST", None)
+    os.environ["WARMUP_MODELS"] = "0"
+    if not args.real_models:
+        # Offline stand-ins: don't fetch the tokenizer for the truncation report
+        os.environ.setdefault("TRUNCATION_REPORT", "0")
+    os.chdir(workdir)
+
+    from db.database import Base, engine
+    from models import models, document, job, collection_version, content_blob, document_version  # noqa: F401  (register tables)
+    from rag import pipeline
+    from rag.chunking import build_text_splitter
+    from rag.fusion import DEFAULT_FUSION
+    from api import helpers
+
+    Base.metadata.create_all(bind=engine)
+    if not args.real_models:
+        embeddings = HashingEmbeddings()
+        cross_encoder = OverlapCrossEncoder()
+        pipeline.get_embeddings = lambda: embeddings
+        helpers.get_reranker = lambda: cross_encoder
+
+    if args.corpus:
+        files = sorted(p for p in Path(args.corpus).resolve().iterdir() if pipeline.get_loader(p) is not None)
+        queries = load_queries(args.queries)
+    else:
+        corpus_dir = workdir / "corpus"
+        queries = generate_corpus(corpus_dir, args.docs, args.seed)
+        files = sorted(corpus_dir.iterdir())
+    if args.max_queries:
+        queries = random.Random(args.seed).sample(queries, min(args.max_queries, len(queries)))
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "models": "real" if args.real_models else "offline-stand-ins",
+        "documents": len(files),
+        "queries": len(queries),
+        "runs": [],
+    }
+    for chunk_size in args.chunk_sizes:
+        user_email = f"{chunk_size}-{BENCH_EMAIL}"
+        splitter = build_text_splitter("chars", chunk_size, min(200, chunk_size // 5))
+        ingest = ingest_corpus(files, user_email, splitter)
+        print(f"📥 chunk_size={chunk_size}: {ingest['chunks']} chunks in {ingest['seconds']}s", file=sys.stderr)
+
+        grid = itertools.product(args.fusions, args.candidates, args.distance_thresholds, args.alphas,
+                                 args.rerank_thresholds)
+        results = []
+        for strategy, candidates, threshold, alpha, rerank_threshold in grid:
+            fusion = DEFAULT_FUSION.with_overrides(
+                strategy=strategy, alpha=alpha, distance_threshold=threshold,
+                dense_candidates=candidates, bm25_candidates=candidates,
+            )
+            results.append({
+                "params": {"fusion": strategy, "candidates": candidates, "distance_threshold": threshold,
+                           "alpha": alpha, "rerank_threshold": rerank_threshold},
+                **evaluate(queries, user_email, fusion, rerank_threshold, args.k),
+            })
+        report["runs"].append({"chunk_size": chunk_size, "ingest": ingest, "results": results})
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        output.write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_startup.py
+"""
+API cold-start benchmark.
+
+Spawns fresh interpreters and measures:
+  - import_seconds / import_rss_mb: `import main` (what a worker pays before it
+    can answer /health or /api/login)
+  - warmup_seconds / warm_rss_mb:   loading every model and client, i.e. what
+    importing main cost before model loading became lazy
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, resource, time
+start = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start
+import_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+result = {"import_seconds": import_seconds, "import_rss_mb": import_rss}
+if WARM:
+    from utils.lazy import warm_up
+    start = time.perf_counter()
+    warm_up()
+    result["warmup_seconds"] = time.perf_counter() - start
+    result["warm_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(result))
+"""
+
+
+def probe(warm: bool) -> dict:
+    env = {**os.environ, "WARMUP_MODELS": "0"}
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    out = subprocess.run(
+        [sys.executable, "-c", f"WARM = {warm}\n" + PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    lazy = [probe(warm=False) for _ in range(args.runs)]
+    warm = [probe(warm=True) for _ in range(args.runs)]
+
+    def median(rows, key):
+        return round(statistics.median(row[key] for row in rows), 2)
+
+    print(json.dumps({
+        "runs": args.runs,
+        "lazy_import": {"seconds": median(lazy, "import_seconds"), "rss_mb": median(lazy, "import_rss_mb")},
+        "import_plus_models": {
+            "seconds": round(median(warm, "import_seconds") + median(warm, "warmup_seconds"), 2),
+            "rss_mb": median(warm, "warm_rss_mb"),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_tracing.py
+"""
+Tracing overhead benchmark for utils/tracing.py.
+
+1. Raw cost of an empty span, enabled vs TRACING_ENABLED=0.
+2. End-to-end overhead on a real workload: BM25 queries against a synthetic
+   SQLite index (no models needed), each wrapped in the same number of spans a
+   chat request records (`--spans-per-request`). Every query runs once traced
+   and once untraced, in alternating order, to cancel out drift; the report flags whether the overhead is
+   under the 1% budget.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tracing --chunks 20000 --queries 300
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from rag.bm25_index import BM25Index
+from utils import tracing
+from utils.tracing import span
+
+OVERHEAD_BUDGET = 0.01
+
+
+def empty_span_ns(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench.empty"):
+            pass
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def build_index(path: Path, n_chunks: int, vocab_size: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    index = BM25Index(path)
+    for offset in range(0, n_chunks, 1000):
+        ids = [f"chunk-{i}" for i in range(offset, min(offset + 1000, n_chunks))]
+        texts = [" ".join(rng.choices(vocab, weights=weights, k=150)) for _ in ids]
+        index.add(ids, texts, [{"document_id": 1}] * len(ids))
+    queries = [" ".join(rng.sample(vocab[50:2000], 4)) for _ in range(1000)]
+    return index, queries
+
+
+def request(index: BM25Index, query: str, spans: int) -> None:
+    """One simulated request: the real work inside the outer span, plus empty stage spans."""
+    with span("bench.request"):
+        for _ in range(spans - 2):
+            with span("bench.stage"):
+                pass
+        with span("bench.bm25"):
+            index.query(query, n_results=10)
+
+
+def run(index, queries, spans: int) -> tuple[float, float]:
+    """Total (traced, untraced) seconds, alternating per query so drift and caching hit both equally."""
+    totals = {True: 0.0, False: 0.0}
+    for i, query in enumerate(queries):
+        for enabled in ((True, False) if i % 2 else (False, True)):
+            tracing.set_enabled(enabled)
+            start = time.perf_counter()
+            request(index, query, spans)
+            totals[enabled] += time.perf_counter() - start
+    return totals[True], totals[False]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--trials", type=int, default=7)
+    parser.add_argument("--spans-per-request", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    tracing.set_enabled(True)
+    span_on = empty_span_ns(200_000)
+    tracing.set_enabled(False)
+    span_off = empty_span_ns(200_000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index, queries = build_index(Path(tmp) / "bench.sqlite3", args.chunks, args.vocab, args.seed)
+        queries = queries[:args.queries]
+        run(index, queries, args.spans_per_request)  # warm-up (page cache, label children)
+
+        on, off = [], []
+        for _ in range(args.trials):
+            traced, untraced = run(index, queries, args.spans_per_request)
+            on.append(traced)
+            off.append(untraced)
+
+    overhead = statistics.median(on) / statistics.median(off) - 1
+    request_ms = statistics.median(off) / len(queries) * 1000
+    report = {
+        "empty_span_ns": {"enabled": round(span_on, 1), "disabled": round(span_off, 1)},
+        "workload": {
+            "chunks": args.chunks,
+            "queries": len(queries),
+            "spans_per_request": args.spans_per_request,
+            "request_ms_untraced": round(request_ms, 3),
+            "overhead_pct": round(overhead * 100, 3),
+            "tracing_cost_pct_estimate": round(
+                args.spans_per_request * (span_on - span_off) / 1e6 / request_ms * 100, 3
+            ),
+            "within_budget": overhead < OVERHEAD_BUDGET,
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# backend/benchmarks/bench_upload_stream.py
+"""
+Streaming upload benchmark: N parallel large uploads against the real app.
+
+Runs the FastAPI app under uvicorn in a background thread (throwaway SQLite DB
+and upload directory), then sends `--uploads` concurrent multipart uploads of
+`--size-mb` each. The client streams each body from a generator, so client
+memory stays small and the measured peak is dominated by the server.
+
+Reports upload latency percentiles, aggregate throughput, the Python heap peak
+(tracemalloc) and the process RSS growth — with streaming both should stay far
+below uploads × size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_stream --uploads 50 --size-mb 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.stats import percentile
+
+BENCH_EMAIL = "upload-bench@example.com"
+BOUNDARY = "benchboundary7d1e2f"
+BLOCK = 256 * 1024
+
+
+def multipart_body(index: int, size: int):
+    """Async generator for one multipart body with a distinct `size`-byte file."""
+    async def body():
+        yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; "
+               f"filename=\"upload_{index}.txt\"\r\nContent-Type: text/plain\r\n\r\n").encode()
+        # First block makes every file (and its hash) unique; the rest is shared
+        yield f"upload {index} {time.time_ns()}\n".encode().ljust(BLOCK, b"a")
+        block = b"lorem ipsum dolor sit amet\n" * (BLOCK // 27)
+        sent = BLOCK
+        while sent < size:
+            piece = block[: min(len(block), size - sent)]
+            sent += len(piece)
+            yield piece
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+    return body()
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="rag-upload-bench-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["WARMUP_MODELS"] = "0"
+    os.chdir(workdir)  # uploaded_files/ is created relative to the working directory
+
+    import httpx
+    import uvicorn
+    from db.database import Base, SessionLocal, engine
+    from main import app
+    from models.models import User
+    from utils.utils import create_refresh_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(User(email=BENCH_EMAIL, name="bench", hashed_password="-"))
+    db.commit()
+    db.close()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    size = int(args.size_mb * 1024 * 1024)
+    cookies = {"refresh_token": create_refresh_token({"sub": BENCH_EMAIL})}
+
+    async def upload(client, index):
+        start = time.perf_counter()
+        resp = await client.post(
+            "/api/upload",
+            content=multipart_body(index, size),
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+        return resp.status_code, time.perf_counter() - start
+
+    async def run():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", cookies=cookies, timeout=600,
+                                     limits=httpx.Limits(max_connections=args.uploads)) as client:
+            return await asyncio.gather(*(upload(client, i) for i in range(args.uploads)))
+
+    rss_before = max_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    server.should_exit = True
+
+    latencies = [seconds for status, seconds in results if status == 200]
+    report = {
+        "uploads": args.uploads,
+        "size_mb": args.size_mb,
+        "succeeded": len(latencies),
+        "failed_statuses": sorted(status for status, _ in results if status != 200),
+        "wall_seconds": round(elapsed, 2),
+        "throughput_mb_s": round(len(latencies) * args.size_mb / elapsed, 1) if elapsed else None,
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "max": round(max(latencies), 2),
+        } if latencies else {},
+        "python_heap_peak_mb": round(heap_peak / 1e6, 1),
+        "rss_growth_mb": round(max_rss_mb() - rss_before, 1),
+        "payload_total_mb": round(args.uploads * args.size_mb, 1),
+    }
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/benchmarks/chat_harness.py
+"""
+Shared setup for the in-process /api/chat benchmarks.
+
+Starts the real FastAPI app under uvicorn in a background thread with the LLM
+replaced by StubChatModel, seeds a synthetic corpus for a test user and fires
+concurrent SSE chat requests, timing first token and completion per request.
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+# A file, not :memory: — SQLite memory databases are per connection, and chat
+# requests read the corpus version from executor threads
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='rag-chat-bench-')}/bench.db")
+os.environ.setdefault("WARMUP_MODELS", "0")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from benchmarks.stats import percentile  # noqa: E402
+
+BENCH_EMAIL = "bench@example.com"
+WORDS = ("contract payment invoice schedule revenue employee policy insurance claim audit report "
+         "budget forecast quarter vendor delivery warranty liability compliance training").split()
+
+
+def summarize_ms(values):
+    return {
+        "p50": round(statistics.median(values) * 1000, 1),
+        "p95": round(percentile(values, 95) * 1000, 1),
+        "p99": round(percentile(values, 99) * 1000, 1),
+    }
+
+
+def seed_corpus(n_chunks: int, seed: int = 5) -> None:
+    """Put a synthetic document in the bench user's collection (once)."""
+    from rag.inference import get_embeddings
+    from rag.pipeline import get_or_create_collection, get_bm25_index
+
+    collection = get_or_create_collection(BENCH_EMAIL)
+    if collection.count() >= n_chunks:
+        return
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choices(WORDS, k=150)) for _ in range(n_chunks)]
+    ids = [f"bench-{i}" for i in range(n_chunks)]
+    metas = [{"document_id": 1, "filename": "bench.txt", "chunk_index": i, "page": 0, "user_email": BENCH_EMAIL}
+             for i in range(n_chunks)]
+    for start in range(0, n_chunks, 64):
+        batch = slice(start, start + 64)
+        collection.upsert(ids=ids[batch], documents=texts[batch], metadatas=metas[batch],
+                          embeddings=get_embeddings().embed_documents(texts[batch]))
+        get_bm25_index(BENCH_EMAIL).add(ids[batch], texts[batch], metas[batch])
+
+
+def start_server(stub_llm, port: int) -> uvicorn.Server:
+    import api.chat
+    from main import app
+
+    api.chat.llm = stub_llm
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def auth_cookies() -> dict:
+    from utils.utils import create_refresh_token
+    return {"refresh_token": create_refresh_token({"sub": BENCH_EMAIL})}
+
+
+async def chat_once(client: httpx.AsyncClient, question: str) -> dict:
+    """One SSE chat request; returns time to first content token and total time."""
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat", json={"message": question}) as resp:
+        async for line in resp.aiter_lines():
+            if first_token is None and line.startswith("data: ") and '"content"' in line:
+                first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return {"ttft": first_token if first_token is not None else total, "total": total}
+
+
+async def run_users(port: int, users: int, questions_per_user: int, seed: int = 0) -> list:
+    """
+    `users` concurrent users asking `questions_per_user` random questions each.
+    Use a different `seed` per run so later runs don't replay cached answers.
+    """
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", cookies=auth_cookies(),
+                                 timeout=300, limits=httpx.Limits(max_connections=users)) as client:
+        async def user(u):
+            rng = random.Random(f"{seed}:{u}")
+            return [await chat_once(client, " ".join(rng.choices(WORDS, k=6)) + "?")
+                    for _ in range(questions_per_user)]
+        per_user = await asyncio.gather(*(user(u) for u in range(users)))
+    return [result for results in per_user for result in results]
+
+
+def cache_counters() -> dict:
+    """Hit / miss counters of the server's in-process caches (it runs in this process)."""
+    from api.helpers import rerank_cache_stats
+    from utils.cache import cache_stats
+
+    counters = {name: {"hits": stats["hits"], "misses": stats["misses"]} for name, stats in cache_stats().items()}
+    reranker = rerank_cache_stats()
+    counters["rerank_scores"] = {"hits": reranker["pairs_cached"], "misses": reranker["pairs_scored"]}
+    return counters
+
+
+def cache_delta(before: dict, after: dict) -> dict:
+    """Cache hits / misses between two cache_counters() snapshots."""
+    return {
+        name: {key: value - before.get(name, {}).get(key, 0) for key, value in counters.items()}
+        for name, counters in after.items()
+    }
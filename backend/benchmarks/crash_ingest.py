@@ -0,0 +1,33 @@
+# backend/benchmarks/crash_ingest.py
+"""
+Crash-injection check for idempotent, resumable ingestion.
+
+The check itself is the pytest module tests/test_crash_ingest.py (scenario x
+crash batch); this is a command-line wrapper around it for bigger runs.
+
+Usage (from backend/):
+    python -m benchmarks.crash_ingest --pages 60 --crash-batches 1 3 5
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+TEST_MODULE = Path(__file__).resolve().parents[1] / "tests" / "test_crash_ingest.py"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--crash-batches", type=int, nargs="+", default=[1, 3, 5])
+    args, pytest_args = parser.parse_known_args()
+
+    os.environ["CRASH_TEST_PAGES"] = str(args.pages)
+    os.environ["CRASH_TEST_BATCHES"] = " ".join(str(n) for n in args.crash_batches)
+    sys.exit(pytest.main(["-q", str(TEST_MODULE), *pytest_args]))
+
+
+if __name__ == "__main__":
+    main()
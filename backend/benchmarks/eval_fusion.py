@@ -0,0 +1,118 @@
+# backend/benchmarks/eval_fusion.py
+"""
+Offline evaluation of hybrid fusion strategies on a labeled query set.
+
+Runs dense (Chroma) and BM25 retrieval once per query against an existing user
+collection, then re-fuses the same candidates with every strategy / alpha and
+reports recall@k, MRR@k and nDCG@k (binary relevance).
+
+The query set is JSONL, one object per line:
+    {"query": "What is the budget?", "document_id": 3,
+     "relevant": [{"filename": "plan.pdf", "page": 2}, {"text": "approved budget"}]}
+A retrieved chunk is relevant if its metadata matches every key of one
+`relevant` entry, or if it contains that entry's `text` (case-insensitive).
+`document_id` is optional (omit to search all documents). Recall is measured
+against the relevant chunks found by either retriever, since every strategy
+fuses the same candidate pool.
+
+Usage (from backend/, with the app's DATABASE_URL / CHROMA settings):
+    python -m benchmarks.eval_fusion --user you@example.com --queries labels.jsonl --alphas 0.5 0.7 0.9
+"""
+import argparse
+import json
+import math
+import statistics
+
+from rag.fusion import DEFAULT_FUSION, FUSION_STRATEGIES, fuse
+from rag.pipeline import get_or_create_collection, get_bm25_index, embed_query
+
+
+def is_relevant(text: str, meta: dict, labels: list) -> bool:
+    for label in labels:
+        label = dict(label)
+        needle = label.pop("text", None)
+        if needle is not None and needle.lower() not in text.lower():
+            continue
+        if all(meta.get(key) == value for key, value in label.items()):
+            return True
+    return False
+
+
+def metrics(flags: list, n_relevant: int, k: int) -> dict:
+    top = flags[:k]
+    first = next((i for i, flag in enumerate(top) if flag), None)
+    dcg = sum(1 / math.log2(i + 2) for i, flag in enumerate(top) if flag)
+    idcg = sum(1 / math.log2(i + 2) for i in range(min(n_relevant, k)))
+    return {
+        "recall": sum(top) / n_relevant if n_relevant else 0.0,
+        "mrr": 1 / (first + 1) if first is not None else 0.0,
+        "ndcg": dcg / idcg if idcg else 0.0,
+    }
+
+
+def retrieve_candidates(collection, bm25_index, item: dict, n_candidates: int):
+    """Raw first-stage output for one query: dense ids/distances, BM25 scores, chunk texts."""
+    document_id = item.get("document_id")
+    where = {"document_id": document_id} if document_id is not None else None
+    dense = collection.query(
+        query_embeddings=[embed_query(item["query"])],
+        n_results=n_candidates,
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    )
+    ids, distances = dense["ids"][0], dense["distances"][0]
+    chunks = {cid: (doc, meta) for cid, doc, meta in zip(ids, dense["documents"][0], dense["metadatas"][0])}
+
+    bm25_scores = bm25_index.get_scores(item["query"], document_id=document_id)
+    top = sorted(bm25_scores, key=bm25_scores.get, reverse=True)[:n_candidates]
+    missing = [cid for cid in top if cid not in chunks]
+    if missing:
+        fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+        chunks.update({cid: (doc, meta) for cid, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])})
+    return ids, distances, bm25_scores, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", required=True, help="owner of the collection to evaluate")
+    parser.add_argument("--queries", required=True, help="labeled query set (JSONL)")
+    parser.add_argument("--strategies", nargs="+", default=list(FUSION_STRATEGIES))
+    parser.add_argument("--alphas", type=float, nargs="+", default=[DEFAULT_FUSION.alpha])
+    parser.add_argument("--candidates", type=int, default=DEFAULT_FUSION.dense_candidates)
+    parser.add_argument("--distance-threshold", type=float, default=DEFAULT_FUSION.distance_threshold)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+
+    collection = get_or_create_collection(args.user)
+    bm25_index = get_bm25_index(args.user)
+    prepared = [(item, retrieve_candidates(collection, bm25_index, item, args.candidates)) for item in items]
+
+    report = {}
+    for strategy in args.strategies:
+        for alpha in args.alphas:
+            config = DEFAULT_FUSION.with_overrides(
+                strategy=strategy,
+                alpha=alpha,
+                distance_threshold=args.distance_threshold,
+                dense_candidates=args.candidates,
+                bm25_candidates=args.candidates,
+            )
+            per_query = []
+            for item, (ids, distances, bm25_scores, chunks) in prepared:
+                ranked = [cid for cid in fuse(ids, distances, bm25_scores, config).ids if cid in chunks]
+                flags = [is_relevant(*chunks[cid], item["relevant"]) for cid in ranked]
+                n_relevant = sum(is_relevant(doc, meta, item["relevant"]) for doc, meta in chunks.values())
+                per_query.append(metrics(flags, n_relevant, args.k))
+            report[f"{strategy}@alpha={alpha}"] = {
+                f"{name}@{args.k}": round(statistics.mean(q[name] for q in per_query), 4)
+                for name in ("recall", "mrr", "ndcg")
+            }
+
+    print(json.dumps({"queries": len(prepared), "candidates": args.candidates, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# backend/benchmarks/load_chat.py
+"""
+Concurrent /api/chat load test with a stub LLM (no Ollama needed).
+
+Each simulated user asks questions back to back; every question runs a real
+hybrid search + bge rerank. Compare runs with and without rerank
+micro-batching:
+    RERANK_BATCH_WINDOW_MS=0  python -m benchmarks.load_chat --users 50
+    RERANK_BATCH_WINDOW_MS=10 python -m benchmarks.load_chat --users 50
+Reports request latency percentiles, throughput and the micro-batch histograms.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.chat_harness import run_users, seed_corpus, start_server, summarize_ms
+from benchmarks.stub_llm import StubChatModel
+
+
+def histogram_summary(name: str) -> dict:
+    from prometheus_client import REGISTRY
+    total = count = 0.0
+    for metric in REGISTRY.collect():
+        if metric.name != name:
+            continue
+        for sample in metric.samples:
+            if sample.labels.get("batcher") != "rerank":
+                continue
+            if sample.name.endswith("_sum"):
+                total = sample.value
+            elif sample.name.endswith("_count"):
+                count = sample.value
+    return {"observations": int(count), "mean": round(total / count, 2) if count else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    seed_corpus(args.chunks)
+    start_server(StubChatModel(), args.port)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_users(args.port, args.users, args.questions))
+    wall = time.perf_counter() - start
+
+    from api.helpers import RERANK_BATCH_WINDOW_MS
+    print(json.dumps({
+        "users": args.users,
+        "requests": len(results),
+        "rerank_batch_window_ms": RERANK_BATCH_WINDOW_MS,
+        "wall_seconds": round(wall, 2),
+        "requests_per_sec": round(len(results) / wall, 2),
+        "latency_ms": summarize_ms([r["total"] for r in results]),
+        "rerank_batch_size": histogram_summary("rag_microbatch_size_items"),
+        "rerank_requests_per_batch": histogram_summary("rag_microbatch_requests"),
+        "rerank_queue_depth": histogram_summary("rag_microbatch_queue_depth"),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
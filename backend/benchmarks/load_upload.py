@@ -0,0 +1,111 @@
+# backend/benchmarks/load_upload.py
+"""
+Upload load test against a running stack (API + worker.py).
+
+Signs up / logs in a test user, uploads N distinct text files concurrently,
+then polls GET /api/documents/{id}/status until every job is done or failed.
+Reports upload latency percentiles and end-to-end ingestion time.
+
+Usage (from backend/):
+    python -m benchmarks.load_upload --base-url http://localhost:8000 --files 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stats import percentile
+
+
+def make_file(index: int, paragraphs: int) -> bytes:
+    rng = random.Random(index)
+    words = ["invoice", "contract", "revenue", "policy", "schedule", "report", "budget", "risk", "client", "audit"]
+    lines = [f"Load test document {index} ({time.time_ns()})"]
+    for p in range(paragraphs):
+        lines.append(" ".join(rng.choices(words, k=120)) + f" paragraph {p}.")
+    return "\n\n".join(lines).encode("utf-8")
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> None:
+    await client.post("/api/signup", json={"name": "Load Test", "email": email, "password": password})
+    resp = await client.post("/api/login", data={"username": email, "password": password})
+    resp.raise_for_status()
+
+
+async def upload(client: httpx.AsyncClient, index: int, paragraphs: int, latencies: list) -> int | None:
+    files = {"file": (f"load_{index}.txt", make_file(index, paragraphs), "text/plain")}
+    start = time.perf_counter()
+    resp = await client.post("/api/upload", files=files)
+    latencies.append((time.perf_counter() - start) * 1000)
+    if resp.status_code != 200:
+        print(f"⚠️ Upload {index} failed: {resp.status_code} {resp.text[:200]}")
+        return None
+    return resp.json()["document_id"]
+
+
+async def wait_for_jobs(client: httpx.AsyncClient, document_ids: list, timeout: float) -> dict:
+    pending = set(document_ids)
+    statuses = {}
+    deadline = time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        for doc_id in list(pending):
+            resp = await client.get(f"/api/documents/{doc_id}/status")
+            status = resp.json().get("status") if resp.status_code == 200 else "missing"
+            if status in {"done", "failed", "missing"}:
+                statuses[doc_id] = status
+                pending.discard(doc_id)
+        await asyncio.sleep(1.0)
+    for doc_id in pending:
+        statuses[doc_id] = "timeout"
+    return statuses
+
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.files)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        await login(client, args.email, args.password)
+
+        latencies: list = []
+        start = time.perf_counter()
+        document_ids = await asyncio.gather(*(upload(client, i, args.paragraphs, latencies) for i in range(args.files)))
+        upload_seconds = time.perf_counter() - start
+        document_ids = [doc_id for doc_id in document_ids if doc_id is not None]
+
+        statuses = await wait_for_jobs(client, document_ids, args.timeout)
+        total_seconds = time.perf_counter() - start
+
+    counts = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+
+    print(json.dumps({
+        "files": args.files,
+        "accepted": len(document_ids),
+        "upload_wall_seconds": round(upload_seconds, 2),
+        "upload_latency_ms": {
+            "p50": round(statistics.median(latencies), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+        },
+        "ingest_wall_seconds": round(total_seconds, 2),
+        "job_status": counts,
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=1800)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
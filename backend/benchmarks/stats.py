@@ -0,0 +1,8 @@
+# backend/benchmarks/stats.py
+"""Measurement helpers shared by the benchmarks."""
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (`pct` in 0-100) of a non-empty sample."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
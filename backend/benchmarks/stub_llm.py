@@ -0,0 +1,68 @@
+# backend/benchmarks/stub_llm.py
+"""
+Deterministic stand-in for ChatOllama used by the chat benchmarks.
+
+First turn: emits one rag_search tool call for the user's question.
+After a tool result: streams a fixed answer token by token with a configurable
+per-token delay, so time-to-first-token and generation time are controlled.
+"""
+import asyncio
+import json
+import time
+from typing import List
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+
+class StubChatModel:
+    def __init__(self, tokens: int = 40, token_delay_ms: float = 5.0, think_ms: float = 50.0):
+        self.tokens = tokens
+        self.token_delay = token_delay_ms / 1000.0
+        self.think = think_ms / 1000.0
+
+    def bind_tools(self, tools, **kwargs) -> "StubChatModel":
+        return self
+
+    def _wants_tool(self, messages: List) -> bool:
+        return not any(isinstance(m, ToolMessage) for m in messages)
+
+    def _tool_call_chunk(self, messages: List) -> AIMessageChunk:
+        question = messages[-1].content
+        return AIMessageChunk(
+            content="",
+            tool_call_chunks=[{
+                "name": "rag_search",
+                "args": json.dumps({"query": question, "document_id": None}),
+                "id": "call_stub_1",
+                "index": 0,
+            }],
+        )
+
+    def _answer_tokens(self) -> List[str]:
+        return [f"token{i} " for i in range(self.tokens)]
+
+    # ─── sync API ────────────────────────────────────────────────────────
+    def stream(self, messages, **kwargs):
+        time.sleep(self.think)
+        if self._wants_tool(messages):
+            yield self._tool_call_chunk(messages)
+            return
+        for token in self._answer_tokens():
+            time.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        return AIMessage(content="".join(chunk.content for chunk in self.stream(messages)))
+
+    # ─── async API ───────────────────────────────────────────────────────
+    async def astream(self, messages, **kwargs):
+        await asyncio.sleep(self.think)
+        if self._wants_tool(messages):
+            yield self._tool_call_chunk(messages)
+            return
+        for token in self._answer_tokens():
+            await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        return AIMessage(content="".join([chunk.content async for chunk in self.astream(messages)]))
@@ -1,17 +1,31 @@
 # backend/main.py
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 from db.database import engine, Base
 from api.auth import router as auth_router  # your auth router
 from api.file import router as file_router  # your upload router
 from api.chat import router as chat_router  # your chat router
 from models import models  # Ensure models are imported
+from models import job  # ingestion_jobs table
+from models import collection_version  # collection_versions table
+from models import content_blob  # content_blobs table (stored file refcounts)
+from models import document_version  # document_versions table
 from api.documents import router as documents_router
+from utils.cache import cache_stats
+from utils.lazy import warm_up_in_background, readiness
+from api.helpers import rerank_cache_stats
 import logging
+import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Load models / Chroma client in a background thread right after startup.
+# With WARMUP_MODELS=0 they load on first use instead.
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+
 app = FastAPI(title="AI Knowledge Search Engine", description="Personal RAG-powered document search and chat",
     version="1.0.0",)
 
@@ -48,6 +62,10 @@ async def startup_event():
                 logger.error(f"❌ Failed to connect to database after {max_retries} attempts: {e}")
                 raise
 
+    if WARMUP_MODELS:
+        logger.info("🔥 Warming up models in the background...")
+        warm_up_in_background()
+
 # Include routers
 app.include_router(auth_router)  # /api/signup, /api/login, /api/me, /api/refresh
 app.include_router(file_router)  # /api/upload
@@ -65,4 +83,27 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"} 
+    """Liveness: the process is up and serving requests."""
+    return {"status": "healthy"}
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: models and the Chroma client are loaded."""
+    components = readiness()
+    ready = all(component["ready"] for component in components.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "loading", "components": components},
+    )
+
+
+@app.get("/stats")
+def stats():
+    """In-process cache counters (hits, misses, evictions, hit ratio)."""
+    return {"caches": cache_stats(), "reranker": rerank_cache_stats()}
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics (stage spans, LLM timings, micro-batching, ...)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
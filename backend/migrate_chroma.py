@@ -0,0 +1,86 @@
+# backend/migrate_chroma.py
+"""
+Copy the embedded Chroma collections (chroma_data/chroma_db) into the Chroma
+server named by CHROMA_HOST / CHROMA_PORT.
+
+Deployments that predate the shared server kept every user's vectors in the
+embedded client; once CHROMA_HOST is set the API and the workers only read the
+server, so those vectors have to be moved over once. The copy is an upsert by
+chunk id, so re-running it is safe: collections already complete on the server
+are skipped.
+
+Usage (from backend/):
+    CHROMA_HOST=chroma python migrate_chroma.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import chromadb
+
+CHROMA_DIR = Path("chroma_data/chroma_db")
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+BATCH_SIZE = 1000
+CONNECT_ATTEMPTS = 30
+
+
+def connect_server():
+    """The server container may still be starting; retry for a while."""
+    for attempt in range(1, CONNECT_ATTEMPTS + 1):
+        try:
+            server = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+            server.heartbeat()
+            return server
+        except Exception as e:
+            print(f"⏳ Chroma server not reachable ({attempt}/{CONNECT_ATTEMPTS}): {e}")
+            time.sleep(2)
+    raise RuntimeError(f"Chroma server {CHROMA_HOST}:{CHROMA_PORT} not reachable")
+
+
+def migrate_collection(source, server) -> int:
+    """Upsert one collection's chunks into the server; returns the number copied."""
+    target = server.get_or_create_collection(name=source.name, metadata=source.metadata)
+    total = source.count()
+    if target.count() >= total:
+        print(f"✅ {source.name}: already on the server ({total} chunks)")
+        return 0
+
+    for offset in range(0, total, BATCH_SIZE):
+        batch = source.get(
+            offset=offset,
+            limit=BATCH_SIZE,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        target.upsert(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"],
+        )
+    print(f"📦 {source.name}: copied {total} chunks")
+    return total
+
+
+def main() -> int:
+    if not CHROMA_HOST:
+        print("⚠️ CHROMA_HOST is not set; nothing to migrate to")
+        return 1
+    if not CHROMA_DIR.exists() or not any(CHROMA_DIR.iterdir()):
+        print(f"✅ No embedded Chroma data at {CHROMA_DIR}; nothing to migrate")
+        return 0
+
+    embedded = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    server = connect_server()
+
+    copied = 0
+    for entry in embedded.list_collections():
+        name = entry if isinstance(entry, str) else entry.name
+        copied += migrate_collection(embedded.get_collection(name=name), server)
+    print(f"🎉 Migration finished: {copied} chunks copied to {CHROMA_HOST}:{CHROMA_PORT}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from db.database import Base
+from datetime import datetime
+
+
+class CollectionVersion(Base):
+    """Monotonic version of a user's indexed corpus, bumped on every ingest/delete."""
+    __tablename__ = "collection_versions"
+
+    user_email = Column(String(255), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from db.database import Base
+from datetime import datetime
+
+
+class ContentBlob(Base):
+    """
+    One file in the content-addressed store (rag/content_store.py).
+
+    `refcount` is the number of Document rows (any user) that point at it; the
+    stored file and its extraction artifacts are removed when it drops to 0.
+    """
+    __tablename__ = "content_blobs"
+
+    file_hash = Column(String(64), primary_key=True)
+    refcount = Column(Integer, nullable=False, default=0)
+    size = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from db.database import Base
+from datetime import datetime
+
+
+class DocumentVersion(Base):
+    """
+    One uploaded revision of a document. The Document row always points at
+    the latest one; re-indexing records how many chunks it could keep.
+    """
+    __tablename__ = "document_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    filename = Column(String(255), nullable=False)
+    file_hash = Column(String(64), nullable=False)
+    size = Column(Integer, nullable=False, default=0)
+
+    # Filled in by the ingestion worker
+    chunks_reused = Column(Integer, nullable=True)
+    chunks_embedded = Column(Integer, nullable=True)
+    chunks_removed = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("document_id", "version", name="uix_document_version"),
+    )
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "filename": self.filename,
+            "file_hash": self.file_hash,
+            "size": self.size,
+            "chunks_reused": self.chunks_reused,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_removed": self.chunks_removed,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
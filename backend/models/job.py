@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from db.database import Base
+from datetime import datetime
+
+# Job lifecycle: queued → running → done | failed (running jobs whose worker
+# died are put back to queued until JOB_MAX_ATTEMPTS is reached)
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, unique=True)
+    user_email = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    original_filename = Column(String(255), nullable=False)
+    file_hash = Column(String(64), nullable=False)
+
+    status = Column(String(16), nullable=False, default=JOB_QUEUED, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    pages_read = Column(Integer, nullable=False, default=0)
+    chunks_indexed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    worker = Column(String(128), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "document_id": self.document_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "pages_read": self.pages_read,
+            "chunks_indexed": self.chunks_indexed,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
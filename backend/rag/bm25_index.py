@@ -0,0 +1,234 @@
+# backend/rag/bm25_index.py
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Okapi BM25 parameters (same defaults as rank_bm25.BM25Okapi)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Query terms in more than this share of the chunks are skipped (near-zero IDF),
+# once their posting list is long enough for the scan to matter
+BM25_MAX_DF_RATIO = float(os.getenv("BM25_MAX_DF_RATIO", "0.1"))
+BM25_MAX_DF_MIN_POSTINGS = int(os.getenv("BM25_MAX_DF_MIN_POSTINGS", "1000"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Persistent inverted index for keyword retrieval over one user collection.
+
+    Postings live in a small SQLite file next to the Chroma data, so the index
+    is updated incrementally on ingest/delete instead of being rebuilt per query.
+    Corpus statistics (chunk count, total length) are kept in a `stats` table
+    so IDF and average length never require a full scan.
+    """
+
+    def __init__(self, path: Path, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._write_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    document_id INTEGER,
+                    length INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_chunks_document_id ON chunks (document_id);
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_postings_chunk_id ON postings (chunk_id);
+                CREATE TABLE IF NOT EXISTS stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stats (key, value) VALUES ('n_chunks', 0), ('total_length', 0);
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # ─── Writes ──────────────────────────────────────────────────────────
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Index a batch of chunks. Re-adding an existing chunk id replaces it."""
+        if not ids:
+            return
+        with self._write_lock, self._connect() as conn:
+            self._delete_chunks(conn, ids)
+            chunk_rows = []
+            posting_rows = []
+            for chunk_id, text, meta in zip(ids, texts, metadatas):
+                tokens = tokenize(text)
+                chunk_rows.append((chunk_id, meta.get("document_id"), len(tokens)))
+                posting_rows.extend((term, chunk_id, tf) for term, tf in Counter(tokens).items())
+
+            conn.executemany("INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)", chunk_rows)
+            conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows)
+            self._bump_stats(conn, len(chunk_rows), sum(row[2] for row in chunk_rows))
+
+    def delete_document(self, document_id: int) -> int:
+        """Remove every chunk belonging to a document. Returns the number removed."""
+        with self._write_lock, self._connect() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT chunk_id FROM chunks WHERE document_id = ?", (document_id,)
+            )]
+            self._delete_chunks(conn, ids)
+            return len(ids)
+
+    def delete_chunks(self, ids: List[str]) -> None:
+        """Remove chunks by id in one transaction."""
+        if not ids:
+            return
+        with self._write_lock, self._connect() as conn:
+            self._delete_chunks(conn, ids)
+
+    def _delete_chunks(self, conn: sqlite3.Connection, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            n, total = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})",
+                batch,
+            ).fetchone()
+            if not n:
+                continue
+            conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+            self._bump_stats(conn, -n, -total)
+
+    @staticmethod
+    def _bump_stats(conn: sqlite3.Connection, n_chunks: int, total_length: int) -> None:
+        conn.execute("UPDATE stats SET value = value + ? WHERE key = 'n_chunks'", (n_chunks,))
+        conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+
+    def mark_backfilled(self) -> None:
+        """Record that the index holds every chunk of its collection."""
+        with self._write_lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO stats (key, value) VALUES ('backfilled', 1)")
+
+    # ─── Reads ───────────────────────────────────────────────────────────
+    def is_backfilled(self) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM stats WHERE key = 'backfilled'").fetchone() is not None
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM stats WHERE key = 'n_chunks'").fetchone()[0]
+
+    def _weighted_terms(self, conn: sqlite3.Connection, query: str) -> Tuple[float, List[Tuple[str, float]]]:
+        """
+        (avgdl, [(term, query weight)]) for a query: query term frequency x IDF.
+
+        Terms found in more than BM25_MAX_DF_RATIO of the chunks ("the",
+        "what", ...) carry little IDF but cost a scan of a large share of the
+        postings, so in large collections they are skipped. A query made only
+        of such terms gets no keyword hits (dense retrieval still answers it).
+        """
+        query_terms = Counter(tokenize(query))
+        if not query_terms:
+            return 0.0, []
+        stats = dict(conn.execute("SELECT key, value FROM stats"))
+        n_chunks = stats.get("n_chunks", 0)
+        if n_chunks <= 0:
+            return 0.0, []
+        avgdl = stats.get("total_length", 0) / n_chunks or 1.0
+        max_df = max(int(BM25_MAX_DF_RATIO * n_chunks), BM25_MAX_DF_MIN_POSTINGS)
+
+        weighted = []
+        for term, qtf in query_terms.items():
+            # Counting stops past max_df, so a common term costs at most that many rows
+            df = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term = ? LIMIT ?)", (term, max_df + 1)
+            ).fetchone()[0]
+            if not df or df > max_df:
+                continue
+            # Non-negative IDF variant so very common terms never penalize a match
+            idf = math.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5))
+            weighted.append((term, qtf * idf))
+        return avgdl, weighted
+
+    def _score(
+        self,
+        query: str,
+        document_id: int | None = None,
+        chunk_ids: List[str] | None = None,
+        limit: int | None = None,
+    ) -> List[Tuple[str, float]]:
+        """Sum the per-term BM25 contributions in SQLite, best first."""
+        with self._connect() as conn:
+            avgdl, terms = self._weighted_terms(conn, query)
+            if not terms:
+                return []
+
+            values = ", ".join("(?, ?)" for _ in terms)
+            sql = (
+                f"WITH q (term, weight) AS (VALUES {values}) "
+                "SELECT p.chunk_id, SUM(q.weight * p.tf * (? + 1) / (p.tf + ? * (1 - ? + ? * c.length / ?))) AS score "
+                "FROM q JOIN postings p ON p.term = q.term JOIN chunks c ON c.chunk_id = p.chunk_id"
+            )
+            params: List[Any] = [value for term in terms for value in term]
+            params += [self.k1, self.k1, self.b, self.b, avgdl]
+            conditions = []
+            if document_id is not None:
+                conditions.append("c.document_id = ?")
+                params.append(document_id)
+            if chunk_ids is not None:
+                conditions.append(f"p.chunk_id IN ({','.join('?' * len(chunk_ids))})")
+                params.extend(chunk_ids)
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " GROUP BY p.chunk_id ORDER BY score DESC, p.chunk_id"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            return conn.execute(sql, params).fetchall()
+
+    def get_scores(
+        self, query: str, document_id: int | None = None, chunk_ids: List[str] | None = None
+    ) -> Dict[str, float]:
+        """
+        BM25 score for every chunk that contains at least one query term
+        (only the given `chunk_ids`, if set).
+
+        Chunks with no matching term are omitted (their score is 0).
+        """
+        if chunk_ids is not None and not chunk_ids:
+            return {}
+        return dict(self._score(query, document_id=document_id, chunk_ids=chunk_ids))
+
+    def query(self, query: str, n_results: int, document_id: int | None = None) -> List[Tuple[str, float]]:
+        """Top `n_results` (chunk_id, score) pairs, best first."""
+        if n_results <= 0:
+            return []
+        return self._score(query, document_id=document_id, limit=n_results)
@@ -0,0 +1,121 @@
+# backend/rag/chunking.py
+"""
+Text splitting for ingest.
+
+CHUNKING_MODE selects how chunk sizes are measured:
+  chars   - characters (CHUNK_SIZE / CHUNK_OVERLAP), the original splitter
+  tokens  - word pieces of the embedding model's own tokenizer
+            (CHUNK_TOKENS / CHUNK_TOKEN_OVERLAP)
+
+all-MiniLM-L6-v2 only reads the first EMBEDDING_MAX_TOKENS word pieces of a
+text; anything after that is silently dropped from the embedding. Token mode
+keeps every chunk inside that window. In both modes the pipeline counts the
+chunks that do not fit (`rag_chunks_truncated_total` vs `rag_chunks_total`).
+"""
+import logging
+import os
+from functools import lru_cache
+from typing import Iterable
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from prometheus_client import Counter
+
+from rag.inference import EMBEDDING_MAX_TOKENS, EMBEDDING_MODEL_NAME
+from utils.lazy import LazyProvider
+
+logger = logging.getLogger(__name__)
+
+CHUNKING_MODES = {"chars", "tokens"}
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "chars")
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# [CLS] and [SEP] take two of the model's positions
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", str(EMBEDDING_MAX_TOKENS - 2)))
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", "32"))
+# Count chunks longer than the model window (tokenizes every chunk once)
+TRUNCATION_REPORT = os.getenv("TRUNCATION_REPORT", "1") != "0"
+# Ingest runs the tokenizer for token-sized chunks or the truncation report
+TOKENIZER_NEEDED = CHUNKING_MODE == "tokens" or TRUNCATION_REPORT
+
+CHUNKS_TOTAL = Counter("rag_chunks_total", "Chunks checked against the embedding window")
+CHUNKS_TRUNCATED = Counter("rag_chunks_truncated_total", "Chunks longer than the embedding model reads")
+
+# Set once the report failed (e.g. the tokenizer could not be loaded)
+_report_disabled = False
+
+
+def _load_tokenizer():
+    # Rust-backed "fast" tokenizer, only the vocabulary files (no weights)
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME, use_fast=True)
+
+
+# Only ingest tokenizes: the worker warms it (when TOKENIZER_NEEDED), the API
+# neither loads it nor waits for it in /health/ready
+tokenizer_provider = LazyProvider("tokenizer", _load_tokenizer, register=False)
+
+
+@lru_cache(maxsize=16384)
+def token_length(text: str) -> int:
+    """
+    Word pieces in `text` (without special tokens). Cached: the recursive
+    splitter measures the same pieces repeatedly while merging them.
+    """
+    return len(tokenizer_provider.get().encode(text, add_special_tokens=False))
+
+
+def build_text_splitter(mode: str | None = None, chunk_size: int | None = None,
+                        chunk_overlap: int | None = None) -> RecursiveCharacterTextSplitter:
+    """Splitter for `mode` (default CHUNKING_MODE); sizes default to the env settings."""
+    mode = mode or CHUNKING_MODE
+    if mode not in CHUNKING_MODES:
+        raise ValueError(f"Unknown CHUNKING_MODE '{mode}'. Expected one of: {', '.join(sorted(CHUNKING_MODES))}")
+
+    if mode == "tokens":
+        # Same as RecursiveCharacterTextSplitter.from_huggingface_tokenizer,
+        # with the cached length function; the tokenizer loads on first split
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size or CHUNK_TOKENS,
+            chunk_overlap=CHUNK_TOKEN_OVERLAP if chunk_overlap is None else chunk_overlap,
+            length_function=token_length,
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+        length_function=len,
+    )
+
+
+def chunking_signature(mode: str | None = None) -> str:
+    """Identifies the configured chunking (stored artifacts are only reused when it matches)."""
+    mode = mode or CHUNKING_MODE
+    if mode == "tokens":
+        return f"tokens:{CHUNK_TOKENS}:{CHUNK_TOKEN_OVERLAP}"
+    return f"chars:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+
+
+def count_truncated(texts: Iterable[str]) -> tuple[int, int]:
+    """(chunks, chunks the embedding model would truncate); also exported to /metrics."""
+    texts = list(texts)
+    truncated = sum(token_length(text) > EMBEDDING_MAX_TOKENS - 2 for text in texts)
+    CHUNKS_TOTAL.inc(len(texts))
+    CHUNKS_TRUNCATED.inc(truncated)
+    return len(texts), truncated
+
+
+def report_truncated(texts: Iterable[str]) -> int:
+    """
+    Chunks of `texts` the embedding model would truncate, for the ingest log.
+    Best-effort: if counting fails the error is logged once and the report is
+    skipped from then on, so it never fails an ingest.
+    """
+    global _report_disabled
+    if not TRUNCATION_REPORT or _report_disabled:
+        return 0
+    try:
+        return count_truncated(texts)[1]
+    except Exception as e:
+        _report_disabled = True
+        logger.warning(f"⚠️ Truncation report disabled: {type(e).__name__}: {e}")
+        return 0
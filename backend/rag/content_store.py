@@ -0,0 +1,245 @@
+# backend/rag/content_store.py
+"""
+Content-addressed file store, shared by all users.
+
+    <CONTENT_STORE_DIR>/<hash[:2]>/<hash>/
+        raw.pdf                      the uploaded file (one copy per content)
+        pages.jsonl                  extracted page texts (any ingest config)
+        artifacts-<key>/             chunking + embedding output for one
+            chunks.jsonl             ingest configuration (model, chunking)
+            embeddings.f32           float32 vectors, one row per chunk
+            meta.json
+
+When a file whose artifacts already exist is ingested again (by any user),
+the pipeline copies chunks and embeddings into that user's collection instead
+of parsing and embedding it again. Under a new model or chunking setting it
+still skips parsing: the stored pages are split and embedded again.
+
+`content_blobs.refcount` counts the Document rows pointing at a stored file;
+the directory is removed once the last of them is deleted.
+"""
+import itertools
+import json
+import os
+import shutil
+import uuid
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from models.content_blob import ContentBlob
+
+CONTENT_STORE_DIR = Path(os.getenv("CONTENT_STORE_DIR", "uploaded_files/store"))
+CONTENT_TMP_DIR = CONTENT_STORE_DIR / "tmp"
+CONTENT_TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def blob_dir(file_hash: str) -> Path:
+    return CONTENT_STORE_DIR / file_hash[:2] / file_hash
+
+
+def is_stored(file_path: str | Path) -> bool:
+    """True if the path points into the content store (not a legacy upload)."""
+    return Path(file_path).resolve().is_relative_to(CONTENT_STORE_DIR.resolve())
+
+
+# ─── Raw files + reference counts ────────────────────────────────────────
+def store_raw_file(upload, file_hash: str, filename: str) -> Path:
+    """
+    Move a StreamedUpload (utils/upload_stream.py) into the store. If the same
+    content is already stored the upload is simply discarded.
+    """
+    target = blob_dir(file_hash) / f"raw{Path(filename).suffix.lower()}"
+    if target.exists():
+        upload.discard()
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        upload.commit(target)
+    return target
+
+
+def acquire_blob(db: Session, file_hash: str, size: int) -> bool:
+    """
+    Add one reference to a stored file. Runs in (and locks within) the
+    caller's transaction. Returns True if this is the content's first reference.
+    """
+    for _ in range(2):
+        updated = (
+            db.query(ContentBlob)
+            .filter(ContentBlob.file_hash == file_hash)
+            .update({ContentBlob.refcount: ContentBlob.refcount + 1}, synchronize_session=False)
+        )
+        if updated:
+            return False
+        try:
+            with db.begin_nested():
+                db.add(ContentBlob(file_hash=file_hash, refcount=1, size=size))
+            return True
+        except IntegrityError:
+            # Another upload created the row first: count ourselves on it
+            continue
+    raise RuntimeError(f"Could not reference stored file {file_hash}")
+
+
+def discard_new_blob(file_hash: str) -> None:
+    """
+    Remove what store_raw_file wrote for content whose first reference is
+    being rolled back. Call it before the rollback: until then the new row
+    stays locked, so no other upload can have started using the files.
+    """
+    shutil.rmtree(blob_dir(file_hash), ignore_errors=True)
+
+
+def release_blob(db: Session, file_hash: str) -> int:
+    """Drop one reference (caller commits). Returns the remaining count."""
+    db.query(ContentBlob).filter(ContentBlob.file_hash == file_hash).update(
+        {ContentBlob.refcount: ContentBlob.refcount - 1}, synchronize_session=False
+    )
+    row = db.query(ContentBlob.refcount).filter(ContentBlob.file_hash == file_hash).first()
+    return row[0] if row else 0
+
+
+def purge_blob(file_hash: str) -> bool:
+    """
+    Delete a stored file and its artifacts if nothing references it any more.
+
+    The row stays locked while the files are removed, so a concurrent upload
+    of the same content waits and then starts from a fresh entry.
+    """
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(ContentBlob)
+            .filter(ContentBlob.file_hash == file_hash, ContentBlob.refcount <= 0)
+            .with_for_update()
+            .first()
+        )
+        if row is None:
+            db.rollback()
+            return False
+        shutil.rmtree(blob_dir(file_hash), ignore_errors=True)
+        db.delete(row)
+        db.commit()
+        print(f"🗑️ Purged stored content {file_hash[:12]}")
+        return True
+    finally:
+        db.close()
+
+
+# ─── Extracted pages ─────────────────────────────────────────────────────
+def pages_path(file_hash: str) -> Path:
+    return blob_dir(file_hash) / "pages.jsonl"
+
+
+def has_pages(file_hash: str) -> bool:
+    return pages_path(file_hash).exists()
+
+
+def iter_stored_pages(file_hash: str, first_page: int = 0) -> Iterator[Tuple[int | None, str]]:
+    """Stored (page number, text) rows in order from `first_page` on."""
+    with open(pages_path(file_hash), encoding="utf-8") as f:
+        for line in itertools.islice(f, first_page, None):
+            row = json.loads(line)
+            yield row["page"], row["text"]
+
+
+class PageWriter:
+    """Streams the pages of one complete extraction and publishes them with a rename."""
+
+    def __init__(self, file_hash: str):
+        self.file_hash = file_hash
+        self.tmp = CONTENT_TMP_DIR / f"{file_hash[:12]}-{uuid.uuid4().hex[:8]}.pages.jsonl"
+        self._file = open(self.tmp, "w", encoding="utf-8")
+
+    def add_page(self, page: int | None, text: str) -> None:
+        self._file.write(json.dumps({"page": page, "text": text}) + "\n")
+
+    def commit(self) -> None:
+        self._file.close()
+        target = pages_path(self.file_hash)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Same content, same pages: a concurrent ingest publishing first is harmless
+        os.replace(self.tmp, target)
+
+    def abort(self) -> None:
+        self._file.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+# ─── Chunking / embedding artifacts ──────────────────────────────────────
+def artifact_dir(file_hash: str, key: str) -> Path:
+    return blob_dir(file_hash) / f"artifacts-{key}"
+
+
+def load_artifact_meta(file_hash: str, key: str) -> dict | None:
+    """Metadata of complete artifacts for this content + ingest config, else None."""
+    meta_path = artifact_dir(file_hash, key) / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_artifact_chunks(
+    file_hash: str, key: str, batch_size: int
+) -> Iterator[Tuple[List[str], List[int], List[List[float]]]]:
+    """Stored (texts, page numbers, embeddings) in batches, in chunk order."""
+    directory = artifact_dir(file_hash, key)
+    dim = load_artifact_meta(file_hash, key)["dim"]
+    with open(directory / "chunks.jsonl", encoding="utf-8") as chunks, open(directory / "embeddings.f32", "rb") as vectors:
+        while True:
+            rows = [json.loads(line) for _, line in zip(range(batch_size), chunks)]
+            if not rows:
+                return
+            flat = array("f")
+            flat.frombytes(vectors.read(len(rows) * dim * flat.itemsize))
+            embeddings = [flat[i * dim:(i + 1) * dim].tolist() for i in range(len(rows))]
+            yield [row["text"] for row in rows], [row["page"] for row in rows], embeddings
+
+
+class ArtifactWriter:
+    """
+    Streams chunks and embeddings of one ingest to a temp directory and
+    publishes them with a rename once the ingest succeeded.
+    """
+
+    def __init__(self, file_hash: str, key: str):
+        self.file_hash = file_hash
+        self.key = key
+        self.tmp = CONTENT_TMP_DIR / f"{file_hash[:12]}-{uuid.uuid4().hex[:8]}"
+        self.tmp.mkdir(parents=True)
+        self._chunks = open(self.tmp / "chunks.jsonl", "w", encoding="utf-8")
+        self._vectors = open(self.tmp / "embeddings.f32", "wb")
+        self.n_chunks = 0
+        self.dim = 0
+
+    def add_chunks(self, texts: List[str], pages: List[int], embeddings: List[List[float]]) -> None:
+        for text, page, vector in zip(texts, pages, embeddings):
+            self._chunks.write(json.dumps({"text": text, "page": page}) + "\n")
+            array("f", vector).tofile(self._vectors)
+            self.dim = len(vector)
+        self.n_chunks += len(texts)
+
+    def _close(self) -> None:
+        for f in (self._chunks, self._vectors):
+            f.close()
+
+    def commit(self, n_pages: int) -> None:
+        self._close()
+        with open(self.tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "pages": n_pages, "chunks": self.n_chunks, "dim": self.dim}, f)
+        target = artifact_dir(self.file_hash, self.key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(self.tmp, target)
+        except OSError:
+            # Another ingest of the same content published first
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def abort(self) -> None:
+        self._close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
@@ -0,0 +1,101 @@
+# backend/rag/extraction.py
+"""
+Parallel PDF text extraction.
+
+Page ranges of a PDF are extracted by a process pool and handed back in page
+order, so the ingest pipeline still consumes pages lazily (earlier pages are
+embedded while later ranges are being extracted). Worker functions only import
+pypdf, which keeps spawn start-up cheap.
+"""
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# Processes used per ingesting process (1 = extract in the calling thread)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages per task; PDFs shorter than two tasks are extracted serially
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that holds model threads / DB connections
+            _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=mp.get_context("spawn"))
+        return _pool
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    """Stop the extraction processes (a new pool is created on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def count_pdf_pages(path: Path) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(str(path)).pages)
+
+
+def page_text(page) -> str:
+    """Text of one pypdf page; the serial and the parallel path both use this."""
+    return page.extract_text().strip()
+
+
+def iter_pdf_range(path: str, start: int, end: int) -> Iterator[Tuple[int, str]]:
+    """Lazily yield (page index, text) for pages [start, end)."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    for i in range(start, end):
+        yield i, page_text(reader.pages[i])
+
+
+def extract_pdf_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """(page index, text) for pages [start, end). Runs in a pool process."""
+    return list(iter_pdf_range(path, start, end))
+
+
+def should_parallelize(page_count: int) -> bool:
+    return PDF_EXTRACT_WORKERS > 1 and page_count >= 2 * PDF_PAGES_PER_TASK
+
+
+def iter_pdf_pages(path: Path, page_count: int, first_page: int = 0) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page index, text) in page order, from `first_page` on. Long PDFs
+    are extracted in parallel by the pool, short ones page by page in the
+    calling thread.
+
+    At most two tasks per worker are in flight, so memory stays bounded for
+    very long PDFs.
+    """
+    if not should_parallelize(page_count):
+        yield from iter_pdf_range(str(path), first_page, page_count)
+        return
+
+    pool = _get_pool()
+    ranges = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(first_page, page_count, PDF_PAGES_PER_TASK)
+    )
+    in_flight = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < 2 * PDF_EXTRACT_WORKERS:
+                start, end = ranges.popleft()
+                in_flight.append(pool.submit(extract_pdf_range, str(path), start, end))
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
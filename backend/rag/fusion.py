@@ -0,0 +1,137 @@
+# backend/rag/fusion.py
+"""
+Hybrid score fusion for dense (Chroma) + sparse (BM25) candidates.
+
+Everything after the two first-stage retrievers happens here in NumPy: the
+distance threshold, distance → similarity conversion, union with the BM25 top
+hits, normalization, fusion and the final ordering.
+
+Strategies:
+  weighted  alpha * dense/max(dense) + (1 - alpha) * bm25/max(bm25)
+  rrf       alpha / (rrf_k + dense_rank) + (1 - alpha) / (rrf_k + bm25_rank)
+  zscore    alpha * z(dense) + (1 - alpha) * z(bm25)
+"""
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+FUSION_STRATEGIES = ("weighted", "rrf", "zscore")
+
+
+@dataclass(frozen=True)
+class FusionConfig:
+    strategy: str = "weighted"
+    alpha: float = 0.7  # weight of the dense side
+    distance_threshold: float = 1.2  # Adjust based on your embedding model
+    dense_candidates: int = 120  # enough for hybrid + reranking
+    bm25_candidates: int = 120  # keyword-only hits merged into the dense candidates
+    rrf_k: int = 60
+
+    def __post_init__(self):
+        if self.strategy not in FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy '{self.strategy}', expected one of {FUSION_STRATEGIES}")
+        if not 0.0 <= self.alpha <= 1.0:
+            raise ValueError("alpha must be between 0 and 1")
+
+    def with_overrides(self, **overrides) -> "FusionConfig":
+        """Copy with the non-None overrides applied (per-request settings)."""
+        return replace(self, **{key: value for key, value in overrides.items() if value is not None})
+
+
+DEFAULT_FUSION = FusionConfig(
+    strategy=os.getenv("HYBRID_FUSION", "weighted"),
+    alpha=float(os.getenv("HYBRID_ALPHA", "0.7")),
+    distance_threshold=float(os.getenv("HYBRID_DISTANCE_THRESHOLD", "1.2")),
+    dense_candidates=int(os.getenv("HYBRID_DENSE_CANDIDATES", "120")),
+    bm25_candidates=int(os.getenv("HYBRID_BM25_CANDIDATES", "120")),
+    rrf_k=int(os.getenv("HYBRID_RRF_K", "60")),
+)
+
+
+@dataclass
+class FusionResult:
+    ids: List[str]  # best first
+    scores: np.ndarray  # fused score per id, same order
+    keyword_only: List[str]  # ids that came only from BM25 (text not fetched yet)
+
+
+def _top_bm25(bm25_scores: Dict[str, float], n: int) -> tuple[np.ndarray, np.ndarray]:
+    if not bm25_scores or n <= 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.float64)
+    ids = np.fromiter(bm25_scores.keys(), dtype=object, count=len(bm25_scores))
+    scores = np.fromiter(bm25_scores.values(), dtype=np.float64, count=len(bm25_scores))
+    if len(scores) > n:
+        top = np.argpartition(-scores, n - 1)[:n]
+        ids, scores = ids[top], scores[top]
+    return ids, scores
+
+
+def _max_normalize(values: np.ndarray) -> np.ndarray:
+    peak = values.max() if len(values) else 0.0
+    return values / peak if peak > 0 else np.full_like(values, 0.5)
+
+
+def _ranks(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """1-based rank among present entries (best = 1); absent entries get inf."""
+    ranks = np.full(len(values), np.inf)
+    idx = np.flatnonzero(present)
+    order = idx[np.argsort(-values[idx], kind="stable")]
+    ranks[order] = np.arange(1, len(order) + 1)
+    return ranks
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def fuse(
+    dense_ids: Sequence[str],
+    dense_distances: Sequence[float],
+    bm25_scores: Dict[str, float],
+    config: FusionConfig = DEFAULT_FUSION,
+) -> FusionResult:
+    """Fuse dense hits (ids + distances) with BM25 scores into one ranking."""
+    dense_ids = np.asarray(dense_ids, dtype=object)
+    distances = np.asarray(dense_distances, dtype=np.float64)
+
+    # ── Dense hits within the distance threshold, as similarities
+    keep = distances <= config.distance_threshold
+    dense_ids = dense_ids[keep]
+    dense_sim = 1.0 / (1.0 + distances[keep])
+
+    # ── Union with the BM25 top hits
+    top_ids, top_scores = _top_bm25(bm25_scores, config.bm25_candidates)
+    in_dense = np.isin(top_ids, dense_ids) if len(dense_ids) else np.zeros(len(top_ids), dtype=bool)
+    extra_ids = top_ids[~in_dense]
+
+    ids = np.concatenate([dense_ids, extra_ids])
+    if not len(ids):
+        return FusionResult(ids=[], scores=np.empty(0), keyword_only=[])
+
+    n_dense = len(dense_ids)
+    vector = np.zeros(len(ids))
+    vector[:n_dense] = dense_sim
+    bm25 = np.zeros(len(ids))
+    bm25[:n_dense] = [bm25_scores.get(chunk_id, 0.0) for chunk_id in dense_ids]
+    bm25[n_dense:] = top_scores[~in_dense]
+
+    # ── Fusion
+    alpha = config.alpha
+    if config.strategy == "rrf":
+        dense_rank = _ranks(vector, np.arange(len(ids)) < n_dense)
+        bm25_rank = _ranks(bm25, bm25 > 0)
+        fused = alpha / (config.rrf_k + dense_rank) + (1 - alpha) / (config.rrf_k + bm25_rank)
+    elif config.strategy == "zscore":
+        fused = alpha * _zscore(vector) + (1 - alpha) * _zscore(bm25)
+    else:
+        fused = alpha * _max_normalize(vector) + (1 - alpha) * _max_normalize(bm25)
+
+    order = np.argsort(-fused, kind="stable")
+    return FusionResult(
+        ids=ids[order].tolist(),
+        scores=fused[order],
+        keyword_only=extra_ids.tolist(),
+    )
@@ -0,0 +1,136 @@
+# backend/rag/inference.py
+"""
+Model loading for the embedder and the cross-encoders.
+
+INFERENCE_BACKEND selects how models run:
+  torch      - plain PyTorch (fp32; uses CUDA when available)
+  onnx       - ONNX Runtime, fp32
+  onnx-int8  - ONNX Runtime with int8 dynamic quantization (CPU)
+
+Quantized exports are written once to ONNX_CACHE_DIR and reused afterwards.
+Models are loaded lazily through `get_embeddings()` / `get_reranker()`, so
+importing this module (and the API) does not pull in torch or any weights.
+With MODEL_SERVER_SOCKET set they return client shims for the shared model
+server instead (rag/model_server.py), and no weights are loaded in-process.
+"""
+import os
+from pathlib import Path
+
+from utils.lazy import LazyProvider
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"  # Fast & accurate (384 dims)
+# max_seq_length of the embedder: word pieces past this are not embedded
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+RERANKER_MODEL_NAME = "BAAI/bge-reranker-v2-m3"
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# Target instruction set for int8 kernels: avx2 | avx512 | avx512_vnni | arm64
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")
+ONNX_CACHE_DIR = Path(os.getenv("ONNX_CACHE_DIR", "chroma_data/onnx_models"))
+# Unix socket of the shared model server; empty = load models in this process
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+
+BACKENDS = {"torch", "onnx", "onnx-int8"}
+
+
+def get_device() -> str:
+    # safe gpu detection
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}'. Expected one of: {', '.join(sorted(BACKENDS))}")
+    return backend
+
+
+def _quantized_model(model_name: str, model_cls) -> tuple[str, str]:
+    """
+    Export `model_name` to ONNX and quantize it to int8 (once).
+    Returns (local model dir, ONNX file name inside it).
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    export_dir = ONNX_CACHE_DIR / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{ONNX_QUANTIZATION}.onnx"
+    if not (export_dir / file_name).exists():
+        print(f"⚙️ Exporting int8 ONNX model for {model_name} → {export_dir}")
+        model = model_cls(model_name, backend="onnx", device="cpu")
+        model.save_pretrained(str(export_dir))
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, str(export_dir))
+    return str(export_dir), file_name
+
+
+def load_embeddings(backend: str | None = None):
+    """The sentence-embedding model (HuggingFaceEmbeddings) used for ingest and queries."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from sentence_transformers import SentenceTransformer
+
+    backend = _check_backend(backend or INFERENCE_BACKEND)
+    device = get_device() if backend == "torch" else "cpu"
+    print(f"🔥 Embeddings backend: {backend} | device: {device.upper()}")
+
+    if backend == "torch":
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, model_kwargs={"device": device})
+    if backend == "onnx":
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL_NAME,
+            model_kwargs={"device": "cpu", "backend": "onnx"},
+        )
+
+    model_dir, file_name = _quantized_model(EMBEDDING_MODEL_NAME, SentenceTransformer)
+    return HuggingFaceEmbeddings(
+        model_name=model_dir,
+        model_kwargs={"device": "cpu", "backend": "onnx", "model_kwargs": {"file_name": file_name}},
+    )
+
+
+def load_cross_encoder(model_name: str = RERANKER_MODEL_NAME, backend: str | None = None):
+    """A sentence_transformers.CrossEncoder reranker on the configured backend."""
+    from sentence_transformers import CrossEncoder
+
+    backend = _check_backend(backend or INFERENCE_BACKEND)
+    device = get_device() if backend == "torch" else "cpu"
+    print(f"🔥 Reranker {model_name} backend: {backend} | device: {device.upper()}")
+
+    if backend == "torch":
+        return CrossEncoder(model_name, device=device)
+    if backend == "onnx":
+        return CrossEncoder(model_name, backend="onnx", device="cpu")
+
+    model_dir, file_name = _quantized_model(model_name, CrossEncoder)
+    return CrossEncoder(model_dir, backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+
+
+def _model_server_client():
+    from rag.model_client import ModelServerClient
+    return ModelServerClient(MODEL_SERVER_SOCKET)
+
+
+def _create_embeddings():
+    if MODEL_SERVER_SOCKET:
+        from rag.model_client import RemoteEmbeddings
+        return RemoteEmbeddings(_model_server_client())
+    return load_embeddings()
+
+
+def create_cross_encoder(model_name: str = RERANKER_MODEL_NAME):
+    """Local cross-encoder, or a shim for the shared model server."""
+    if MODEL_SERVER_SOCKET:
+        from rag.model_client import RemoteCrossEncoder
+        return RemoteCrossEncoder(_model_server_client(), model_name)
+    return load_cross_encoder(model_name)
+
+
+# Shared, lazily loaded instances (one per process)
+embeddings_provider = LazyProvider("embeddings", _create_embeddings)
+reranker_provider = LazyProvider("reranker", lambda: create_cross_encoder(RERANKER_MODEL_NAME))
+
+
+def get_embeddings():
+    return embeddings_provider.get()
+
+
+def get_reranker():
+    return reranker_provider.get()
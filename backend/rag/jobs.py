@@ -0,0 +1,209 @@
+# backend/rag/jobs.py
+"""
+Persistent ingestion job queue.
+
+Jobs are rows in the `ingestion_jobs` table. The API enqueues them on upload and
+the worker pool (worker.py) claims them with SELECT ... FOR UPDATE SKIP LOCKED,
+so several worker processes can poll the same table safely.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from models.document import Document
+from models.job import IngestionJob, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+# A job is retried at most this many times in total (crashes and errors)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job without a heartbeat for this long is considered crashed
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# A running job's lease is renewed this often, whether or not it made progress
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+
+
+def enqueue_ingestion(db: Session, document: Document, original_filename: str, user_email: str) -> IngestionJob:
+    """Add an ingestion job for a freshly saved document. The caller commits."""
+    job = IngestionJob(
+        document_id=document.id,
+        user_email=user_email,
+        file_path=document.file_path,
+        original_filename=original_filename,
+        file_hash=document.file_hash,
+        status=JOB_QUEUED,
+    )
+    db.add(job)
+    return job
+
+
+def enqueue_reindex(db: Session, document: Document, original_filename: str, user_email: str) -> IngestionJob:
+    """
+    Queue a re-index after the document's file was replaced. Reuses the
+    document's job row (one per document). The caller commits.
+    """
+    job = get_job_for_document(db, document.id)
+    if job is None:
+        return enqueue_ingestion(db, document, original_filename, user_email)
+
+    job.user_email = user_email
+    job.file_path = document.file_path
+    job.original_filename = original_filename
+    job.file_hash = document.file_hash
+    job.status = JOB_QUEUED
+    job.attempts = 0
+    job.pages_read = 0
+    job.chunks_indexed = 0
+    job.error = None
+    job.worker = None
+    job.started_at = None
+    job.heartbeat_at = None
+    job.finished_at = None
+    return job
+
+
+def claim_next_job(worker_id: str) -> IngestionJob | None:
+    """Atomically move the oldest queued job to running and return it (detached)."""
+    db = SessionLocal()
+    try:
+        job = (
+            db.query(IngestionJob)
+            .filter(IngestionJob.status == JOB_QUEUED)
+            .order_by(IngestionJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+
+        now = datetime.utcnow()
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.worker = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _update_job(job_id: int, **fields) -> None:
+    db = SessionLocal()
+    try:
+        db.query(IngestionJob).filter(IngestionJob.id == job_id).update(fields)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def heartbeat(job_id: int, pages_read: int, chunks_indexed: int) -> None:
+    """
+    Record the ingest checkpoint (first `pages_read` pages stored as the first
+    `chunks_indexed` chunks); also renews the job's lease.
+    """
+    _update_job(
+        job_id,
+        pages_read=pages_read,
+        chunks_indexed=chunks_indexed,
+        heartbeat_at=datetime.utcnow(),
+    )
+
+
+@contextmanager
+def hold_lease(job_id: int):
+    """
+    Renew the job's lease from a background thread while the block runs, so a
+    long step without progress (e.g. extracting a large PDF) is not mistaken
+    for a crashed worker.
+    """
+    stop = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                _update_job(job_id, heartbeat_at=datetime.utcnow())
+            except Exception as e:
+                print(f"⚠️ Lease renewal failed for job {job_id}: {e}")
+
+    thread = threading.Thread(target=renew, name=f"job-{job_id}-lease", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def mark_done(job_id: int) -> None:
+    _update_job(job_id, status=JOB_DONE, error=None, finished_at=datetime.utcnow())
+
+
+def mark_failed(job_id: int, error: str) -> None:
+    """Fail the attempt; the job goes back to the queue while attempts remain."""
+    db = SessionLocal()
+    try:
+        job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+        if job is None:
+            return
+        job.error = error[:2000]
+        if job.attempts < JOB_MAX_ATTEMPTS:
+            job.status = JOB_QUEUED
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def requeue_stale_jobs(worker_id: str | None = None) -> int:
+    """
+    Recover jobs left running by a crashed worker.
+
+    With `worker_id`, every running job of that (dead) worker is recovered
+    immediately; otherwise only jobs whose lease expired are.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(IngestionJob).filter(IngestionJob.status == JOB_RUNNING)
+        if worker_id is not None:
+            query = query.filter(IngestionJob.worker == worker_id)
+        else:
+            cutoff = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+            query = query.filter(IngestionJob.heartbeat_at < cutoff)
+
+        recovered = 0
+        for job in query.with_for_update(skip_locked=True).all():
+            job.error = f"Worker {job.worker} stopped while processing"
+            if job.attempts < JOB_MAX_ATTEMPTS:
+                job.status = JOB_QUEUED
+            else:
+                job.status = JOB_FAILED
+                job.finished_at = datetime.utcnow()
+            recovered += 1
+        db.commit()
+        return recovered
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def get_job_for_document(db: Session, document_id: int) -> IngestionJob | None:
+    return db.query(IngestionJob).filter(IngestionJob.document_id == document_id).first()
@@ -0,0 +1,93 @@
+# backend/rag/model_client.py
+"""
+Client shims for the shared model server (rag/model_server.py).
+
+RemoteEmbeddings and RemoteCrossEncoder expose the same methods the app calls
+on HuggingFaceEmbeddings and CrossEncoder, so they drop in behind
+get_embeddings() / get_reranker() when MODEL_SERVER_SOCKET is set.
+"""
+import json
+import os
+import socket
+import struct
+import threading
+from typing import Any, List
+
+import numpy as np
+
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "120"))
+
+_HEADER = struct.Struct(">I")
+
+
+class ModelServerClient:
+    """Blocking client with one Unix-socket connection per calling thread."""
+
+    def __init__(self, socket_path: str, timeout: float = MODEL_SERVER_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    @staticmethod
+    def _recv_exactly(conn: socket.socket, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            part = conn.recv(n - len(buf))
+            if not part:
+                raise ConnectionError("Model server closed the connection")
+            buf.extend(part)
+        return bytes(buf)
+
+    def call(self, payload: dict) -> Any:
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.sendall(_HEADER.pack(len(body)) + body)
+                (length,) = _HEADER.unpack(self._recv_exactly(conn, _HEADER.size))
+                response = json.loads(self._recv_exactly(conn, length))
+                break
+            except (ConnectionError, OSError):
+                # Stale connection (e.g. server restarted): reconnect once
+                self._reset()
+                if attempt == 1:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response["result"]
+
+
+class RemoteEmbeddings:
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.call({"op": "embed", "texts": list(texts)})
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class RemoteCrossEncoder:
+    def __init__(self, client: ModelServerClient, model_name: str):
+        self.client = client
+        self.model_name = model_name
+
+    def predict(self, pairs, **kwargs) -> np.ndarray:
+        pairs = [list(pair) for pair in pairs]
+        return np.asarray(self.client.call({"op": "rerank", "pairs": pairs, "model": self.model_name}), dtype=np.float32)
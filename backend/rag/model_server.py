@@ -0,0 +1,119 @@
+# backend/rag/model_server.py
+"""
+Shared inference sidecar.
+
+One process holds the embedder and the cross-encoders and serves every API /
+ingestion worker over a Unix socket, so N uvicorn workers don't load N copies
+of the models. Concurrent requests are merged by MicroBatcher into one model
+call per batch window.
+
+Run:     python -m rag.model_server
+Clients: set MODEL_SERVER_SOCKET to the same path (see rag/model_client.py)
+
+Wire format: 4-byte big-endian length + JSON body, one request per frame.
+  {"op": "embed", "texts": [...]}                     → {"result": [[float, ...], ...]}
+  {"op": "rerank", "pairs": [[q, d], ...], "model": m} → {"result": [float, ...]}
+Errors come back as {"error": "..."}.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+from pathlib import Path
+
+from rag.inference import RERANKER_MODEL_NAME, load_cross_encoder, load_embeddings
+from utils.batching import MicroBatcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("model_server")
+
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "/tmp/rag-models.sock")
+MODEL_SERVER_MAX_BATCH = int(os.getenv("MODEL_SERVER_MAX_BATCH", "128"))
+MODEL_SERVER_WINDOW_MS = float(os.getenv("MODEL_SERVER_WINDOW_MS", "5"))
+
+_HEADER = struct.Struct(">I")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def encode_frame(payload: dict) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+class ModelServer:
+    def __init__(self):
+        embeddings = load_embeddings()
+        self.embed_batcher = MicroBatcher(
+            "embed", embeddings.embed_documents, MODEL_SERVER_MAX_BATCH, MODEL_SERVER_WINDOW_MS
+        )
+        self.rerank_batchers: dict[str, MicroBatcher] = {}
+        self._rerank_lock = threading.Lock()
+        self._rerank_batcher(RERANKER_MODEL_NAME)
+
+    def _rerank_batcher(self, model_name: str) -> MicroBatcher:
+        """Batcher for a cross-encoder, loading the model on first use (blocking, runs in a thread)."""
+        batcher = self.rerank_batchers.get(model_name)
+        if batcher is not None:
+            return batcher
+        # Concurrent first requests for the same model must not load it twice
+        with self._rerank_lock:
+            if model_name not in self.rerank_batchers:
+                model = load_cross_encoder(model_name)
+                self.rerank_batchers[model_name] = MicroBatcher(
+                    f"rerank:{model_name}",
+                    lambda pairs: [float(score) for score in model.predict(pairs)],
+                    MODEL_SERVER_MAX_BATCH,
+                    MODEL_SERVER_WINDOW_MS,
+                )
+            return self.rerank_batchers[model_name]
+
+    async def handle_request(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "embed":
+            return {"result": await self.embed_batcher.submit_async(request["texts"])}
+        if op == "rerank":
+            model_name = request.get("model") or RERANKER_MODEL_NAME
+            batcher = self.rerank_batchers.get(model_name) or await asyncio.to_thread(
+                self._rerank_batcher, model_name
+            )
+            return {"result": await batcher.submit_async(request["pairs"])}
+        return {"error": f"Unknown op: {op}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    response = await self.handle_request(request)
+                except Exception as e:
+                    logger.error(f"❌ Request failed: {e}", exc_info=True)
+                    response = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(encode_frame(response))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str) -> None:
+        Path(socket_path).unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        logger.info(f"🚀 Model server listening on {socket_path}")
+        async with server:
+            await server.serve_forever()
+
+
+def main() -> None:
+    asyncio.run(ModelServer().serve(MODEL_SERVER_SOCKET))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,36 @@
 # backend/rag/pipeline.py
+import hashlib
+import itertools
 import os
-import uuid
+import threading
+from collections import deque
 from pathlib import Path
+from typing import Callable
 
-import chromadb
-# Splits long text into smaller overlapping chunks
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
-
-# FREE LOCAL EMBEDDINGS — no API key needed!
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.document_loaders import Docx2txtLoader, TextLoader
+from langchain_core.documents import Document as LCDocument
 from db.database import SessionLocal
 from models.document import Document
+from models.document_version import DocumentVersion
 from models.models import User
-import torch
-
-
-
-# safe gpu detection
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"🔥 Embeddings using device: {device.upper()} | GPU: {torch.cuda.get_device_name(0) if torch.cuda.is_available() else 'CPU only'}")
+from rag.bm25_index import BM25Index
+from rag.chunking import build_text_splitter, chunking_signature, report_truncated
+from rag.versions import bump_collection_version
+from rag.content_store import (
+    ArtifactWriter,
+    PageWriter,
+    has_pages,
+    is_stored,
+    iter_artifact_chunks,
+    iter_stored_pages,
+    load_artifact_meta,
+)
+from rag.extraction import PDF_EXTRACT_WORKERS, count_pdf_pages, iter_pdf_pages, should_parallelize
+from utils.cache import LRUCache
+# FREE LOCAL EMBEDDINGS — no API key needed! (torch or ONNX, see rag/inference.py)
+from rag.inference import get_embeddings, EMBEDDING_MAX_TOKENS, EMBEDDING_MODEL_NAME, INFERENCE_BACKEND
+from utils.lazy import LazyProvider
+from utils.tracing import span
 
 
 # =========================
@@ -29,8 +40,29 @@ print(f"🔥 Embeddings using device: {device.upper()} | GPU: {torch.cuda.get_de
 CHROMA_DIR = Path("chroma_data/chroma_db")
 CHROMA_DIR.mkdir(exist_ok=True, parents=True)  # Create folder if not exists
 
-# Persistent Chroma client (data survives server restart)
-client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+# Chroma server (shared by the API and the ingestion workers) when CHROMA_HOST
+# is set, otherwise an embedded persistent client (data survives server restart)
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+
+def _create_chroma_client():
+    import chromadb
+    if CHROMA_HOST:
+        return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    return chromadb.PersistentClient(path=str(CHROMA_DIR))
+
+# Opened on first use, not at import time
+chroma_client = LazyProvider("chroma", _create_chroma_client)
+
+# Keyword (BM25) inverted indexes, one SQLite file per user collection
+BM25_DIR = Path("chroma_data/bm25")
+BM25_DIR.mkdir(exist_ok=True, parents=True)
+
+_bm25_indexes: dict[str, BM25Index] = {}
+_bm25_lock = threading.Lock()
+
+def collection_name_for(user_email: str) -> str:
+    return f"docs_{user_email.replace('@', '_').replace('.', '_')}"
 
 def get_or_create_collection(user_email: str):
     """
@@ -38,26 +70,265 @@ def get_or_create_collection(user_email: str):
     Example:
       k@gmail.com → docs_k_gmail_com
     """
-    collection_name = f"docs_{user_email.replace('@', '_').replace('.', '_')}"
+    collection_name = collection_name_for(user_email)
     try:
-        return client.get_collection(name=collection_name)
+        return chroma_client.get().get_collection(name=collection_name)
     except:
-        return client.create_collection(name=collection_name)
+        return chroma_client.get().create_collection(name=collection_name)
 
-# HuggingFace Embeddings 
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",  # Fast & accurate (384 dims)
-    model_kwargs={'device': device},  
-)
+def get_bm25_index(user_email: str) -> BM25Index:
+    """
+    Persistent BM25 index paired with the user's Chroma collection.
+    Collections that predate the index are backfilled from Chroma until a
+    backfill completes (an interrupted one is simply run again).
+    """
+    collection_name = collection_name_for(user_email)
+    index = _bm25_indexes.get(collection_name)
+    if index is not None:
+        return index
+
+    with _bm25_lock:
+        if collection_name not in _bm25_indexes:
+            _bm25_indexes[collection_name] = _open_bm25_index(user_email, collection_name)
+    return _bm25_indexes[collection_name]
 
-# Splits text into chunks of 1000 characters
-# with 200-character overlap to preserve context
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    length_function=len,
+def _open_bm25_index(user_email: str, collection_name: str) -> BM25Index:
+    index = BM25Index(BM25_DIR / f"{collection_name}.sqlite3")
+
+    # The marker is written last: a crash mid-backfill leaves it unset and the
+    # next open starts over (re-adding a chunk id replaces it)
+    if not index.is_backfilled():
+        collection = get_or_create_collection(user_email)
+        total = collection.count()
+        for offset in range(0, total, 1000):
+            batch = collection.get(offset=offset, limit=1000, include=["documents", "metadatas"])
+            index.add(batch["ids"], batch["documents"], batch["metadatas"])
+        index.mark_backfilled()
+        if total:
+            print(f"🔎 Backfilled BM25 index for {collection_name} ({total} chunks)")
+    return index
+
+def delete_document_chunks(user_email: str, document_id: int) -> None:
+    """Remove a document's chunks from both the vector store and the BM25 index."""
+    collection = get_or_create_collection(user_email)
+    result = collection.delete(where={"document_id": document_id})
+    print(f"🗑️ Deleted {len(result) if result else 0} chunks from Chroma for doc {document_id}")
+
+    removed = get_bm25_index(user_email).delete_document(document_id)
+    print(f"🗑️ Removed {removed} chunks from BM25 index for doc {document_id}")
+
+    # Invalidates every cache keyed on this user's corpus
+    bump_collection_version(user_email)
+
+# Query embeddings are cached by normalized text: repeated questions and tool
+# calls skip the model, and queries use the same model as ingest
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+_query_embedding_cache = LRUCache(
+    "query_embeddings",
+    max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL,
 )
 
+def normalize_query(query: str) -> str:
+    # all-MiniLM-L6-v2 is uncased, so lowercasing does not change the vector
+    return " ".join(query.split()).lower()
+
+def embed_query(query: str) -> list[float]:
+    """Embed a search query with the ingest model, through the LRU cache."""
+    key = normalize_query(query)
+    vector = _query_embedding_cache.get(key)
+    if vector is None:
+        with span("retrieval.embed_query"):
+            vector = get_embeddings().embed_query(key)
+        _query_embedding_cache.set(key, vector)
+    return vector
+
+# Splits text into overlapping chunks to preserve context: 1000 characters
+# with 200 overlap by default, or sized in model tokens (rag/chunking.py)
+text_splitter = build_text_splitter()
+
+
+def artifact_key() -> str:
+    """
+    Identifies the ingest configuration stored artifacts were produced with:
+    chunks/embeddings are only reused when model and chunking match.
+    """
+    config = f"{EMBEDDING_MODEL_NAME}|{INFERENCE_BACKEND}|{chunking_signature()}"
+    return hashlib.sha1(config.encode("utf-8")).hexdigest()[:16]
+
+# Chunks are embedded and written to Chroma in batches of this size, so peak
+# memory is one page plus one batch regardless of the document size
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Called after every stored batch with the checkpoint (pages, chunks): the
+# first `pages` pages are stored as the first `chunks` chunks
+ProgressCallback = Callable[[int, int], None]
+
+
+class PdfLoader:
+    """
+    Page-by-page pypdf loader. Long PDFs are extracted by the rag.extraction
+    process pool, short ones in this thread, with the same page text function.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+
+    def lazy_load(self, first_page: int = 0):
+        page_count = count_pdf_pages(self.file_path)
+        if should_parallelize(page_count):
+            print(f"⚡ Extracting {page_count - first_page} PDF pages with {PDF_EXTRACT_WORKERS} processes")
+        for index, text in iter_pdf_pages(self.file_path, page_count, first_page):
+            # Same metadata PyPDFLoader sets (0-based page index)
+            yield LCDocument(
+                page_content=text,
+                metadata={"source": str(self.file_path), "page": index, "total_pages": page_count},
+            )
+
+
+class StoredPagesLoader:
+    """Pages extracted earlier from the same content (rag.content_store); nothing is parsed."""
+
+    def __init__(self, file_path: Path, file_hash: str):
+        self.file_path = file_path
+        self.file_hash = file_hash
+
+    def lazy_load(self, first_page: int = 0):
+        print(f"♻️ Reading stored pages of {self.file_hash[:12]} (no extraction)")
+        for index, text in iter_stored_pages(self.file_hash, first_page):
+            metadata = {"source": str(self.file_path)}
+            if index is not None:
+                metadata["page"] = index
+            yield LCDocument(page_content=text, metadata=metadata)
+
+
+def get_loader(file_path: Path):
+    """Pick the loader for a file, or None if the type is unsupported."""
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        print("📄 Extracting PDF...")
+        return PdfLoader(file_path)
+    if suffix in {".docx", ".doc"}:
+        print("📝 Extracting DOCX...")
+        return Docx2txtLoader(str(file_path))
+    if suffix in {".txt", ".md"}:
+        print("📄 Extracting TXT/MD...")
+        return TextLoader(str(file_path), encoding="utf-8")
+    return None
+
+
+def _iter_source_pages(loader, first_page: int = 0):
+    """Pages in order from `first_page` on."""
+    if isinstance(loader, (PdfLoader, StoredPagesLoader)):
+        return loader.lazy_load(first_page)
+    # DOCX/TXT have no page ranges to split: one lazy pass through the loader
+    # (skipped pages are still read, but not split or embedded again)
+    return itertools.islice(loader.lazy_load(), first_page, None)
+
+
+def _extract_pages(loader, first_page: int = 0):
+    """Lazily yield the loader's pages, timing each extraction step."""
+    pages = _iter_source_pages(loader, first_page)
+    while True:
+        with span("ingest.extract"):
+            page = next(pages, None)
+        if page is None:
+            return
+        yield page
+
+
+def _update_document_progress(document_id: int, page_count: int, chunk_count: int) -> None:
+    """Persist how much of the document is indexed so far."""
+    db = SessionLocal()
+    try:
+        doc_record = db.query(Document).filter(Document.id == document_id).first()
+        if doc_record:
+            doc_record.page_count = page_count
+            doc_record.chunk_count = chunk_count
+            db.commit()
+    except Exception as e:
+        print(f"❌ DB error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash stored with every chunk, used to find unchanged chunks on re-index."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_id(document_id: int, chunk_index: int, digest: str) -> str:
+    """
+    Deterministic chunk id: writing the same chunk again (retried batch,
+    resumed job) overwrites it instead of adding a duplicate.
+    """
+    return f"{document_id}:{chunk_index}:{digest[:16]}"
+
+
+def _existing_chunks(
+    collection, document_id: int, file_hash: str, resume_chunk: int = 0
+) -> tuple[dict[str, list[str]], set[str]]:
+    """
+    chunk hash → ids of the chunks the collection already holds for a
+    document, minus the ones this version stored before `resume_chunk`.
+    Also returns the ids an interrupted attempt at this version wrote past it.
+    """
+    existing: dict[str, list[str]] = {}
+    interrupted: set[str] = set()
+    offset = 0
+    while True:
+        batch = collection.get(
+            where={"document_id": document_id},
+            offset=offset,
+            limit=1000,
+            include=["documents", "metadatas"],
+        )
+        for stored_id, text, meta in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            meta = meta or {}
+            if meta.get("file_hash") == file_hash:
+                if meta.get("chunk_index", resume_chunk) < resume_chunk:
+                    continue  # checkpointed by an earlier attempt at this version
+                interrupted.add(stored_id)
+            # Chunks indexed before hashes were stored are hashed from their text
+            digest = meta.get("chunk_hash") or chunk_hash(text or "")
+            existing.setdefault(digest, []).append(stored_id)
+        if len(batch["ids"]) < 1000:
+            return existing, interrupted
+        offset += 1000
+
+
+def _stored_embeddings(collection, ids: list[str]) -> dict[str, list[float]]:
+    result = collection.get(ids=ids, include=["embeddings"])
+    return {
+        stored_id: [float(x) for x in vector]
+        for stored_id, vector in zip(result["ids"], result["embeddings"])
+    }
+
+
+def _record_version_stats(document_id: int, file_hash: str, reused: int, embedded: int, removed: int) -> None:
+    """Store how much of the indexed version the latest version could keep."""
+    db = SessionLocal()
+    try:
+        version = (
+            db.query(DocumentVersion)
+            .filter(DocumentVersion.document_id == document_id, DocumentVersion.file_hash == file_hash)
+            .order_by(DocumentVersion.version.desc())
+            .first()
+        )
+        if version:
+            version.chunks_reused = reused
+            version.chunks_embedded = embedded
+            version.chunks_removed = removed
+            db.commit()
+    except Exception as e:
+        print(f"❌ DB error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 # =========================
 # MAIN PIPELINE
 # =========================
@@ -66,10 +337,27 @@ def process_uploaded_file(
     original_filename: str,
     user_email: str,
     file_hash: str,
-    document_id: int
+    document_id: int,
+    batch_size: int | None = None,
+    progress_callback: ProgressCallback | None = None,
+    resume_from: tuple[int, int] | None = None,
 ) -> None:
     """
     Background job: PDF/TXT/DOCX → text → chunks → embeddings → ChromaDB
+
+    Pages are loaded lazily and fed to the splitter one at a time; chunks are
+    embedded and stored every `batch_size` chunks, so earlier parts of a large
+    document are searchable while the rest is still being processed.
+
+    Also re-indexes a document whose file was replaced (or an interrupted
+    attempt): chunks are matched to the ones already indexed by content hash,
+    only new text is embedded and chunks missing from this version are deleted
+    at the end.
+
+    `progress_callback` receives checkpoints: (pages, chunks) such that the
+    first `pages` pages are fully stored as the first `chunks` chunks. A
+    retried job passes its last checkpoint as `resume_from` and continues
+    with the next page.
     """
     print(f"🚀 Starting RAG processing: {original_filename} for {user_email}")
 
@@ -78,42 +366,16 @@ def process_uploaded_file(
         print(f"❌ File not found: {file_path}")
         return
 
+    batch_size = batch_size or EMBED_BATCH_SIZE
+
     try:
-        # load document
-        # 1. Extract text
-        if file_path.suffix.lower() == ".pdf":
-            loader = PyPDFLoader(str(file_path))
-            print("📄 Extracting PDF...")
-        elif file_path.suffix.lower() in {".docx", ".doc"}:
-            loader = Docx2txtLoader(str(file_path))
-            print("📝 Extracting DOCX...")
-        elif file_path.suffix.lower() in {".txt", ".md"}:
-            loader = TextLoader(str(file_path), encoding="utf-8")
-            print("📄 Extracting TXT/MD...")
-        else:
+        # 1. Pick loader
+        loader = get_loader(file_path)
+        if loader is None:
             print(f"❌ Unsupported type: {file_path.suffix}")
             return
-        
-        
-        # documents = [page1_text, page2_text, ...]
-        documents = loader.load()
-        if not documents:
-            raise RuntimeError(
-                f"PDF extraction failed (0 pages). "
-                f"File may be scanned or unsupported: {file_path}"
-            )    
-
-        print(f"✅ Extracted {len(documents)} page(s)/section(s)")
-
-        # Split large text into overlapping chunks
-        chunks = text_splitter.split_documents(documents)
-        print(f"✂️ Split into {len(chunks)} chunks (1000 chars each)")
-
-        if not chunks:
-            print("⚠️ No text extracted — skipping")
-            return
-        
-        # === SAVE METADATA TO MYSQL ===
+
+        # === CHECK METADATA IN MYSQL ===
         db = SessionLocal()
         try:
             user = db.query(User).filter(User.email == user_email).first()
@@ -125,59 +387,258 @@ def process_uploaded_file(
             if not doc_record:
                 print("❌ Document not found for update")
                 return
-
-            doc_record.page_count = len(documents)
-            doc_record.chunk_count = len(chunks)
-            db.commit()
-            print(f"💾 Document saved with ID: {document_id}")
-
-        except Exception as e:
-            print(f"❌ DB error: {e}")
-            db.rollback()
-            return
         finally:
             db.close()
-            
-    # 4. PREPARE CHROMA DATA
-        # Metadata helps with citations & debugging
+
         collection = get_or_create_collection(user_email)
-        
-        # Generate unique IDs for each chunk
-        ids = [str(uuid.uuid4()) for _ in chunks]
-        
-        # Extract actual text from each chunk
-        texts = [chunk.page_content for chunk in chunks]
-
-        metadatas = []
-        for i, chunk in enumerate(chunks):
-            metadatas.append({
-                "document_id": document_id,
-                "filename": original_filename,
-                "chunk_index": i,
-                "page": chunk.metadata.get("page", 0),
-                "user_email": user_email,
-            })
-
-        # -----------------------
-        # 5. EMBED & STORE
-        # -----------------------
-        # Create embeddings locally and store everything in Chroma
-        collection.add(
-            ids=ids,
-            documents=texts,
-            metadatas=metadatas,
-            embeddings=embeddings.embed_documents(texts),
-        )
+        bm25_index = get_bm25_index(user_email)
+
+        # Same content already ingested (by anyone): its chunks + embeddings are copied
+        key = artifact_key()
+        artifacts = load_artifact_meta(file_hash, key)
+
+        # Pick up after the last checkpoint of an interrupted attempt
+        start_page, start_chunk = 0, 0
+        if artifacts is None and resume_from and resume_from[0] > 0:
+            start_page, start_chunk = resume_from
+            print(f"⏩ Resuming at page {start_page + 1} (chunk {start_chunk})")
+
+        # Chunks already indexed for this document (previous version or an
+        # interrupted attempt): unchanged text keeps its id and embedding
+        existing, interrupted = _existing_chunks(collection, document_id, file_hash, start_chunk)
+        previous = sum(len(ids) for ids in existing.values())
+        if previous:
+            print(f"🔁 Re-indexing document_id={document_id} against {previous} existing chunks")
+
+        page_count = start_page
+        chunk_count = start_chunk
+        reused_count = 0
+        embedded_count = 0
+        removed_count = 0
+        truncated_count = 0
+        batch = []
+        writer = page_writer = None
+        # (pages, chunks) at the end of each page not yet fully stored
+        page_ends = deque()
+        checkpoint = (start_page, start_chunk)
+        claimed = set()
+
+        def take_existing(index: int, digest: str) -> str | None:
+            """Id of an indexed chunk with this text, preferring the one already at this position."""
+            candidates = existing.get(digest)
+            if not candidates:
+                return None
+            own = chunk_id(document_id, index, digest)
+            if own in candidates:
+                candidates.remove(own)
+                return own
+            return candidates.pop()
 
-        print(f"🎉 SUCCESS: Stored {len(chunks)} chunks for document_id={document_id}")
+        def new_chunk_id(index: int, digest: str) -> str:
+            """
+            Id for a chunk that is embedded again. Repeated text can map onto
+            ids kept chunks still use (including suffixed ones): count up
+            until the id is free.
+            """
+            base = new_id = chunk_id(document_id, index, digest)
+            suffix = 0
+            while new_id in claimed:
+                suffix += 1
+                new_id = f"{base}:{suffix}"
+            claimed.add(new_id)
+            return new_id
 
-        print(f"🎉 Stored {len(chunks)} chunks in Chroma")
+        def store_batch(texts: list[str], pages: list[int], embeddings: list[list[float]] | None = None) -> None:
+            """
+            Write one batch of chunks to the user's collection. Only chunks the
+            document does not already contain are embedded (or taken from
+            `embeddings`) and added; the others just get their metadata updated.
+            """
+            nonlocal chunk_count, reused_count, embedded_count, truncated_count, checkpoint
+            hashes = [chunk_hash(text) for text in texts]
+            # Metadata helps with citations & debugging
+            metadatas = [
+                {
+                    "document_id": document_id,
+                    "filename": original_filename,
+                    "chunk_index": chunk_count + i,
+                    "page": page,
+                    "user_email": user_email,
+                    "chunk_hash": digest,
+                    "file_hash": file_hash,
+                }
+                for i, (page, digest) in enumerate(zip(pages, hashes))
+            ]
+            kept_ids = [take_existing(chunk_count + i, digest) for i, digest in enumerate(hashes)]
+            claimed.update(kept_id for kept_id in kept_ids if kept_id)
+            kept = [i for i, kept_id in enumerate(kept_ids) if kept_id is not None]
+            fresh = [i for i, kept_id in enumerate(kept_ids) if kept_id is None]
+
+            if embeddings is None:
+                embeddings = [None] * len(texts)
+                if fresh:
+                    truncated_count += report_truncated(texts[i] for i in fresh)
+                    # Create embeddings locally, only for new / changed text
+                    with span("ingest.embed"):
+                        vectors = get_embeddings().embed_documents([texts[i] for i in fresh])
+                    for i, vector in zip(fresh, vectors):
+                        embeddings[i] = vector
+                    embedded_count += len(fresh)
+                if kept and writer:
+                    # Artifacts need every vector: read the kept ones back
+                    stored = _stored_embeddings(collection, [kept_ids[i] for i in kept])
+                    for i in kept:
+                        embeddings[i] = stored[kept_ids[i]]
+
+            if kept:
+                # Same text, so same embedding and BM25 postings: only the
+                # position (chunk_index / page) and filename may have changed
+                with span("ingest.chroma_update"):
+                    collection.update(
+                        ids=[kept_ids[i] for i in kept],
+                        metadatas=[metadatas[i] for i in kept],
+                    )
+                # An interrupted attempt may have died between the Chroma and
+                # the BM25 write: index its chunks again (replaces by id)
+                redo = [i for i in kept if kept_ids[i] in interrupted]
+                if redo:
+                    with span("ingest.bm25_add"):
+                        bm25_index.add(
+                            [kept_ids[i] for i in redo],
+                            [texts[i] for i in redo],
+                            [metadatas[i] for i in redo],
+                        )
+            if fresh:
+                ids = [new_chunk_id(chunk_count + i, hashes[i]) for i in fresh]
+                fresh_texts = [texts[i] for i in fresh]
+                fresh_metadatas = [metadatas[i] for i in fresh]
+                # Upsert: chunks a crashed attempt already wrote are overwritten
+                with span("ingest.chroma_add"):
+                    collection.upsert(
+                        ids=ids,
+                        documents=fresh_texts,
+                        metadatas=fresh_metadatas,
+                        embeddings=[embeddings[i] for i in fresh],
+                    )
+                # Keep the keyword index in step with the vector store
+                with span("ingest.bm25_add"):
+                    bm25_index.add(ids, fresh_texts, fresh_metadatas)
+            if writer:
+                writer.add_chunks(texts, pages, embeddings)
+
+            chunk_count += len(texts)
+            reused_count += len(kept)
+            while page_ends and page_ends[0][1] <= chunk_count:
+                checkpoint = page_ends.popleft()
+            _update_document_progress(document_id, page_count, chunk_count)
+            if progress_callback:
+                progress_callback(*checkpoint)
+            print(f"📦 Indexed {chunk_count} chunks ({page_count} page(s) read)")
+
+        def finish() -> None:
+            """Drop chunks that are not part of this version and record the counts."""
+            nonlocal removed_count
+            stale = [stored_id for ids in existing.values() for stored_id in ids]
+            if stale:
+                # One delete per store: the old chunks disappear together
+                with span("ingest.delete_stale"):
+                    collection.delete(ids=stale)
+                    bm25_index.delete_chunks(stale)
+                existing.clear()
+            removed_count = len(stale)
+
+            # Final counts (trailing pages may not have produced a batch)
+            _update_document_progress(document_id, page_count, chunk_count)
+            _record_version_stats(document_id, file_hash, reused_count, embedded_count, removed_count)
+            if previous:
+                print(f"♻️ Kept {reused_count} unchanged chunks, embedded {embedded_count}, removed {removed_count}")
+            if truncated_count:
+                print(
+                    f"✂️ {truncated_count}/{embedded_count} embedded chunks "
+                    f"({truncated_count / embedded_count:.0%}) exceed the embedding window "
+                    f"of {EMBEDDING_MAX_TOKENS} tokens"
+                )
+
+        def flush() -> None:
+            """Embed the pending batch and make it searchable."""
+            if not batch:
+                return
+            texts = [chunk.page_content for chunk in batch]
+            pages = [chunk.metadata.get("page", 0) for chunk in batch]
+            batch.clear()
+            store_batch(texts, pages)
+
+        try:
+            # 2a. Same content already ingested (by anyone): copy its chunks + embeddings
+            if artifacts is not None:
+                print(f"♻️ Reusing {artifacts['chunks']} stored chunks for {file_hash[:12]}")
+                page_count = artifacts["pages"]
+                for texts, pages, embeddings in iter_artifact_chunks(file_hash, key, batch_size):
+                    # Copying is cheap: a retry starts over (page checkpoint stays 0)
+                    store_batch(texts, pages, embeddings)
+                finish()
+                if progress_callback:
+                    progress_callback(page_count, chunk_count)
+                print(f"🎉 SUCCESS: Stored {chunk_count} chunks for document_id={document_id}")
+                return
+
+            # Pages extracted once from this content are reused by any ingest
+            # config; otherwise the file is parsed
+            pages_stored = has_pages(file_hash)
+            if pages_stored:
+                loader = StoredPagesLoader(file_path, file_hash)
+            # Files in the content store keep their extraction output for re-uploads
+            # (only complete runs: a resumed one has not seen the first pages)
+            if is_stored(file_path) and start_page == 0:
+                writer = ArtifactWriter(file_hash, key)
+                if not pages_stored:
+                    page_writer = PageWriter(file_hash)
+
+            # 2b. Extract page by page → split → embed & store in batches
+            for page in _extract_pages(loader, start_page):
+                page_count += 1
+                if page_writer:
+                    page_writer.add_page(page.metadata.get("page"), page.page_content)
+                with span("ingest.split"):
+                    chunks = text_splitter.split_documents([page])
+                page_ends.append((page_count, chunk_count + len(batch) + len(chunks)))
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) >= batch_size:
+                        flush()
+            flush()
+
+            if page_count == 0:
+                raise RuntimeError(
+                    f"PDF extraction failed (0 pages). "
+                    f"File may be scanned or unsupported: {file_path}"
+                )
+
+            print(f"✅ Extracted {page_count} page(s)/section(s)")
+            if page_writer:
+                page_writer.commit()
+            if writer:
+                writer.commit(page_count)
+            finish()
+        except BaseException:
+            for output in (writer, page_writer):
+                if output:
+                    output.abort()
+            raise
+        finally:
+            # Once per ingest (also a failed one that stored some batches, or
+            # one that only removed stale chunks): invalidate caches keyed on the corpus
+            if chunk_count > start_chunk or removed_count:
+                bump_collection_version(user_email)
+
+        if chunk_count == 0:
+            print("⚠️ No text extracted — skipping")
+            return
+
+        print(f"🎉 SUCCESS: Stored {chunk_count} chunks for document_id={document_id}")
 
     except Exception as e:
         print(f"💥 PROCESSING FAILED: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
         raise
-    
-
-    
\ No newline at end of file
@@ -0,0 +1,81 @@
+# backend/rag/versions.py
+"""
+Per-user collection version counter.
+
+Every change to a user's indexed chunks (an ingested batch, a deleted document)
+bumps the counter in the database, so caches in any process (API workers,
+ingestion workers) can key on it and never serve results from an older corpus.
+Reads are cached in-process for COLLECTION_VERSION_TTL seconds, so another
+process's bump is seen within that delay; this process's own bumps at once.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from db.database import SessionLocal
+from models.collection_version import CollectionVersion
+
+COLLECTION_VERSION_TTL = float(os.getenv("COLLECTION_VERSION_TTL", "2"))
+
+# user_email -> (version, monotonic time it was read)
+_versions: dict[str, tuple[int, float]] = {}
+_versions_lock = threading.Lock()
+
+
+def _read_version(user_email: str) -> int:
+    db = SessionLocal()
+    try:
+        row = db.query(CollectionVersion.version).filter(CollectionVersion.user_email == user_email).first()
+        return row[0] if row else 0
+    finally:
+        db.close()
+
+
+def _remember(user_email: str, version: int) -> None:
+    with _versions_lock:
+        _versions[user_email] = (version, time.monotonic())
+
+
+def get_collection_version(user_email: str) -> int:
+    """Current version of the user's corpus (0 if it was never changed)."""
+    with _versions_lock:
+        cached = _versions.get(user_email)
+    if cached is not None and time.monotonic() - cached[1] < COLLECTION_VERSION_TTL:
+        return cached[0]
+    version = _read_version(user_email)
+    _remember(user_email, version)
+    return version
+
+
+def bump_collection_version(user_email: str) -> int:
+    """Atomically increment the user's corpus version and return the new value."""
+    db = SessionLocal()
+    try:
+        for _ in range(2):
+            updated = (
+                db.query(CollectionVersion)
+                .filter(CollectionVersion.user_email == user_email)
+                .update(
+                    {
+                        CollectionVersion.version: CollectionVersion.version + 1,
+                        CollectionVersion.updated_at: datetime.utcnow(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if not updated:
+                db.add(CollectionVersion(user_email=user_email, version=1))
+            try:
+                db.commit()
+                break
+            except IntegrityError:
+                # Another process created the row first: retry as an update
+                db.rollback()
+        version = _read_version(user_email)
+        _remember(user_email, version)
+        return version
+    finally:
+        db.close()
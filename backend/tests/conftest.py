@@ -0,0 +1,140 @@
+# backend/tests/conftest.py
+"""
+Test setup: the app modules read their settings at import time and create
+their data folders relative to the working directory, so point them at a
+throwaway SQLite database and directory before anything is imported.
+
+Run from backend/:
+    python -m pytest -q
+"""
+import hashlib
+import math
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+WORKDIR = Path(tempfile.mkdtemp(prefix="rag-tests-"))
+
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR / 'test.db'}"
+os.environ.pop("CHROMA_HOST", None)
+os.environ["WARMUP_MODELS"] = "0"
+os.chdir(WORKDIR)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Create the tables once per test session."""
+    from sqlalchemy import event
+
+    from db.database import Base, engine
+    from models import models, document, job, collection_version, content_blob, document_version  # noqa: F401  (register the tables)
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, record):
+        # Cascade deletes the way MySQL does
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    engine.dispose()
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def new_document(database):
+    """Factory: adds a user owning one document row and returns the document id."""
+    from db.database import SessionLocal
+    from models.document import Document
+    from models.models import User
+
+    def create(email: str, path: Path, file_hash: str = "0" * 64) -> int:
+        db = SessionLocal()
+        try:
+            user = User(email=email, name=email.split("@")[0], hashed_password="-")
+            db.add(user)
+            db.commit()
+            doc = Document(filename=path.name, file_hash=file_hash, file_path=str(path), user_id=user.id)
+            db.add(doc)
+            db.commit()
+            return doc.id
+        finally:
+            db.close()
+
+    return create
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words (+ bigrams) feature-hashing embedder."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        from rag.bm25_index import tokenize
+        tokens = tokenize(text)
+        vector = [0.0] * self.dim
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def hashing_embeddings(monkeypatch):
+    """Ingest with a small deterministic embedder instead of the real model."""
+    from rag import pipeline
+    embeddings = HashingEmbeddings()
+    monkeypatch.setattr(pipeline, "get_embeddings", lambda: embeddings)
+    return embeddings
+
+
+def write_pdf(path: Path, pages: int, lines_per_page: int = 30, seed: int = 0) -> Path:
+    """Text-only PDF (one Helvetica text stream per page) of random invoice-ish words."""
+    words = "contract payment invoice schedule revenue policy claim audit vendor warranty".split()
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [f"Page {page + 1}"] + [" ".join(rng.choices(words, k=12)) for _ in range(lines_per_page)]
+        stream = ("BT /F1 10 Tf 12 TL 50 780 Td " + "".join(f"({line}) Tj T* " for line in lines) + "ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return path
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Factory: writes a text-only PDF with `pages` pages under tmp_path and returns its path."""
+    def create(name: str, pages: int, lines_per_page: int = 30, seed: int = 0) -> Path:
+        return write_pdf(tmp_path / name, pages, lines_per_page, seed)
+
+    return create
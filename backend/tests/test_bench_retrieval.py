@@ -0,0 +1,28 @@
+# backend/tests/test_bench_retrieval.py
+"""The retrieval benchmark runs end to end on a tiny synthetic corpus (offline stand-ins)."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_bench_retrieval_smoke(tmp_path):
+    report_path = tmp_path / "report.json"
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_retrieval", "--docs", "2", "--max-queries", "8",
+         "--output", str(report_path)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    report = json.loads(report_path.read_text())
+    assert report["documents"] == 2
+    (run,) = report["runs"]
+    assert run["ingest"]["chunks"] > 0
+    (row,) = run["results"]
+    assert 0.0 <= row["recall@6"] <= 1.0
+    assert set(row["latency_ms"]["total"]) == {"p50", "p95", "p99"}
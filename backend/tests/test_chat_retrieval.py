@@ -0,0 +1,155 @@
+# backend/tests/test_chat_retrieval.py
+"""
+A rag_search turn retrieves once: the LLM context and the citations are built
+from the same search + rerank result.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+from api import chat
+from utils.semantic_cache import SemanticCache
+
+USER = {"email": "reader@example.com"}
+DOCS = ["Invoices are due within 30 days.", "Late invoices carry a 2% fee.", "Unrelated text."]
+METAS = [
+    {"document_id": 1, "filename": "terms.pdf", "page": 1},
+    {"document_id": 1, "filename": "terms.pdf", "page": 2},
+    {"document_id": 2, "filename": "other.pdf", "page": 7},
+]
+
+
+class FakeLLM:
+    """Asks for one rag_search in the first round, then answers."""
+
+    def __init__(self):
+        self.calls = []
+
+    def bind_tools(self, tools):
+        return self
+
+    async def astream(self, messages):
+        self.calls.append(list(messages))
+        if len(self.calls) == 1:
+            yield AIMessageChunk(content="", tool_call_chunks=[{
+                "name": "rag_search",
+                "args": json.dumps({"query": "when are invoices due", "document_id": None}),
+                "id": "call-1",
+                "index": 0,
+            }])
+        else:
+            yield AIMessageChunk(content="Within 30 days ")
+            yield AIMessageChunk(content="[terms.pdf, page 1].")
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.fixture
+def retrieval(monkeypatch):
+    """Counting stand-ins for search and rerank; the rerank keeps the first two chunks, best first."""
+    counts = {"search": 0, "rerank": 0}
+    reranked = {}
+
+    def fake_search(query, document_id=None, user_email="", fusion=None):
+        counts["search"] += 1
+        return list(DOCS), list(METAS)
+
+    def fake_rerank(query, chunks, metadatas, top_k=6, threshold=0.3, cascade=None):
+        counts["rerank"] += 1
+        reranked.update(chunks=[chunks[1], chunks[0]], metas=[metadatas[1], metadatas[0]], scores=[0.91, 0.87])
+        return reranked["chunks"], reranked["metas"], reranked["scores"]
+
+    monkeypatch.setattr(chat, "search", fake_search)
+    monkeypatch.setattr(chat, "rerank_with_scores", fake_rerank)
+    monkeypatch.setattr(chat, "embed_query", lambda text: [1.0, 0.0, 0.0])
+    monkeypatch.setattr(chat, "get_collection_version", lambda user_email: 0)
+    monkeypatch.setattr(chat, "_answer_cache", SemanticCache(
+        "answers-test", max_scopes=8, max_entries_per_scope=8, threshold=0.95, ttl_seconds=60,
+    ))
+    llm = FakeLLM()
+    monkeypatch.setattr(chat, "llm", llm)
+    return counts, reranked, llm
+
+
+def run_chat(message: str) -> list[dict]:
+    """POST /api/chat without the HTTP layer; returns the decoded SSE events."""
+    async def collect():
+        response = await chat.chat(chat.ChatRequest(message=message), FakeRequest(), USER)
+        return [event async for event in response.body_iterator]
+
+    events = []
+    for raw in asyncio.run(collect()):
+        payload = raw.removeprefix("data: ").strip()
+        if payload != "[DONE]":
+            events.append(json.loads(payload))
+    return events
+
+
+def test_rag_search_retrieves_once_for_context_and_citations(retrieval):
+    counts, reranked, llm = retrieval
+
+    events = run_chat("When are invoices due?")
+
+    assert counts == {"search": 1, "rerank": 1}
+    # The model saw exactly the reranked chunks ...
+    tool_messages = [m for m in llm.calls[1] if isinstance(m, ToolMessage)]
+    assert [m.content for m in tool_messages] == ["\n\n".join(reranked["chunks"])]
+    # ... and the citations point at the same chunks, in the same order
+    citations = next(event["citations"] for event in events if "citations" in event)
+    assert [(c["source"], c["page"], c["score"]) for c in citations] == [
+        (meta["filename"], meta["page"], score) for meta, score in zip(reranked["metas"], reranked["scores"])
+    ]
+    assert [c["snippet"] for c in citations] == [chunk[:150] + "..." for chunk in reranked["chunks"]]
+    assert "".join(event.get("content", "") for event in events) == "Within 30 days [terms.pdf, page 1]."
+
+
+def test_repeated_question_is_answered_from_the_answer_cache(retrieval):
+    counts, _, llm = retrieval
+
+    first = run_chat("When are invoices due?")
+    second = run_chat("When are invoices due?")
+
+    assert counts == {"search": 1, "rerank": 1}
+    assert len(llm.calls) == 2
+    # Replayed in the same content events as the streamed answer
+    assert second == first
+    assert [event["content"] for event in second if "content" in event] == ["Within 30 days ", "[terms.pdf, page 1]."]
+
+
+def test_answer_cache_failure_is_a_miss(retrieval, monkeypatch):
+    counts, _, _ = retrieval
+
+    def broken_embedder(text):
+        raise RuntimeError("embedding model unavailable")
+
+    monkeypatch.setattr(chat, "embed_query", broken_embedder)
+
+    events = run_chat("When are invoices due?")
+
+    assert counts == {"search": 1, "rerank": 1}
+    assert "".join(event.get("content", "") for event in events) == "Within 30 days [terms.pdf, page 1]."
+    assert not any("error" in event for event in events)
+
+
+def test_llm_total_excludes_tool_time(retrieval, monkeypatch):
+    counts, _, _ = retrieval
+    observed = {}
+
+    def slow_search(query, document_id=None, user_email="", fusion=None):
+        counts["search"] += 1
+        time.sleep(0.3)
+        return list(DOCS), list(METAS)
+
+    monkeypatch.setattr(chat, "search", slow_search)
+    monkeypatch.setattr(chat, "observe", lambda stage, seconds: observed.setdefault(stage, seconds))
+
+    run_chat("When are invoices due?")
+
+    assert counts["search"] == 1
+    assert observed["llm.total"] < 0.3
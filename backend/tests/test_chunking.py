@@ -0,0 +1,26 @@
+# backend/tests/test_chunking.py
+"""The truncation report is best-effort: it never fails an ingest."""
+from rag import chunking, pipeline
+from utils.lazy import LazyProvider
+
+
+def test_ingest_succeeds_when_the_tokenizer_cannot_load(new_document, hashing_embeddings, tmp_path, monkeypatch):
+    loads = []
+
+    def missing_tokenizer():
+        loads.append(1)
+        raise ModuleNotFoundError("No module named 'transformers'")
+
+    monkeypatch.setattr(chunking, "TRUNCATION_REPORT", True)
+    monkeypatch.setattr(chunking, "_report_disabled", False)
+    monkeypatch.setattr(chunking, "tokenizer_provider", LazyProvider("tokenizer", missing_tokenizer, register=False))
+    email = "no-tokenizer@example.com"
+    path = tmp_path / "notes.txt"
+    path.write_text("\n\n".join(f"Paragraph {i} about invoices and payment terms. " * 20 for i in range(20)))
+    document_id = new_document(email, path)
+
+    pipeline.process_uploaded_file(str(path), path.name, email, "0" * 64, document_id, batch_size=2)
+
+    assert len(pipeline.get_or_create_collection(email).get(where={"document_id": document_id})["ids"]) > 2
+    # Skipped for the remaining batches after the first failure
+    assert loads == [1]
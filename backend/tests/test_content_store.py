@@ -0,0 +1,48 @@
+# backend/tests/test_content_store.py
+"""
+Pages extracted from stored content are kept once per file hash and reused
+by later ingests of the same content under another chunking configuration.
+"""
+import shutil
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def chunk_pages(email: str, document_id: int) -> list[int]:
+    from rag import pipeline
+    result = pipeline.get_or_create_collection(email).get(where={"document_id": document_id}, include=["metadatas"])
+    return [meta["page"] for meta in sorted(result["metadatas"], key=lambda meta: meta["chunk_index"])]
+
+
+def test_new_chunking_config_reuses_stored_pages(new_document, hashing_embeddings, make_pdf, monkeypatch):
+    from rag import content_store, pipeline
+    from utils.file_hash import compute_file_hash
+
+    source = make_pdf("fixture.pdf", pages=6, seed=11)
+    file_hash = compute_file_hash(source.read_bytes())
+    stored = content_store.blob_dir(file_hash) / "raw.pdf"
+    stored.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(source, stored)
+
+    first_id = new_document("pages-first@example.com", stored, file_hash)
+    pipeline.process_uploaded_file(str(stored), "fixture.pdf", "pages-first@example.com", file_hash, first_id)
+    assert content_store.has_pages(file_hash)
+    assert [page for page, _ in content_store.iter_stored_pages(file_hash)] == list(range(6))
+
+    # Another chunk size: the chunk artifacts do not apply, the pages do
+    monkeypatch.setattr(pipeline, "text_splitter", RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50))
+    monkeypatch.setattr(pipeline, "artifact_key", lambda: "other-chunking")
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("stored pages should be read instead of parsing the PDF")
+
+    monkeypatch.setattr(pipeline.PdfLoader, "lazy_load", no_parsing)
+
+    second_id = new_document("pages-second@example.com", stored, file_hash)
+    pipeline.process_uploaded_file(str(stored), "fixture.pdf", "pages-second@example.com", file_hash, second_id)
+
+    first_pages = chunk_pages("pages-first@example.com", first_id)
+    second_pages = chunk_pages("pages-second@example.com", second_id)
+    assert len(second_pages) > len(first_pages)
+    assert sorted(set(second_pages)) == sorted(set(first_pages)) == list(range(6))
+    assert content_store.load_artifact_meta(file_hash, "other-chunking")["pages"] == 6
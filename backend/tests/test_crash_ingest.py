@@ -0,0 +1,208 @@
+# backend/tests/test_crash_ingest.py
+"""
+Crash-injection tests for idempotent, resumable ingestion.
+
+A fixture PDF is ingested once cleanly (the reference). Each test then
+ingests it again with one fault injected into the first attempt, and retries
+the way worker.py does: `resume_from` = the last checkpoint the attempt
+reported.
+
+Scenarios (each at every batch number in CRASH_BATCHES):
+    embed        the embedding model raises before the batch is written
+    mid-upsert   half of the batch reaches Chroma, then the write raises
+    after-chroma the batch is in Chroma but the BM25 write raises
+
+After the retry the document must match the reference exactly: same chunk
+texts in the same order, deterministic ids, no duplicates, and the BM25 index
+holding the same number of chunks. Embeddings use the deterministic hashing
+stand-in from conftest.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from conftest import HashingEmbeddings, write_pdf
+
+SCENARIOS = ("embed", "mid-upsert", "after-chroma")
+CRASH_BATCHES = tuple(int(n) for n in os.getenv("CRASH_TEST_BATCHES", "1 3 5").split())
+PAGES = int(os.getenv("CRASH_TEST_PAGES", "24"))
+LINES_PER_PAGE = 45
+BATCH_SIZE = 8
+SEED = 5
+
+
+class SimulatedCrash(RuntimeError):
+    pass
+
+
+class FaultInjector:
+    """Wraps the collection, BM25 index and embedder; raises on the N-th batch of one kind."""
+
+    def __init__(self, scenario: str, crash_batch: int):
+        self.scenario = scenario
+        self.crash_batch = crash_batch
+        self.calls = 0
+        self.armed = True
+
+    def hit(self, kind: str) -> bool:
+        if not self.armed or kind != self.scenario:
+            return False
+        self.calls += 1
+        if self.calls == self.crash_batch:
+            self.armed = False
+            return True
+        return False
+
+
+class FaultyCollection:
+    def __init__(self, inner, faults: FaultInjector):
+        self.inner = inner
+        self.faults = faults
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if self.faults.hit("mid-upsert"):
+            half = len(ids) // 2
+            self.inner.upsert(ids=ids[:half], documents=documents[:half],
+                              metadatas=metadatas[:half], embeddings=embeddings[:half])
+            raise SimulatedCrash("crashed halfway through collection.upsert")
+        return self.inner.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+
+class FaultyBM25:
+    def __init__(self, inner, faults: FaultInjector):
+        self.inner = inner
+        self.faults = faults
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def add(self, ids, texts, metadatas):
+        if self.faults.hit("after-chroma"):
+            raise SimulatedCrash("crashed between the Chroma and the BM25 write")
+        return self.inner.add(ids, texts, metadatas)
+
+
+class CountingEmbeddings:
+    """Counts the texts the pipeline embeds."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return self.inner.embed_documents(texts)
+
+
+class FaultyEmbeddings(CountingEmbeddings):
+    def __init__(self, inner, faults: FaultInjector):
+        super().__init__(inner)
+        self.faults = faults
+
+    def embed_documents(self, texts):
+        if self.faults.hit("embed"):
+            raise SimulatedCrash("embedding model crashed")
+        return super().embed_documents(texts)
+
+
+def snapshot(user_email: str, document_id: int) -> dict:
+    """Chunks of a document in chunk_index order, plus the BM25 chunk count."""
+    from rag import pipeline
+    result = pipeline.get_or_create_collection(user_email).get(
+        where={"document_id": document_id}, include=["documents", "metadatas"]
+    )
+    rows = sorted(zip(result["ids"], result["documents"], result["metadatas"]),
+                  key=lambda row: row[2]["chunk_index"])
+    return {
+        "ids": [row[0] for row in rows],
+        "texts": [row[1] for row in rows],
+        "indexes": [row[2]["chunk_index"] for row in rows],
+        "bm25_chunks": pipeline.get_bm25_index(user_email).count(),
+    }
+
+
+@pytest.fixture(scope="module")
+def fixture_pdf(tmp_path_factory) -> Path:
+    return write_pdf(tmp_path_factory.mktemp("crash") / "fixture.pdf", PAGES, LINES_PER_PAGE, SEED)
+
+
+@pytest.fixture(scope="module")
+def ingest(new_document, fixture_pdf):
+    """Returns add_document(user_email) and run(user_email, document_id, faults, resume_from)."""
+    from rag import pipeline
+    from utils.file_hash import compute_file_hash
+
+    file_hash = compute_file_hash(fixture_pdf.read_bytes())
+    hashing = HashingEmbeddings()
+
+    def add_document(user_email: str) -> int:
+        return new_document(user_email, fixture_pdf, file_hash)
+
+    def run(user_email: str, document_id: int, faults: FaultInjector | None, resume_from=None) -> dict:
+        """One attempt; returns the last checkpoint, the chunks embedded and the error (if any)."""
+        progress = {"checkpoint": resume_from or (0, 0)}
+        embeddings = FaultyEmbeddings(hashing, faults) if faults else CountingEmbeddings(hashing)
+        real_collection = pipeline.get_or_create_collection
+        real_bm25 = pipeline.get_bm25_index
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(pipeline, "get_embeddings", lambda: embeddings)
+            if faults:
+                patch.setattr(pipeline, "get_or_create_collection",
+                              lambda email: FaultyCollection(real_collection(email), faults))
+                patch.setattr(pipeline, "get_bm25_index", lambda email: FaultyBM25(real_bm25(email), faults))
+            try:
+                pipeline.process_uploaded_file(
+                    str(fixture_pdf), fixture_pdf.name, user_email, file_hash, document_id,
+                    batch_size=BATCH_SIZE,
+                    progress_callback=lambda pages, chunks: progress.update(checkpoint=(pages, chunks)),
+                    resume_from=resume_from,
+                )
+                error = None
+            except SimulatedCrash as e:
+                error = str(e)
+        return {"checkpoint": progress["checkpoint"], "embedded": embeddings.texts, "error": error}
+
+    return add_document, run
+
+
+@pytest.fixture(scope="module")
+def reference(ingest) -> dict:
+    add_document, run = ingest
+    user_email = "reference@crash.example.com"
+    document_id = add_document(user_email)
+    assert run(user_email, document_id, None)["error"] is None
+    result = snapshot(user_email, document_id)
+    # Every crash batch must fall inside the document
+    assert len(result["texts"]) > max(CRASH_BATCHES) * BATCH_SIZE
+    return result
+
+
+@pytest.mark.parametrize("crash_batch", CRASH_BATCHES)
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_retry_after_crash_matches_clean_ingest(ingest, reference, scenario, crash_batch):
+    from rag import pipeline
+    add_document, run = ingest
+    user_email = f"{scenario}-{crash_batch}@crash.example.com"
+    document_id = add_document(user_email)
+    total = len(reference["texts"])
+
+    first = run(user_email, document_id, FaultInjector(scenario, crash_batch))
+    assert first["error"] is not None, "the injected fault never fired"
+    retry = run(user_email, document_id, None, resume_from=first["checkpoint"])
+    assert retry["error"] is None
+    got = snapshot(user_email, document_id)
+
+    assert got["texts"] == reference["texts"]
+    assert got["indexes"] == list(range(total))
+    assert got["ids"] == [
+        pipeline.chunk_id(document_id, index, pipeline.chunk_hash(text))
+        for index, text in enumerate(reference["texts"])
+    ]
+    assert len(set(got["ids"])) == len(got["ids"]) == total
+    assert got["bm25_chunks"] == reference["bm25_chunks"]
+    # The retry resumes at the checkpoint instead of embedding the whole document again
+    assert retry["embedded"] <= total - first["checkpoint"][1]
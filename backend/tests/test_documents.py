@@ -0,0 +1,62 @@
+# backend/tests/test_documents.py
+"""Deleting a document while its ingestion job is still queued or running is refused."""
+import pytest
+from fastapi import HTTPException
+
+from api import documents
+from db.database import SessionLocal
+from models.document import Document
+from models.job import IngestionJob, JOB_DONE, JOB_QUEUED, JOB_RUNNING
+
+
+def add_job(document_id: int, status: str) -> None:
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).filter(Document.id == document_id).one()
+        db.add(IngestionJob(
+            document_id=document_id, user_email=doc.user.email, file_path=doc.file_path,
+            original_filename=doc.filename, file_hash=doc.file_hash, status=status,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def delete(email: str, document_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        return documents.delete_document(document_id, {"email": email}, db)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("status", [JOB_QUEUED, JOB_RUNNING])
+def test_delete_is_refused_while_ingesting(new_document, tmp_path, monkeypatch, status):
+    deleted_chunks = []
+    monkeypatch.setattr(documents, "delete_document_chunks", lambda email, doc_id: deleted_chunks.append(doc_id))
+    email = f"{status}@example.com"
+    path = tmp_path / "report.txt"
+    path.write_text("report")
+    document_id = new_document(email, path)
+    add_job(document_id, status)
+
+    with pytest.raises(HTTPException) as exc:
+        delete(email, document_id)
+
+    assert exc.value.status_code == 409
+    assert deleted_chunks == []
+    assert path.exists()
+
+
+def test_delete_after_ingestion(new_document, tmp_path, monkeypatch):
+    deleted_chunks = []
+    monkeypatch.setattr(documents, "delete_document_chunks", lambda email, doc_id: deleted_chunks.append(doc_id))
+    email = "done@example.com"
+    path = tmp_path / "report.txt"
+    path.write_text("report")
+    document_id = new_document(email, path)
+    add_job(document_id, JOB_DONE)
+
+    assert delete(email, document_id)["document_id"] == document_id
+    assert deleted_chunks == [document_id]
+    assert not path.exists()
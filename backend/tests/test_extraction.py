@@ -0,0 +1,26 @@
+# backend/tests/test_extraction.py
+"""Short and long PDFs go through the same page text function, serially or in the process pool."""
+from rag import extraction, pipeline
+
+
+def load(pdf):
+    return [(page.page_content, page.metadata) for page in pipeline.get_loader(pdf).lazy_load()]
+
+
+def test_parallel_pages_match_serial_pages(make_pdf, monkeypatch):
+    pdf = make_pdf("long.pdf", pages=12, seed=3)
+    monkeypatch.setattr(extraction, "PDF_PAGES_PER_TASK", 4)
+
+    monkeypatch.setattr(extraction, "PDF_EXTRACT_WORKERS", 1)
+    serial = load(pdf)
+    monkeypatch.setattr(extraction, "PDF_EXTRACT_WORKERS", 2)
+    try:
+        parallel = load(pdf)
+        assert extraction._pool is not None  # the long path really ran in the pool
+    finally:
+        extraction.shutdown_pool()
+
+    assert len(serial) == 12
+    assert parallel == serial
+    assert [metadata["page"] for _, metadata in serial] == list(range(12))
+    assert serial[0][0].startswith("Page 1\n") and serial[0][0] == serial[0][0].strip()
@@ -0,0 +1,68 @@
+# backend/tests/test_inference_backends.py
+"""
+ONNX backends produce the same embeddings and reranker scores as torch,
+within the default drift tolerances of benchmarks/bench_inference_backends.py.
+
+Skipped unless torch, sentence-transformers, ONNX Runtime (with optimum) and
+both models are available locally; nothing is downloaded.
+"""
+import numpy as np
+import pytest
+
+for module in ("torch", "sentence_transformers", "langchain_huggingface", "onnxruntime", "optimum.onnxruntime"):
+    pytest.importorskip(module)
+
+from huggingface_hub import try_to_load_from_cache  # noqa: E402
+
+from rag.inference import (  # noqa: E402
+    EMBEDDING_MODEL_NAME,
+    RERANKER_MODEL_NAME,
+    load_cross_encoder,
+    load_embeddings,
+)
+
+for model_name in (EMBEDDING_MODEL_NAME, RERANKER_MODEL_NAME):
+    if not isinstance(try_to_load_from_cache(model_name, "config.json"), str):
+        pytest.skip(f"{model_name} is not in the local Hugging Face cache", allow_module_level=True)
+
+VECTOR_TOLERANCE = 0.02
+SCORE_TOLERANCE = 0.1
+
+TEXTS = [
+    "The contract requires payment of every invoice within thirty days of delivery.",
+    "Employees must complete compliance training before the end of the quarter.",
+    "The vendor warranty covers replacement parts but excludes liability for delays.",
+    "Revenue for the third quarter exceeded the budget forecast by four percent.",
+    "Insurance claims are audited annually and reported to the board.",
+]
+PAIRS = [
+    ["when are invoices due", TEXTS[0]],
+    ["when are invoices due", TEXTS[3]],
+    ["what does the warranty exclude", TEXTS[2]],
+    ["what does the warranty exclude", TEXTS[1]],
+    ["how did revenue compare to forecast", TEXTS[3]],
+    ["who reviews insurance claims", TEXTS[4]],
+]
+
+
+def outputs(backend: str) -> tuple[np.ndarray, np.ndarray]:
+    vectors = load_embeddings(backend).embed_documents(TEXTS)
+    scores = load_cross_encoder(RERANKER_MODEL_NAME, backend).predict(PAIRS)
+    return np.asarray(vectors, dtype=np.float32), np.asarray(scores, dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def reference() -> tuple[np.ndarray, np.ndarray]:
+    return outputs("torch")
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backend_matches_torch(reference, backend):
+    ref_vectors, ref_scores = reference
+    vectors, scores = outputs(backend)
+
+    cosine = np.sum(ref_vectors * vectors, axis=1) / (
+        np.linalg.norm(ref_vectors, axis=1) * np.linalg.norm(vectors, axis=1)
+    )
+    assert cosine.min() >= 1 - VECTOR_TOLERANCE, cosine
+    assert np.abs(ref_scores - scores).max() <= SCORE_TOLERANCE, (ref_scores, scores)
@@ -0,0 +1,40 @@
+# backend/tests/test_jobs.py
+"""A running job keeps its lease while it makes no progress."""
+import time
+from datetime import datetime, timedelta
+
+from db.database import SessionLocal
+from models.job import IngestionJob, JOB_RUNNING
+from rag import jobs
+
+
+def test_lease_is_renewed_without_progress(new_document, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    path = tmp_path / "large.pdf"
+    document_id = new_document("lease@example.com", path)
+    expired = datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 60)
+
+    db = SessionLocal()
+    try:
+        job = IngestionJob(
+            document_id=document_id, user_email="lease@example.com", file_path=str(path),
+            original_filename=path.name, file_hash="0" * 64, status=JOB_RUNNING,
+            attempts=1, worker="busy-worker", heartbeat_at=expired,
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    with jobs.hold_lease(job_id):
+        time.sleep(0.3)  # a long extraction: no heartbeat() calls
+        assert jobs.requeue_stale_jobs() == 0
+
+    db = SessionLocal()
+    try:
+        job = db.query(IngestionJob).filter(IngestionJob.id == job_id).one()
+        assert job.status == JOB_RUNNING
+        assert job.heartbeat_at > expired
+    finally:
+        db.close()
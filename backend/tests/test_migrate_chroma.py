@@ -0,0 +1,27 @@
+# backend/tests/test_migrate_chroma.py
+"""Embedded Chroma collections are copied to the server once, vectors included."""
+import chromadb
+
+import migrate_chroma
+
+
+def test_collections_are_copied_idempotently(tmp_path):
+    embedded = chromadb.PersistentClient(path=str(tmp_path / "embedded"))
+    server = chromadb.PersistentClient(path=str(tmp_path / "server"))  # stands in for the HttpClient
+    source = embedded.create_collection(name="docs_reader_example_com")
+    source.add(
+        ids=[f"chunk-{i}" for i in range(5)],
+        embeddings=[[float(i), 1.0, 0.0] for i in range(5)],
+        documents=[f"text {i}" for i in range(5)],
+        metadatas=[{"document_id": 1, "chunk_index": i} for i in range(5)],
+    )
+
+    assert migrate_chroma.migrate_collection(source, server) == 5
+    assert migrate_chroma.migrate_collection(source, server) == 0
+
+    copied = server.get_collection(name="docs_reader_example_com").get(
+        ids=["chunk-3"], include=["embeddings", "documents", "metadatas"]
+    )
+    assert list(copied["embeddings"][0]) == [3.0, 1.0, 0.0]
+    assert copied["documents"] == ["text 3"]
+    assert copied["metadatas"] == [{"document_id": 1, "chunk_index": 3}]
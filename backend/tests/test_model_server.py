@@ -0,0 +1,38 @@
+# backend/tests/test_model_server.py
+"""The model server loads each cross-encoder once, however many requests race for it."""
+import asyncio
+import time
+
+from rag import model_server
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[0.0, 1.0] for _ in texts]
+
+
+class FakeCrossEncoder:
+    def predict(self, pairs):
+        return [0.5] * len(pairs)
+
+
+def test_concurrent_first_requests_load_a_reranker_once(monkeypatch):
+    loads = []
+
+    def load_cross_encoder(model_name):
+        loads.append(model_name)
+        time.sleep(0.1)
+        return FakeCrossEncoder()
+
+    monkeypatch.setattr(model_server, "load_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(model_server, "load_cross_encoder", load_cross_encoder)
+    server = model_server.ModelServer()
+
+    async def race():
+        request = {"op": "rerank", "pairs": [["query", "chunk"]], "model": "other/reranker"}
+        return await asyncio.gather(*(server.handle_request(dict(request)) for _ in range(8)))
+
+    responses = asyncio.run(race())
+
+    assert loads == [model_server.RERANKER_MODEL_NAME, "other/reranker"]
+    assert responses == [{"result": [0.5]}] * 8
@@ -0,0 +1,13 @@
+# backend/tests/test_readiness.py
+"""The API's readiness only waits for what the API itself serves with."""
+from fastapi.testclient import TestClient
+
+
+def test_tokenizer_is_not_part_of_api_readiness():
+    import main
+    from rag.chunking import tokenizer_provider
+
+    components = TestClient(main.app).get("/health/ready").json()["components"]
+
+    assert set(components) == {"chroma", "embeddings", "reranker"}
+    assert not tokenizer_provider.ready
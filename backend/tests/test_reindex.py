@@ -0,0 +1,38 @@
+# backend/tests/test_reindex.py
+"""Re-indexing a new version keeps unchanged chunks and gives every chunk its own id."""
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag import pipeline
+
+PARAGRAPH = 60
+
+
+def paragraph(word: str) -> str:
+    return f"{word} " * (PARAGRAPH // (len(word) + 1))
+
+
+def test_repeated_text_never_shares_an_id(new_document, hashing_embeddings, tmp_path, monkeypatch):
+    # One chunk per paragraph
+    monkeypatch.setattr(pipeline, "text_splitter", RecursiveCharacterTextSplitter(
+        chunk_size=PARAGRAPH, chunk_overlap=0, separators=["\n\n"],
+    ))
+    email = "repeated@example.com"
+    path = tmp_path / "notes.txt"
+    document_id = new_document(email, path)
+    collection = pipeline.get_or_create_collection(email)
+
+    # Each version moves the repeated paragraph so that the ids of the
+    # previous one (with and without suffix) are claimed by earlier chunks
+    versions = [
+        ["other", "other", "repeated"],
+        ["repeated", "between", "repeated"],
+        ["repeated", "repeated", "repeated"],
+    ]
+    for n, words in enumerate(versions):
+        path.write_text("\n\n".join(paragraph(word) for word in words))
+        pipeline.process_uploaded_file(str(path), path.name, email, f"{n:064d}", document_id)
+
+        stored = collection.get(where={"document_id": document_id}, include=["documents", "metadatas"])
+        assert len(stored["ids"]) == len(words)
+        assert sorted(meta["chunk_index"] for meta in stored["metadatas"]) == list(range(len(words)))
+        assert sorted(text.split()[0] for text in stored["documents"]) == sorted(words)
@@ -0,0 +1,41 @@
+# backend/tests/test_upload.py
+"""An upload whose database transaction fails leaves nothing in the content store."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import file as file_api
+from db.database import SessionLocal
+from models.content_blob import ContentBlob
+from models.models import User
+from rag import content_store
+from utils.file_hash import compute_file_hash
+from utils.utils import get_current_user
+
+EMAIL = "uploader@example.com"
+
+
+def test_failed_upload_removes_the_stored_file(database, monkeypatch):
+    db = SessionLocal()
+    db.add(User(email=EMAIL, name="uploader", hashed_password="-"))
+    db.commit()
+    db.close()
+
+    def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("jobs table unavailable")
+
+    monkeypatch.setattr(file_api, "enqueue_ingestion", broken_enqueue)
+    app = FastAPI()
+    app.include_router(file_api.router)
+    app.dependency_overrides[get_current_user] = lambda: {"email": EMAIL}
+
+    content = b"quarterly invoice report\n" * 100
+    response = TestClient(app).post("/api/upload", files={"file": ("report.txt", content, "text/plain")})
+
+    assert response.status_code == 500
+    file_hash = compute_file_hash(content)
+    assert not content_store.blob_dir(file_hash).exists()
+    db = SessionLocal()
+    try:
+        assert db.query(ContentBlob).filter(ContentBlob.file_hash == file_hash).first() is None
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+# backend/tests/test_versions.py
+"""Corpus versions: one bump per ingest, reads cached in-process for a short TTL."""
+from db.database import SessionLocal
+from models.collection_version import CollectionVersion
+from rag import pipeline, versions
+
+
+def test_version_reads_are_cached_for_the_ttl(database, monkeypatch):
+    monkeypatch.setattr(versions, "COLLECTION_VERSION_TTL", 60)
+    email = "ttl@example.com"
+    version = versions.bump_collection_version(email)
+
+    # Another process bumps the version
+    db = SessionLocal()
+    try:
+        db.query(CollectionVersion).filter(CollectionVersion.user_email == email).update(
+            {CollectionVersion.version: version + 10}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    assert versions.get_collection_version(email) == version
+    # This process's own bumps are seen at once
+    assert versions.bump_collection_version(email) == version + 11
+    assert versions.get_collection_version(email) == version + 11
+
+    monkeypatch.setattr(versions, "COLLECTION_VERSION_TTL", 0)
+    assert versions.get_collection_version(email) == version + 11
+
+
+def test_ingest_bumps_the_version_once(new_document, hashing_embeddings, tmp_path, monkeypatch):
+    bumps = []
+    monkeypatch.setattr(pipeline, "bump_collection_version", bumps.append)
+    email = "bumps@example.com"
+    path = tmp_path / "notes.txt"
+    path.write_text("\n\n".join(f"Paragraph {i} about invoices and payment terms. " * 20 for i in range(20)))
+    document_id = new_document(email, path)
+
+    pipeline.process_uploaded_file(str(path), path.name, email, "0" * 64, document_id, batch_size=2)
+
+    assert len(pipeline.get_or_create_collection(email).get(where={"document_id": document_id})["ids"]) > 2
+    assert bumps == [email]
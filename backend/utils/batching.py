@@ -0,0 +1,119 @@
+# backend/utils/batching.py
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    "rag_microbatch_size_items",
+    "Items per model call after micro-batching",
+    ["batcher"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+BATCH_REQUESTS = Histogram(
+    "rag_microbatch_requests",
+    "Caller requests merged into one model call",
+    ["batcher"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32, 64),
+)
+QUEUE_DEPTH = Histogram(
+    "rag_microbatch_queue_depth",
+    "Requests still waiting when a batch is dispatched",
+    ["batcher"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+@dataclass
+class _Request:
+    items: List[Any]
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a batch function.
+
+    Callers from any thread `submit()` a list of items. A single background
+    thread waits up to `window_ms` after the first pending request for more
+    requests (until `max_batch_size` items are collected), runs `fn` once on
+    the concatenated items and scatters the results back to each caller's
+    future. A single request larger than `max_batch_size` runs on its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        window_ms: float = 5.0,
+    ):
+        self.name = name
+        self._fn = fn
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List[Any]) -> Future:
+        request = _Request(items=list(items))
+        if not request.items:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        return self.submit(items).result()
+
+    async def submit_async(self, items: List[Any]) -> List[Any]:
+        """Awaitable variant for callers on an event loop."""
+        return await asyncio.wrap_future(self.submit(items))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].items)
+        deadline = time.monotonic() + self.window_seconds
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            items = [item for request in batch for item in request.items]
+            BATCH_SIZE.labels(self.name).observe(len(items))
+            BATCH_REQUESTS.labels(self.name).observe(len(batch))
+            QUEUE_DEPTH.labels(self.name).observe(self._queue.qsize())
+            try:
+                results = list(self._fn(items))
+            except Exception as e:
+                logger.error(f"❌ Batch {self.name} failed: {e}", exc_info=True)
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(results[offset:offset + len(request.items)])
+                offset += len(request.items)
@@ -0,0 +1,81 @@
+# backend/utils/lazy.py
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Every provider registers itself so startup warm-up and /health/ready can see it
+PROVIDERS: Dict[str, "LazyProvider"] = {}
+
+
+class LazyProvider(Generic[T]):
+    """
+    Thread-safe, build-once holder for an expensive object (model, client).
+
+    Nothing is created at import time; the first `get()` builds the object and
+    concurrent callers wait for that single build instead of racing.
+    With `register=False` the provider stays out of PROVIDERS (default warm-up
+    and readiness); the process that needs it warms it explicitly.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], register: bool = True):
+        self.name = name
+        self._factory = factory
+        self._instance: T | None = None
+        self._lock = threading.Lock()
+        self.load_seconds: float | None = None
+        self.error: str | None = None
+        if register:
+            PROVIDERS[name] = self
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.error = None
+                self.load_seconds = time.perf_counter() - start
+                logger.info(f"✅ {self.name} loaded in {self.load_seconds:.1f}s")
+            return self._instance
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+def warm_up(names: list[str] | None = None, extra: list[LazyProvider] | None = None) -> None:
+    """Build the given registered providers (default: all), then `extra`, one after another."""
+    selected = [provider for name, provider in list(PROVIDERS.items()) if names is None or name in names]
+    for provider in selected + list(extra or []):
+        try:
+            provider.get()
+        except Exception as e:
+            logger.error(f"❌ Warm-up of {provider.name} failed: {e}", exc_info=True)
+
+
+def warm_up_in_background(names: list[str] | None = None) -> threading.Thread:
+    thread = threading.Thread(target=warm_up, args=(names,), name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> Dict[str, Dict[str, Any]]:
+    return {name: provider.status() for name, provider in PROVIDERS.items()}
@@ -0,0 +1,102 @@
+# backend/utils/semantic_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+
+import numpy as np
+
+from utils.cache import CACHE_REGISTRY
+
+
+class SemanticCache:
+    """
+    Thread-safe nearest-neighbor cache: values are stored under a scope key with
+    the embedding of the text that produced them, and a lookup returns the value
+    of the most similar stored embedding if its cosine similarity reaches
+    `threshold`.
+
+    Scopes are evicted least-recently-used (`max_scopes`), and each scope keeps
+    at most `max_entries_per_scope` values (oldest dropped first).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_scopes: int,
+        max_entries_per_scope: int,
+        threshold: float,
+        ttl_seconds: float | None = None,
+    ):
+        self.name = name
+        self.max_scopes = max_scopes
+        self.max_entries_per_scope = max_entries_per_scope
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._scopes: "OrderedDict[Hashable, List[Tuple[float, np.ndarray, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHE_REGISTRY[name] = self
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope: Hashable, embedding) -> Tuple[Any, float] | None:
+        """Best (value, similarity) in the scope above the threshold, else None."""
+        query = self._unit(embedding)
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries and self.ttl_seconds is not None:
+                now = time.monotonic()
+                entries[:] = [entry for entry in entries if now - entry[0] < self.ttl_seconds]
+            if not entries:
+                self.misses += 1
+                return None
+
+            self._scopes.move_to_end(scope)
+            similarities = np.stack([entry[1] for entry in entries]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entries[best][2], float(similarities[best])
+
+    def add(self, scope: Hashable, embedding, value: Any) -> None:
+        if self.max_scopes <= 0 or self.max_entries_per_scope <= 0:
+            return
+        with self._lock:
+            entries = self._scopes.setdefault(scope, [])
+            entries.append((time.monotonic(), self._unit(embedding), value))
+            del entries[:-self.max_entries_per_scope]
+            self._scopes.move_to_end(scope)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._scopes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "scopes": len(self._scopes),
+            "max_scopes": self.max_scopes,
+            "max_entries_per_scope": self.max_entries_per_scope,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
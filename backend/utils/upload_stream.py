@@ -0,0 +1,151 @@
+# backend/utils/upload_stream.py
+"""
+Streaming multipart upload: request body → temp file, without buffering.
+
+The body is fed to python-multipart as it arrives. The file part is written to
+a temp file in `UPLOAD_CHUNK_SIZE` blocks while its SHA-256 is updated
+incrementally and the size limit is enforced, so one upload holds O(chunk
+size) memory no matter how large the file is. The temp file lives in the
+destination directory and is moved into place with an atomic rename.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+@dataclass
+class StreamedUpload:
+    filename: str
+    temp_path: Path
+    size: int
+    sha256: str
+
+    def commit(self, final_path: str | Path) -> None:
+        """Atomically move the upload to its final name (same filesystem)."""
+        os.replace(self.temp_path, final_path)
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+class _FilePart:
+    """Parser callbacks for one multipart body; only the `field_name` file part is kept."""
+
+    def __init__(self, field_name: str, max_size: int, validate_filename: Callable[[str], None]):
+        self.field_name = field_name
+        self.max_size = max_size
+        self.validate_filename = validate_filename
+        self.headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self.active = False  # currently inside the file part
+        self.filename: str | None = None
+        self.buffer = bytearray()
+        self.size = 0
+        self.hasher = hashlib.sha256()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self.headers = {}
+
+    def on_header_end(self) -> None:
+        self.headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self.headers.get(b"content-disposition"))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if name == self.field_name and filename is not None and self.filename is None:
+            self.filename = filename.decode("utf-8", "replace")
+            # Reject bad types before any data is stored
+            self.validate_filename(self.filename)
+            self.active = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self.active:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise HTTPException(status_code=400, detail=f"File too large. Max {self.max_size // (1024 * 1024)}MB")
+        chunk = data[start:end]
+        self.hasher.update(chunk)
+        self.buffer.extend(chunk)
+
+    def on_part_end(self) -> None:
+        self.active = False
+
+
+async def receive_upload(
+    request: Request,
+    dest_dir: str | Path,
+    max_size: int,
+    validate_filename: Callable[[str], None],
+    field_name: str = "file",
+) -> StreamedUpload:
+    """
+    Stream the `field_name` file of a multipart request into a temp file in
+    `dest_dir`. Raises HTTPException (400) for a bad request, type or size;
+    the temp file is removed in that case. The caller commits or discards.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    # Reject obviously oversized bodies before reading anything
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_size + 64 * 1024:
+        raise HTTPException(status_code=400, detail=f"File too large. Max {max_size // (1024 * 1024)}MB")
+
+    part = _FilePart(field_name, max_size, validate_filename)
+    parser = MultipartParser(boundary, part.callbacks())
+
+    fd, temp_name = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for body_chunk in request.stream():
+                try:
+                    parser.write(body_chunk)
+                except MultipartParseError as e:
+                    raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+                if len(part.buffer) >= UPLOAD_CHUNK_SIZE:
+                    data = bytes(part.buffer)
+                    part.buffer.clear()
+                    await run_in_threadpool(out.write, data)
+            parser.finalize()
+            if part.buffer:
+                await run_in_threadpool(out.write, bytes(part.buffer))
+                part.buffer.clear()
+
+        if part.filename is None:
+            raise HTTPException(status_code=400, detail="No file provided")
+        if part.size == 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    return StreamedUpload(filename=part.filename, temp_path=temp_path, size=part.size, sha256=part.hasher.hexdigest())
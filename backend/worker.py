@@ -0,0 +1,112 @@
+# backend/worker.py
+"""
+Ingestion worker pool.
+
+Runs next to the API (`python worker.py`) and processes queued uploads from the
+`ingestion_jobs` table. Each worker process loads the embedding model once and
+then loops: claim job → process_uploaded_file → mark done/failed. The
+supervisor restarts dead workers and puts their in-flight jobs back in the queue.
+"""
+import logging
+import multiprocessing as mp
+import os
+import signal
+import socket
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("worker")
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "1.0"))
+SUPERVISOR_INTERVAL = 5.0
+
+
+def worker_id_for(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}"
+
+
+def worker_loop(stop_event) -> None:
+    """Body of one worker process."""
+    # The supervisor handles Ctrl-C; workers finish their current job first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from rag.pipeline import process_uploaded_file
+    from rag.jobs import claim_next_job, heartbeat, hold_lease, mark_done, mark_failed
+    from rag.chunking import TOKENIZER_NEEDED, tokenizer_provider
+    from utils.lazy import warm_up
+
+    # Load the embedding model (and its tokenizer) once per worker process, before taking jobs
+    warm_up(["embeddings", "chroma"], extra=[tokenizer_provider] if TOKENIZER_NEEDED else None)
+
+    worker_id = worker_id_for(os.getpid())
+    logger.info(f"👷 Worker {worker_id} ready")
+
+    while not stop_event.is_set():
+        job = claim_next_job(worker_id)
+        if job is None:
+            stop_event.wait(POLL_INTERVAL)
+            continue
+
+        logger.info(f"⚙️ Job {job.id} (document {job.document_id}), attempt {job.attempts}")
+        try:
+            # Retries continue after the last checkpoint (pages_read /
+            # chunks_indexed); chunks written past it are upserted again
+            with hold_lease(job.id):
+                process_uploaded_file(
+                    file_path=job.file_path,
+                    original_filename=job.original_filename,
+                    user_email=job.user_email,
+                    file_hash=job.file_hash,
+                    document_id=job.document_id,
+                    progress_callback=lambda pages, chunks: heartbeat(job.id, pages, chunks),
+                    resume_from=(job.pages_read, job.chunks_indexed) if job.attempts > 1 else None,
+                )
+            mark_done(job.id)
+            logger.info(f"✅ Job {job.id} done")
+        except Exception as e:
+            logger.error(f"❌ Job {job.id} failed: {e}", exc_info=True)
+            mark_failed(job.id, f"{type(e).__name__}: {e}")
+
+
+def main() -> None:
+    from rag.jobs import requeue_stale_jobs
+
+    ctx = mp.get_context("spawn")
+    stop_event = ctx.Event()
+    processes: dict[int, mp.Process] = {}
+
+    def start_worker(slot: int) -> None:
+        process = ctx.Process(target=worker_loop, args=(stop_event,), name=f"ingest-worker-{slot}")
+        process.start()
+        processes[slot] = process
+
+    def request_stop(signum, frame):
+        logger.info("🛑 Stopping workers after their current job...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    recovered = requeue_stale_jobs()
+    if recovered:
+        logger.info(f"♻️ Re-queued {recovered} stale job(s)")
+
+    logger.info(f"🚀 Starting {INGEST_WORKERS} ingestion worker(s)")
+    for slot in range(INGEST_WORKERS):
+        start_worker(slot)
+
+    while not stop_event.is_set():
+        for slot, process in list(processes.items()):
+            if not process.is_alive():
+                logger.warning(f"💥 {process.name} (pid {process.pid}) exited with {process.exitcode}, restarting")
+                requeue_stale_jobs(worker_id=worker_id_for(process.pid))
+                start_worker(slot)
+        requeue_stale_jobs()
+        stop_event.wait(SUPERVISOR_INTERVAL)
+
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    main()